@@ -8,10 +8,17 @@
 #
 #  Usage:
 #
-#      addColumns.py  filename
+#      addColumns.py  [ --profile ]  [ --trace-memory ]  filename
 #
 #      where:
-#          filename = path to the input file
+#          filename = path to the input file, plain or compressed
+#                     (see mcvInput.py)
+#
+#      --profile and --trace-memory profile reading and writing the file
+#      (see mcvProfile.py).
+#
+#      The new file is written uncompressed, named after the input file
+#      without its compression suffix.
 #
 #  Exit Codes:
 #
@@ -27,8 +34,10 @@
 import string
 import sys
 import os
+import mcvInput
+import mcvProfile
 
-USAGE = 'Usage: addColumns.py  inputFile'
+USAGE = 'Usage: addColumns.py  [ --profile ]  [ --trace-memory ]  inputFile'
 TAB = '\t'
 CRT = '\n'
 
@@ -66,7 +75,7 @@ def checkArgs ():
 def openFile ():
     global fpInput
     try:
-        fpInput = open(inputFile, 'r')
+        fpInput = mcvInput.openInput(inputFile)
     except:
         print('Cannot open input file: ' + inputFile)
         sys.exit(1)
@@ -106,7 +115,8 @@ def addColumns ():
 #
 def writeFile():
     global fpOutput, outputFile
-    outputFile = '%s.%s' % (inputFile, os.environ['ADD_COLUMNS_EXT'])
+    outputFile = '%s.%s' % (mcvInput.stripSuffix(inputFile),
+        os.environ['ADD_COLUMNS_EXT'])
     fpOutput = open(outputFile, 'w')
     for line in lineList:
         fpOutput.write(line)
@@ -114,11 +124,12 @@ def writeFile():
 #
 # Main
 #
+mcvProfile.init('addColumns')
 checkArgs()
 openFile()
-addColumns()
+mcvProfile.runPhase('addColumns', addColumns)
 if hasMissingColumns == 1:
-    writeFile()
+    mcvProfile.runPhase('writeFile', writeFile)
     fpOutput.close()
     print('\nInput file has missing 9th and/or 10th columns. New file: %s' % outputFile)
 else:
@@ -9,10 +9,14 @@
 #
 #  Usage:
 #
-#      checkColumns.py  filename numColumns	
+#      checkColumns.py  [ --profile ]  [ --trace-memory ]  filename numColumns	
 #
 #      where:
-#          filename = path to the input file
+#          filename = path to the input file, plain or compressed
+#                     (see mcvInput.py)
+#
+#      --profile and --trace-memory profile the column check
+#      (see mcvProfile.py).
 #
 #  Env Vars:
 #
@@ -37,8 +41,10 @@
 
 import string
 import sys
+import mcvInput
+import mcvProfile
 
-USAGE = 'Usage: mcvloadQC.py  inputFile numColumns'
+USAGE = 'Usage: checkColumns.py  [ --profile ]  [ --trace-memory ]  inputFile numColumns'
 TAB = '\t'
 
 inputFile = None
@@ -76,7 +82,7 @@ def openFile ():
     global fpInput
 
     try:
-        fpInput = open(inputFile, 'r')
+        fpInput = mcvInput.openInput(inputFile)
     except:
         print('Cannot open input file: ' + inputFile)
         sys.exit(1)
@@ -94,7 +100,12 @@ def checkColumns ():
     lineNum = 0
     print("\n\nLines With Missing Columns")
     print("--------------------------")
-    for line in fpInput.readlines():
+    try:
+        lines = fpInput.readlines()
+    except IOError as e:
+        print('Cannot read input file: %s (%s)' % (inputFile, e))
+        sys.exit(1)
+    for line in lines:
         lineNum = lineNum + 1
         columns = str.split(line, TAB)
         nc = len(columns) 
@@ -121,9 +132,10 @@ def closeFile():
     fpInput.close()
     return
 
+mcvProfile.init('checkColumns')
 checkArgs()
 openFile()
-checkColumns()
+mcvProfile.runPhase('checkColumns', checkColumns)
 closeFile()
 if errors > 0:
     sys.exit(1)
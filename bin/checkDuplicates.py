@@ -0,0 +1,208 @@
+#
+#  checkDuplicates.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script checks an input file for duplicate annotations and for
+#	markers annotated to more than one term, in one pass over the
+#	file and without the database. The lines are checked as mcvQC.sh
+#	prepares them for the QC, the line numbers are those of the
+#	input file.
+#
+#  Usage:
+#
+#      checkDuplicates.py  [ --profile ]  [ --trace-memory ]  filename
+#
+#      where:
+#          filename = path to the input file, plain or compressed
+#                     (see mcvInput.py)
+#
+#      --profile and --trace-memory profile the indexing of the lines and
+#      the report (see mcvProfile.py).
+#
+#  Inputs:
+#
+#      - mcv input file (see mcvQC.sh)
+#
+#  Outputs:
+#
+#      - The sections of the sanity report, to stdout:
+#
+#        Duplicate Lines: lines repeated exactly
+#        Duplicate Annotations: lines for the same marker, term,
+#            J number and evidence code which differ in the other columns
+#        Markers Annotated to More Than One Term: reported only, the
+#            multiple MCV annotation report of mcvQC.py reports these too
+#
+#  Exit Codes:
+#
+#      0:  Successful completion, no duplicates
+#      1:  An exception occurred, or duplicates detected
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      Each line is indexed by its content and by its annotation identity
+#      (MGI ID, term ID, J number and evidence code, ignoring case), and
+#      each marker by its lines, in dictionaries, so the file is checked in
+#      linear time without sorting it.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import mcvInput
+import mcvProfile
+
+USAGE = 'Usage: checkDuplicates.py  [ --profile ]  [ --trace-memory ]  inputFile'
+TAB = '\t'
+
+inputFile = None
+
+#
+# The indexes hold a line or a line number for each key, a list is only
+# created for the keys found on more than one line, so the indexes of a
+# large file are built without creating a container for each line.
+#
+
+# Looks like {line:lineNum, ...}
+# the first line number of each line
+lineIndex = {}
+
+# Looks like {line:[lineNum, ...], ...}
+# the lines found more than once
+dupLineIndex = {}
+
+# Looks like {annotation identity:line, ...}
+# the first line of each annotation identity (the first four columns,
+# term ID, MGI ID, J number and evidence code, in lower case)
+annotIndex = {}
+
+# Looks like {annotation identity:[line, ...], ...}
+# the annotation identities found on more than one line
+dupAnnotIndex = {}
+
+# Looks like {mgiID:line, ...}
+# the first line with a term ID of each marker
+markerIndex = {}
+
+# Looks like {mgiID:[line, ...], ...}
+# the other lines of the markers found on more than one line
+moreMarkerIndex = {}
+
+#
+# Purpose: Validate the arguments to the script.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def checkArgs ():
+    global inputFile
+
+    if len(sys.argv) != 2:
+        print(USAGE)
+        sys.exit(1)
+
+    inputFile = sys.argv[1]
+
+#
+# Purpose: Index the lines of the input file
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def indexLines ():
+    try:
+        for lineNum, line in mcvInput.readQCLines(inputFile):
+            # an exact duplicate is only reported as such
+            if line in lineIndex:
+                if line not in dupLineIndex:
+                    dupLineIndex[line] = [lineIndex[line]]
+                dupLineIndex[line].append(lineNum)
+                continue
+            lineIndex[line] = lineNum
+
+            tokens = str.split(line, TAB, 4)
+            key = str.lower(TAB.join(tokens[0:4]))
+            if key in annotIndex:
+                if key not in dupAnnotIndex:
+                    dupAnnotIndex[key] = [annotIndex[key]]
+                dupAnnotIndex[key].append(line)
+            else:
+                annotIndex[key] = line
+
+            # a line without a term ID deletes the annotations of a marker
+            if tokens[0] == '' or len(tokens) < 2:
+                continue
+            mgiID = str.lower(tokens[1])
+            if mgiID in markerIndex:
+                if mgiID not in moreMarkerIndex:
+                    moreMarkerIndex[mgiID] = []
+                moreMarkerIndex[mgiID].append(line)
+            else:
+                markerIndex[mgiID] = line
+    except IOError as e:
+        print('Cannot read input file: %s (%s)' % (inputFile, e))
+        sys.exit(1)
+
+#
+# Purpose: Write the duplicates and the markers annotated to more than
+#	one term
+# Returns: the number of duplicates
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def writeReport ():
+    dupCount = 0
+
+    print('Duplicate Lines')
+    print('---------------')
+    for line in dupLineIndex:
+        dupCount = dupCount + 1
+        print('lines %s: %s' % (', '.join(map(str, dupLineIndex[line])), line))
+
+    print('')
+    print('Duplicate Annotations')
+    print('---------------------')
+    for key in dupAnnotIndex:
+        dupCount = dupCount + 1
+        for line in dupAnnotIndex[key]:
+            print('line %s: %s' % (lineIndex[line], line))
+        print('')
+
+    print('')
+    print('Markers Annotated to More Than One Term')
+    print('---------------------------------------')
+    for mgiID in moreMarkerIndex:
+        # Looks like {termID:[lineNum, ...], ...}
+        terms = {}
+        for line in [markerIndex[mgiID]] + moreMarkerIndex[mgiID]:
+            termID = str.upper(str.split(line, TAB, 1)[0])
+            if termID not in terms:
+                terms[termID] = []
+            terms[termID].append(lineIndex[line])
+        if len(terms) > 1:
+            termLines = []
+            for termID in terms:
+                termLines.append('%s (lines %s)' % \
+                    (termID, ', '.join(map(str, terms[termID]))))
+            print('%s: %s' % (mgiID.upper(), '; '.join(termLines)))
+    print('')
+
+    return dupCount
+
+#
+# Main
+#
+mcvProfile.init('checkDuplicates')
+checkArgs()
+mcvProfile.runPhase('indexLines', indexLines)
+if mcvProfile.runPhase('writeReport', writeReport) > 0:
+    sys.exit(1)
+sys.exit(0)
@@ -0,0 +1,61 @@
+#
+#  bcpin.py
+###########################################################################
+#
+#  Purpose:
+#
+#	Local stand-in for the pgdbutilities bcpin.csh, loads a delimited
+#	file into a table of the SQLite file of the local db module
+#	(see db.py). Empty fields are loaded as null.
+#
+#  Usage:
+#
+#      bcpin.py  server  database  table  directory  file  delimiter
+#                recordDelimiter  schema
+#
+#      where database is the path to the SQLite file, and server and
+#      schema are not used
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+###########################################################################
+
+import sys
+import os
+import sqlite3
+
+USAGE = 'Usage: bcpin.py  server  database  table  directory  file  delimiter  recordDelimiter  schema'
+
+if len(sys.argv) != 9:
+    print(USAGE)
+    sys.exit(1)
+
+database = sys.argv[2]
+table = sys.argv[3]
+bcpFile = os.path.join(sys.argv[4], sys.argv[5])
+delimiter = sys.argv[6].encode().decode('unicode_escape')
+recordDelimiter = sys.argv[7].encode().decode('unicode_escape')
+
+fpBCP = open(bcpFile, 'r', newline='')
+rows = []
+for record in str.split(fpBCP.read(), recordDelimiter):
+    if record == '':
+        continue
+    row = []
+    for value in str.split(record, delimiter):
+        if value == '':
+            value = None
+        row.append(value)
+    rows.append(row)
+fpBCP.close()
+
+conn = sqlite3.connect(database)
+if rows != []:
+    conn.executemany('insert into %s values (%s)' % \
+        (table, ','.join(['?'] * len(rows[0]))), rows)
+conn.commit()
+conn.close()
+print('Loaded %s rows into %s' % (len(rows), table))
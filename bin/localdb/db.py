@@ -0,0 +1,255 @@
+#
+#  db.py
+###########################################################################
+#
+#  Purpose:
+#
+#	Local stand-in for the MGI db module, backed by an SQLite file
+#	with a minimal MGD schema (see mcvFixture.py). It implements the
+#	part of the db API used by the mcvload scripts, so they can be run
+#	and benchmarked without a PostgreSQL MGD.
+#
+#  Usage:
+#
+#      Put this directory first on the python path, and the bcpin.csh
+#      stand-in on ${PG_DBUTILS}:
+#
+#          PYTHONPATH=${MCVLOAD}/bin/localdb:${PYTHONPATH}
+#          PG_DBUTILS=${MCVLOAD}/bin/localdb
+#          PG_DBNAME=path to the SQLite file
+#
+#  Env Vars:
+#
+#      PG_DBSERVER (optional, reported by get_sqlServer())
+#      PG_DBNAME
+#
+#  Implementation:
+#
+#      The PostgreSQL statements used by the scripts are translated to
+#      SQLite:
+#
+#          select ... into temp t from ...  ->  create temp table t as ...
+#          now()  ->  datetime('now', 'localtime')
+#          truncate table t  ->  delete from t
+#          explain (analyze, buffers) ...  ->  explain query plan ...
+#          grant ...  ->  ignored
+#
+#      Server-side cursors (declare ... cursor for select ..., fetch
+#      forward n from ..., close ...) are kept as SQLite cursors of the
+#      connection.
+#
+#  Notes:
+#
+#      As with MGD, temp tables only last as long as the connection,
+#      so they need db.useOneConnection(1).
+#
+###########################################################################
+
+import os
+import re
+import sqlite3
+
+sqlServer = os.environ.get('PG_DBSERVER', 'localhost')
+sqlDatabase = os.environ.get('PG_DBNAME', 'mgd.sqlite')
+
+# the open connection, when useOneConnection(1) has been called
+connection = None
+
+# Looks like {cursorName:sqlite3 cursor, ...}
+# the cursors declared with the open connection
+cursors = {}
+
+#
+# the PostgreSQL to SQLite translations, in the order they are applied
+# Looks like [ [compiled pattern, replacement], ...]
+#
+TRANSLATIONS = [
+    [re.compile(r'^\s*select\s+(.*?)\s+into\s+temp(?:orary)?\s+(?:table\s+)?(\w+)\s+(from\s.*)$',
+        re.I | re.S), r'create temp table \2 as select \1 \3'],
+    [re.compile(r'\bnow\(\)', re.I), "datetime('now', 'localtime')"],
+    [re.compile(r'^\s*truncate\s+(?:table\s+)?(\w+)\s*;?\s*$', re.I | re.S),
+        r'delete from \1'],
+    [re.compile(r'^\s*explain\s*\([^)]*\)\s*', re.I), 'explain query plan '],
+    ]
+
+IGNORED = re.compile(r'^\s*grant\s', re.I)
+
+EXPLAIN = re.compile(r'^\s*explain\s', re.I)
+
+DECLARE = re.compile(r'^\s*declare\s+(\w+)\s+(?:no\s+)?(?:scroll\s+)?cursor\s+'
+    r'(?:with(?:out)?\s+hold\s+)?for\s+(.*)$', re.I | re.S)
+FETCH = re.compile(r'^\s*fetch\s+(?:forward\s+)?(\d+)\s+(?:from|in)\s+(\w+)\s*;?\s*$',
+    re.I)
+CLOSE = re.compile(r'^\s*close\s+(\w+)\s*;?\s*$', re.I)
+
+#
+# A result row, the column names are matched without regard to case as
+# they are by PostgreSQL.
+#
+class Row (dict):
+
+    def __missing__ (self, key):
+        for column in self:
+            if column.lower() == key.lower():
+                return dict.__getitem__(self, column)
+        raise KeyError(key)
+
+#
+# Purpose: Translate a PostgreSQL statement to SQLite
+# Returns: the translated statement
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def translate (command):
+    for pattern, replacement in TRANSLATIONS:
+        command = pattern.sub(replacement, command)
+    return command
+
+#
+# Purpose: Open a connection to the SQLite file
+# Returns: the connection
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def connect ():
+    return sqlite3.connect(sqlDatabase)
+
+#
+# Purpose: Fetch rows from a cursor
+# Returns: list of Row
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: sqlite3.Error
+#
+def fetch (cursor, size = None):
+    columns = []
+    for column in cursor.description:
+        columns.append(column[0])
+
+    if size == None:
+        rows = cursor.fetchall()
+    else:
+        rows = cursor.fetchmany(size)
+
+    results = []
+    for r in rows:
+        results.append(Row(list(zip(columns, r))))
+    return results
+
+#
+# Purpose: Run one statement
+# Returns: list of Row, empty for a statement which returns no rows
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: sqlite3.Error
+#
+def execute (conn, command):
+    if IGNORED.match(command):
+        return []
+
+    match = DECLARE.match(command)
+    if match:
+        cursors[match.group(1).lower()] = conn.execute(translate(match.group(2)))
+        return []
+    match = FETCH.match(command)
+    if match:
+        cursor = cursors[match.group(2).lower()]
+        if cursor.description == None:
+            return []
+        return fetch(cursor, int(match.group(1)))
+    match = CLOSE.match(command)
+    if match:
+        cursors.pop(match.group(1).lower()).close()
+        return []
+
+    cursor = conn.execute(translate(command))
+    if cursor.description == None:
+        return []
+
+    results = fetch(cursor)
+
+    # EXPLAIN QUERY PLAN has a row per plan step
+    if EXPLAIN.match(command):
+        plan = []
+        for r in results:
+            plan.append(Row({'QUERY PLAN' : r['detail']}))
+        return plan
+
+    return results
+
+#
+# Purpose: Run a statement or a list of statements
+# Returns: the rows of the statement, or a list of the rows of each
+#	statement for a list of statements
+# Assumes: Nothing
+# Effects: Without useOneConnection(1), the statements are run in a
+#	connection of their own and committed.
+# Throws: sqlite3.Error
+#
+def sql (command, parser = 'auto'):
+    conn = connection
+    if conn == None:
+        conn = connect()
+
+    try:
+        if type(command) == type([]):
+            results = []
+            for cmd in command:
+                results.append(execute(conn, cmd))
+        else:
+            results = execute(conn, command)
+    finally:
+        if connection == None:
+            conn.commit()
+            conn.close()
+
+    return results
+
+#
+# Purpose: Keep one connection open for all statements (1), or close
+#	it (0). Uncommitted changes are rolled back when it is closed.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def useOneConnection (value = 0):
+    global connection
+
+    if value == 1 and connection == None:
+        connection = connect()
+    elif value == 0 and connection != None:
+        cursors.clear()
+        connection.rollback()
+        connection.close()
+        connection = None
+
+#
+# Purpose: Commit the changes made with the open connection
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def commit ():
+    if connection != None:
+        connection.commit()
+
+def get_sqlServer ():
+    return sqlServer
+
+def get_sqlDatabase ():
+    return sqlDatabase
+
+def set_sqlServer (server):
+    global sqlServer
+    sqlServer = server
+
+def set_sqlDatabase (database):
+    global sqlDatabase
+    sqlDatabase = database
+
+def set_sqlLogFunction (function):
+    pass
@@ -0,0 +1,433 @@
+#
+#  mcvFixture.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script creates the SQLite file of the local db module
+#	(see db.py) with a minimal MGD schema and generated data: markers
+#	with their MGI IDs, the MCV vocabulary with its marker type notes,
+#	SO IDs and closure, evidence codes, references, users and MCV/Marker
+#	annotations. It can also create a QC-ready input file and the temp
+#	table mcvQC.py loads it into. The sizes are options, so the data can
+#	be scaled to that of the production MGD.
+#
+#  Usage:
+#
+#      mcvFixture.py  [ options ]  sqliteFile
+#
+#      where the options are:
+#          --markers N = number of markers (default 50000)
+#          --refs N = number of references (default 20000)
+#          --extra-accessions N = number of accession IDs of other
+#                 objects, to scale ACC_Accession (default 0)
+#          --input file = create a QC-ready input file
+#          --input-rows N = number of rows of the input file (default 1000)
+#          --error-rate R = fraction of input rows with an invalid
+#                 value (default 0.01)
+#          --temp-table name = create the temp table for mcvQC.py
+#          --seed N = random seed (default 1)
+#
+#  Outputs:
+#
+#      - SQLite file (an existing file is replaced)
+#
+#      - Input file, with the tab-delimited fields of the QC-ready input
+#        file, see mcvQC.sh
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Notes:
+#
+#      To run mcvQC.py against the fixture, see db.py and:
+#
+#          mcvFixture.py --input mcvload.txt --temp-table ${MCVLOAD_TEMP_TABLE} mgd.sqlite
+#          PG_DBNAME=mgd.sqlite python mcvQC.py mcvload.txt
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import random
+import sqlite3
+
+USAGE = 'Usage: mcvFixture.py  [ --markers N ]  [ --refs N ]  [ --extra-accessions N ]  [ --input file ]  [ --input-rows N ]  [ --error-rate R ]  [ --temp-table name ]  [ --seed N ]  sqliteFile'
+
+TAB = '\t'
+NL = '\n'
+
+DATE = '2024-01-01 00:00:00'
+
+SCHEMA = [
+    '''create table ACC_MGIType (
+        _MGIType_key integer primary key,
+        name text not null)''',
+    '''create table ACC_Accession (
+        _Accession_key integer primary key,
+        accID text not null,
+        prefixPart text null,
+        numericPart integer null,
+        _LogicalDB_key integer not null,
+        _Object_key integer not null,
+        _MGIType_key integer not null,
+        private integer not null,
+        preferred integer not null,
+        creation_date text not null,
+        modification_date text not null)''',
+    '''create table MRK_Status (
+        _Marker_Status_key integer primary key,
+        status text not null)''',
+    '''create table MRK_Types (
+        _Marker_Type_key integer primary key,
+        name text not null,
+        creation_date text not null,
+        modification_date text not null)''',
+    '''create table MRK_Marker (
+        _Marker_key integer primary key,
+        _Organism_key integer not null,
+        _Marker_Status_key integer not null,
+        _Marker_Type_key integer not null,
+        symbol text not null,
+        name text not null,
+        _ModifiedBy_key integer not null,
+        creation_date text not null,
+        modification_date text not null)''',
+    '''create table VOC_Term (
+        _Term_key integer primary key,
+        _Vocab_key integer not null,
+        term text not null,
+        abbreviation text null,
+        sequenceNum integer null,
+        creation_date text not null,
+        modification_date text not null)''',
+    '''create table VOC_Annot (
+        _Annot_key integer primary key,
+        _AnnotType_key integer not null,
+        _Object_key integer not null,
+        _Term_key integer not null,
+        _Qualifier_key integer not null,
+        creation_date text not null,
+        modification_date text not null)''',
+    '''create table DAG_Closure (
+        _DAG_key integer not null,
+        _MGIType_key integer not null,
+        _AncestorObject_key integer not null,
+        _DescendentObject_key integer not null,
+        modification_date text not null)''',
+    '''create table MGI_Note (
+        _Note_key integer primary key,
+        _Object_key integer not null,
+        _MGIType_key integer not null,
+        _NoteType_key integer not null,
+        note text not null,
+        modification_date text not null)''',
+    '''create table MGI_User (
+        _User_key integer primary key,
+        login text not null,
+        name text not null,
+        modification_date text not null)''',
+    ]
+
+INDEXES = [
+    'create index acc_idx1 on ACC_Accession(accID)',
+    'create index acc_idx2 on ACC_Accession(_Object_key, _MGIType_key)',
+    'create index acc_idx3 on ACC_Accession(_MGIType_key, prefixPart)',
+    'create index mrk_idx1 on MRK_Marker(_Marker_Type_key)',
+    'create index mrk_idx2 on MRK_Marker(_Marker_Status_key)',
+    'create index term_idx1 on VOC_Term(_Vocab_key)',
+    'create index annot_idx1 on VOC_Annot(_AnnotType_key, _Object_key)',
+    'create index annot_idx2 on VOC_Annot(_Term_key)',
+    'create index closure_idx1 on DAG_Closure(_DAG_key)',
+    'create index note_idx1 on MGI_Note(_Object_key, _MGIType_key)',
+    ]
+
+# Looks like [ [marker type key, marker type, MCV type term,
+#	[MCV subterms]], ...]
+MARKER_TYPES = [
+    [1, 'Gene', 'gene', ['protein coding gene', 'lncRNA gene',
+        'miRNA gene', 'snoRNA gene', 'rRNA gene', 'tRNA gene',
+        'unclassified gene', 'polymorphic pseudogene']],
+    [2, 'DNA Segment', 'DNA segment', []],
+    [3, 'Cytogenetic Marker', 'cytogenetic marker', ['chromosomal deletion',
+        'chromosomal inversion', 'chromosomal translocation']],
+    [6, 'QTL', 'QTL', []],
+    [7, 'Pseudogene', 'pseudogene', ['pseudogenic region',
+        'pseudogenic gene segment']],
+    [8, 'BAC/YAC end', 'BAC/YAC end', []],
+    [9, 'Other Genome Feature', 'other genome feature', ['minisatellite',
+        'unclassified non-coding RNA gene', 'promoter', 'enhancer',
+        'CpG island', 'insulator', 'TF binding site']],
+    [10, 'Complex/Cluster/Region', 'complex/cluster/region', []],
+    [11, 'Transgene', 'transgene', []],
+    [12, 'Other', 'unclassified other genome feature', []],
+    ]
+
+EVIDENCE_CODES = ['IC', 'TAS', 'ISS', 'IEA', 'IDA', 'ND', 'IMP', 'IPI']
+
+MCV_VOCAB = 79
+EVIDENCE_VOCAB = 80
+
+#
+# Purpose: Create the schema and the generated data
+# Returns: the lists of valid values for the input file
+# Assumes: Nothing
+# Effects: creates the SQLite file
+# Throws: Nothing
+#
+def createFixture (sqliteFile, numMarkers, numRefs, numExtra):
+    if os.path.exists(sqliteFile):
+        os.remove(sqliteFile)
+    conn = sqlite3.connect(sqliteFile)
+    for cmd in SCHEMA:
+        conn.execute(cmd)
+
+    accessions = []
+    def addAccession (accID, prefix, number, ldb, objectKey, mgiType, preferred):
+        accessions.append((len(accessions) + 1, accID, prefix, number, ldb,
+            objectKey, mgiType, 0, preferred, DATE, DATE))
+
+    conn.executemany('insert into ACC_MGIType values (?, ?)',
+        [(1, 'Reference'), (2, 'Marker'), (11, 'Allele'),
+        (13, 'Vocabulary Term'), (19, 'Sequence')])
+    conn.executemany('insert into MRK_Status values (?, ?)',
+        [(1, 'official'), (2, 'withdrawn')])
+
+    users = ['mcvload']
+    for i in range(1, 21):
+        users.append('curator%s' % i)
+    rows = []
+    for i in range(len(users)):
+        rows.append((1000 + i, users[i], users[i], DATE))
+    conn.executemany('insert into MGI_User values (?, ?, ?, ?)', rows)
+
+    #
+    # MCV vocabulary: two grouping terms, a term per marker type with
+    # its Marker_Type note, and subterms, with their closure
+    #
+    terms = []
+    notes = []
+    closure = []
+    def addTerm (vocab, term):
+        terms.append((len(terms) + 1, vocab, term, None, len(terms) + 1,
+            DATE, DATE))
+        if vocab == MCV_VOCAB:
+            mcvNumber = len([t for t in terms if t[1] == MCV_VOCAB])
+            addAccession('MCV:%07d' % mcvNumber, 'MCV:', mcvNumber, 146,
+                len(terms), 13, 1)
+            # an SO ID for every other MCV term
+            if mcvNumber % 2 == 0:
+                addAccession('SO:%07d' % (mcvNumber * 7), 'SO:',
+                    mcvNumber * 7, 145, len(terms), 13, 0)
+        return len(terms)
+
+    rootKey = addTerm(MCV_VOCAB, 'all feature types')
+    for i in range(2, 29):
+        addTerm(MCV_VOCAB, 'reserved feature type %s' % i)
+    segmentKey = addTerm(MCV_VOCAB, 'gene segment')
+    closure.append((9, 13, rootKey, segmentKey, DATE))
+
+    # Looks like {marker type key:[MCV term key, ...], ...}
+    # the MCV terms a marker of the type may be annotated to
+    typeTerms = {}
+    for mkrTypeKey, mkrType, typeTerm, subterms in MARKER_TYPES:
+        conn.execute('insert into MRK_Types values (?, ?, ?, ?)',
+            (mkrTypeKey, mkrType, DATE, DATE))
+        typeKey = addTerm(MCV_VOCAB, typeTerm)
+        notes.append((len(notes) + 1, typeKey, 13, 1001,
+            'Marker_Type=%s;' % mkrTypeKey, DATE))
+        closure.append((9, 13, rootKey, typeKey, DATE))
+        typeTerms[mkrTypeKey] = [typeKey]
+        for subterm in subterms:
+            subKey = addTerm(MCV_VOCAB, subterm)
+            closure.append((9, 13, rootKey, subKey, DATE))
+            closure.append((9, 13, typeKey, subKey, DATE))
+            typeTerms[mkrTypeKey].append(subKey)
+
+    for code in EVIDENCE_CODES:
+        addTerm(EVIDENCE_VOCAB, code)
+
+    conn.executemany('insert into VOC_Term values (?, ?, ?, ?, ?, ?, ?)', terms)
+    conn.executemany('insert into MGI_Note values (?, ?, ?, ?, ?, ?)', notes)
+    conn.executemany('insert into DAG_Closure values (?, ?, ?, ?, ?)', closure)
+
+    #
+    # references, with their J numbers
+    #
+    for refKey in range(1, numRefs + 1):
+        addAccession('J:%s' % refKey, 'J:', refKey, 1, refKey, 1, 1)
+
+    #
+    # markers, with their MGI IDs (some with a secondary MGI ID) and
+    # their MCV annotations (most official markers have one)
+    #
+    markers = []
+    annots = []
+    mgiNumber = 0
+    # Looks like [ [MGI ID, [MCV ID, ...]], ...] for the official markers
+    officialIDs = []
+    secondaryIDs = []
+    mcvIDs = {}
+    for acc in accessions:
+        if acc[2] == 'MCV:':
+            mcvIDs[acc[5]] = acc[1]
+    typeKeys = [t[0] for t in MARKER_TYPES]
+    typeWeights = [60, 5, 1, 4, 15, 1, 10, 1, 2, 1]
+    for mkrKey in range(1, numMarkers + 1):
+        mkrTypeKey = random.choices(typeKeys, typeWeights)[0]
+        status = 1
+        if random.random() < 0.05:
+            status = 2
+        symbol = 'Mrk%s' % mkrKey
+        markers.append((mkrKey, 1, status, mkrTypeKey, symbol,
+            'marker %s' % mkrKey, 1000, DATE, DATE))
+
+        mgiNumber += 1
+        mgiID = 'MGI:%s' % mgiNumber
+        addAccession(mgiID, 'MGI:', mgiNumber, 1, mkrKey, 2, 1)
+        if random.random() < 0.1:
+            mgiNumber += 1
+            addAccession('MGI:%s' % mgiNumber, 'MGI:', mgiNumber, 1,
+                mkrKey, 2, 0)
+            secondaryIDs.append('MGI:%s' % mgiNumber)
+
+        if status == 1:
+            officialIDs.append([mgiID,
+                [mcvIDs[k] for k in typeTerms[mkrTypeKey]]])
+            if random.random() < 0.9:
+                annots.append((len(annots) + 1, 1011, mkrKey,
+                    random.choice(typeTerms[mkrTypeKey]), 1614158, DATE, DATE))
+
+    # MGI IDs of other objects
+    for i in range(1, numMarkers // 5 + 1):
+        mgiNumber += 1
+        addAccession('MGI:%s' % mgiNumber, 'MGI:', mgiNumber, 1, i, 11, 1)
+
+    # accession IDs of other objects, to scale ACC_Accession
+    for i in range(1, numExtra + 1):
+        addAccession('AB%06d' % i, 'AB', i, 9, i, 19, 1)
+
+    conn.executemany('insert into MRK_Marker values (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        markers)
+    conn.executemany('insert into VOC_Annot values (?, ?, ?, ?, ?, ?, ?)',
+        annots)
+    conn.executemany('insert into ACC_Accession values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        accessions)
+
+    for cmd in INDEXES:
+        conn.execute(cmd)
+    conn.execute('analyze')
+    conn.commit()
+    conn.close()
+
+    return officialIDs, secondaryIDs, mgiNumber, users
+
+#
+# Purpose: Create the temp table mcvQC.py loads the input file into,
+#	as mcvQC.sh does
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: creates the table
+# Throws: Nothing
+#
+def createTempTable (sqliteFile, tempTable):
+    conn = sqlite3.connect(sqliteFile)
+    conn.execute('''create table %s (
+        termID text null,
+        mgiID text not null,
+        jNum text null,
+        evidCode text null,
+        editor text null)''' % tempTable)
+    for column in ['termID', 'mgiID', 'jNum', 'evidCode', 'editor']:
+        conn.execute('create index idx_%s on %s (lower(%s))' % \
+            (column, tempTable, column))
+    conn.commit()
+    conn.close()
+
+#
+# Purpose: Create a QC-ready input file of annotations to official
+#	markers, with a fraction of the rows having an invalid value
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: creates the input file
+# Throws: Nothing
+#
+def createInputFile (inputFile, numRows, errorRate, numRefs, officialIDs,
+        secondaryIDs, lastMgiNumber, users):
+    fpInput = open(inputFile, 'w')
+    for mgiID, termIDs in random.sample(officialIDs,
+            min(numRows, len(officialIDs))):
+        row = [random.choice(termIDs), mgiID,
+            'J:%s' % random.randint(1, numRefs),
+            random.choice(EVIDENCE_CODES), '', '', random.choice(users[1:]),
+            '', '', '']
+        if random.random() < errorRate:
+            error = random.randint(0, 5)
+            if error == 0:
+                row[0] = 'MCV:9999999'
+            elif error == 1:
+                row[1] = 'MGI:%s' % (lastMgiNumber + random.randint(1, 1000))
+            elif error == 2 and secondaryIDs != []:
+                row[1] = random.choice(secondaryIDs)
+            elif error == 3:
+                row[2] = 'J:%s' % (numRefs + random.randint(1, 1000))
+            elif error == 4:
+                row[3] = 'XX'
+            else:
+                row[6] = 'nobody'
+        fpInput.write(TAB.join(row) + NL)
+    fpInput.close()
+
+#
+# Main
+#
+try:
+    opts, args = getopt.getopt(sys.argv[1:], '', ['markers=', 'refs=',
+        'extra-accessions=', 'input=', 'input-rows=', 'error-rate=',
+        'temp-table=', 'seed='])
+except getopt.GetoptError:
+    print(USAGE)
+    sys.exit(1)
+
+if len(args) != 1:
+    print(USAGE)
+    sys.exit(1)
+
+numMarkers = 50000
+numRefs = 20000
+numExtra = 0
+inputFile = None
+numRows = 1000
+errorRate = 0.01
+tempTable = None
+seed = 1
+for opt, value in opts:
+    if opt == '--markers':
+        numMarkers = int(value)
+    elif opt == '--refs':
+        numRefs = int(value)
+    elif opt == '--extra-accessions':
+        numExtra = int(value)
+    elif opt == '--input':
+        inputFile = value
+    elif opt == '--input-rows':
+        numRows = int(value)
+    elif opt == '--error-rate':
+        errorRate = float(value)
+    elif opt == '--temp-table':
+        tempTable = value
+    elif opt == '--seed':
+        seed = int(value)
+
+random.seed(seed)
+sqliteFile = args[0]
+officialIDs, secondaryIDs, lastMgiNumber, users = \
+    createFixture(sqliteFile, numMarkers, numRefs, numExtra)
+if tempTable != None:
+    createTempTable(sqliteFile, tempTable)
+if inputFile != None:
+    createInputFile(inputFile, numRows, errorRate, numRefs, officialIDs,
+        secondaryIDs, lastMgiNumber, users)
@@ -7,7 +7,10 @@
 #
 # Usage:
 #	
-#       mcvAnnotByFeature.py
+#       mcvAnnotByFeature.py [--profile] [--trace-memory]
+#
+#	The report is implemented in mcvReports.py, which can run it
+#	together with the other MCV reports in one session.
 #
 # History:
 #
@@ -16,56 +19,12 @@
 #
 '''
  
-import sys 
-import db
-import reportlib
-
-CRT = reportlib.CRT
-SPACE = reportlib.SPACE
-TAB = reportlib.TAB
-PAGE = reportlib.PAGE
+import mcvReports
+import mcvProfile
 
 #
 # Main
 #
 
-fp = reportlib.init(sys.argv[0], '')
-
-#
-# cmd = sys.argv[1]
-#
-# or
-#
-# cmd = 'select * from MRK_Marker where _Species_key = 1 and chromosome = "1"'
-#
-
-cmds = []
-
-cmds.append('''select t.term as feature, 0 as featureCount
-        into temp notUsed
-        from VOC_Term t
-        where t._Vocab_key = 79
-        and not exists (select 1
-        from VOC_annot va 
-        where va._AnnotType_key = 1011
-                and va._Term_key = t._Term_key)''')
-
-cmds.append('''select va.*, t.term as feature
-        into temp mcv
-        from VOC_Annot va left outer join
-        VOC_Term t on t._term_key = va._term_key
-        where va._AnnotType_key = 1011''')
-
-cmds.append('''select feature, count(feature) as featureCount
-        from mcv
-        group by feature
-        union
-        select feature, featureCount
-        from notUsed
-        order by feature''')
-
-results = db.sql(cmds, 'auto')
-
-fp.write('MCV Annotations by Feature%s%s' %(CRT, CRT))
-for r in results[2]:
-    fp.write('%s%s%s%s' % (r['feature'], TAB, r['featureCount'], CRT))
+mcvProfile.init('mcvAnnotByFeature')
+mcvReports.run(['mcvAnnotByFeature'])
@@ -0,0 +1,278 @@
+#
+#  mcvArchive.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script maintains the archive of the load input files. Each
+#	distinct input file is stored once, gzip compressed and named by
+#	the SHA-256 digest of its content. An input file published
+#	compressed (see mcvInput.py) is archived by its uncompressed
+#	content. Every archive request adds a
+#	line to the archive index, so the index records when each version
+#	was loaded even if its content was stored before.
+#
+#  Usage:
+#
+#      mcvArchive.py  store  filename
+#      mcvArchive.py  list
+#      mcvArchive.py  cat  version
+#      mcvArchive.py  diff  [ oldVersion  [ newVersion ] ]
+#
+#      where:
+#          filename = path to the input file to archive
+#          version = a timestamp from the index, a digest or the
+#                    beginning of a digest
+#
+#      store - archive the file, printing its digest
+#      list - print the index
+#      cat - write an archived version to stdout
+#      diff - write the differences between two archived versions to
+#             stdout, by default between the last two archived versions.
+#             Versions with the same digest are not read, the others
+#             are decompressed to temporary files and compared by the
+#             system diff command.
+#
+#  Env Vars:
+#
+#      INPUT_ARCHIVEDIR
+#
+#  Inputs:
+#
+#      - Input file to archive
+#
+#  Outputs:
+#
+#      - Compressed input file (${INPUT_ARCHIVEDIR}/digest.gz)
+#
+#      - Archive index (${INPUT_ARCHIVEDIR}/index.txt) with the following
+#        tab-delimited fields:
+#
+#        1. Timestamp (YYYYMMDD.HHMM)
+#        2. SHA-256 digest of the content
+#        3. Size of the content in bytes
+#        4. Path of the archived file
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import gzip
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import mcvInput
+
+USAGE = '''Usage: mcvArchive.py  store  inputFile
+       mcvArchive.py  list
+       mcvArchive.py  cat  version
+       mcvArchive.py  diff  [ oldVersion  [ newVersion ] ]'''
+
+TAB = '\t'
+NL = '\n'
+
+# read/write buffer size
+BUFSIZE = 1024 * 1024
+
+archiveDir = os.environ['INPUT_ARCHIVEDIR']
+indexFile = os.path.join(archiveDir, 'index.txt')
+
+#
+# Purpose: Get the path of the compressed file for a digest
+# Returns: the path
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def objectFile (digest):
+    return os.path.join(archiveDir, digest + '.gz')
+
+#
+# Purpose: Read the archive index
+# Returns: list of [timestamp, digest, size, fileName]
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def readIndex ():
+    index = []
+    if not os.path.exists(indexFile):
+        return index
+    fpIndex = open(indexFile, 'r')
+    for line in fpIndex.readlines():
+        index.append(str.split(line[:-1], TAB))
+    fpIndex.close()
+    return index
+
+#
+# Purpose: Find the digest of an archived version
+# Returns: the digest
+# Assumes: Nothing
+# Effects: exits if the version is not in the index or is ambiguous
+# Throws: Nothing
+#
+def findVersion (version):
+    digests = []
+    for timestamp, digest, size, fileName in readIndex():
+        if (timestamp == version or digest.startswith(version)) \
+                and digest not in digests:
+            digests.append(digest)
+    if len(digests) != 1:
+        print('Archived version not found or not unique: ' + version)
+        sys.exit(1)
+    return digests[0]
+
+#
+# Purpose: Archive an input file
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: stores the compressed file if its content is not archived yet,
+#	adds a line to the index, exits if the input file cannot be read
+# Throws: Nothing
+#
+def store (inputFile):
+    if not os.path.isdir(archiveDir):
+        os.makedirs(archiveDir)
+
+    # compress to a temp file while computing the digest, the content
+    # is read once
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmpFile = tempfile.mkstemp(dir=archiveDir)
+    fpTmp = gzip.open(os.fdopen(fd, 'wb'), 'wb')
+    try:
+        try:
+            fpInput = mcvInput.openInput(inputFile, 'rb')
+            while True:
+                block = fpInput.read(BUFSIZE)
+                if not block:
+                    break
+                sha.update(block)
+                size = size + len(block)
+                fpTmp.write(block)
+            fpInput.close()
+        except IOError as e:
+            print('Cannot read input file: %s (%s)' % (inputFile, e))
+            sys.exit(1)
+        fpTmp.close()
+
+        digest = sha.hexdigest()
+        if not os.path.exists(objectFile(digest)):
+            os.chmod(tmpFile, 0o664)
+            os.rename(tmpFile, objectFile(digest))
+    finally:
+        # the temp file is left when the content is archived already or
+        # the input file cannot be read
+        fpTmp.close()
+        if os.path.exists(tmpFile):
+            os.remove(tmpFile)
+
+    fpIndex = open(indexFile, 'a')
+    fpIndex.write(TAB.join([time.strftime('%Y%m%d.%H%M'), digest, str(size),
+        os.path.abspath(inputFile)]) + NL)
+    fpIndex.close()
+
+    print(digest)
+
+#
+# Purpose: Write an archived version to stdout
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def cat (version):
+    fpObject = gzip.open(objectFile(findVersion(version)), 'rb')
+    shutil.copyfileobj(fpObject, sys.stdout.buffer, BUFSIZE)
+    fpObject.close()
+
+#
+# Purpose: Decompress an archived version to a temporary file
+# Returns: the path of the temporary file
+# Assumes: Nothing
+# Effects: creates the temporary file
+# Throws: IOError if the version cannot be read
+#
+def extract (digest):
+    fd, tmpFile = tempfile.mkstemp(prefix='mcvArchive.')
+    fpTmp = os.fdopen(fd, 'wb')
+    fpObject = gzip.open(objectFile(digest), 'rb')
+    shutil.copyfileobj(fpObject, fpTmp, BUFSIZE)
+    fpObject.close()
+    fpTmp.close()
+    return tmpFile
+
+#
+# Purpose: Write the differences between two archived versions to stdout
+# Returns: Nothing
+# Assumes: the diff command is installed
+# Effects: Nothing
+# Throws: Nothing
+#
+def diff (versions):
+    if len(versions) == 2:
+        oldDigest = findVersion(versions[0])
+        newDigest = findVersion(versions[1])
+    else:
+        index = readIndex()
+        if len(index) < 2:
+            print('Fewer than two archived versions')
+            sys.exit(1)
+        newDigest = index[-1][1]
+        oldDigest = index[-2][1]
+        if len(versions) == 1:
+            oldDigest = findVersion(versions[0])
+
+    if oldDigest == newDigest:
+        return
+
+    # the versions are streamed to disk, diff does not read them into
+    # memory and is linear on versions which differ in a few lines
+    oldFile = extract(oldDigest)
+    newFile = extract(newDigest)
+    sys.stdout.flush()
+    try:
+        rc = subprocess.call(['diff', '-u', '--label', oldDigest,
+            '--label', newDigest, oldFile, newFile])
+    finally:
+        os.remove(oldFile)
+        os.remove(newFile)
+
+    # diff exits 1 if the versions differ, 2 on an error
+    if rc > 1:
+        print('Cannot diff versions %s and %s' % (oldDigest, newDigest))
+        sys.exit(1)
+
+#
+# Main
+#
+if len(sys.argv) < 2:
+    print(USAGE)
+    sys.exit(1)
+
+command = sys.argv[1]
+if command == 'store' and len(sys.argv) == 3:
+    store(sys.argv[2])
+elif command == 'list' and len(sys.argv) == 2:
+    for line in readIndex():
+        print(TAB.join(line))
+elif command == 'cat' and len(sys.argv) == 3:
+    cat(sys.argv[2])
+elif command == 'diff' and len(sys.argv) <= 4:
+    diff(sys.argv[2:])
+else:
+    print(USAGE)
+    sys.exit(1)
@@ -0,0 +1,309 @@
+#
+#  mcvCheckpoint.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script maintains the checkpoint manifest of the load, so a
+#	load which failed is resumed at its first incomplete stage when
+#	it is run again on the same input file and configuration. Each
+#	completed stage is recorded in the manifest with the artifacts it
+#	created for the later stages, and a copy of these artifacts is
+#	kept with the manifest because the output directory is archived
+#	and cleaned by each run of the load.
+#
+#  Usage:
+#
+#      mcvCheckpoint.py  start  inputFile  configFile  [ configFile ... ]
+#      mcvCheckpoint.py  done  stage
+#      mcvCheckpoint.py  complete  stage  [ artifact ... ]
+#      mcvCheckpoint.py  clear
+#
+#      where:
+#          inputFile = path to the load input file
+#          configFile = path to a configuration file of the load
+#          stage = name of a stage (see STAGES)
+#          artifact = path to a file created by the stage
+#
+#      start - check the manifest against the digests of the input file
+#              and the configuration files. If they match, the artifacts
+#              of the completed stages are restored, else the manifest
+#              is reset.
+#      done - exit 0 if the stage is complete, 1 if not
+#      complete - record the stage and its artifacts
+#      clear - remove the manifest and the artifacts, once the load has
+#              completed
+#
+#  Env Vars:
+#
+#      CHECKPOINT_DIR
+#
+#  Inputs:
+#
+#      - Checkpoint manifest (${CHECKPOINT_DIR}/manifest.txt) with the
+#        following tab-delimited lines:
+#
+#        input  SHA-256 digest of the input file
+#        config  SHA-256 digest of the configuration files
+#        stage  stage  timestamp (YYYYMMDD.HHMM)
+#        artifact  stage  path  SHA-256 digest
+#
+#  Outputs:
+#
+#      - Checkpoint manifest (${CHECKPOINT_DIR}/manifest.txt)
+#
+#      - Copies of the artifacts (${CHECKPOINT_DIR}/stage/file name)
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred, or the stage is not complete (done)
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      A stage is only complete if the stages before it are complete and
+#      its artifacts can be restored with the digests recorded, so the
+#      load resumes at the first stage that has not completed. The
+#      manifest is replaced at once, a run which fails while recording
+#      a stage leaves the previous manifest.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import shutil
+import hashlib
+
+USAGE = '''Usage: mcvCheckpoint.py  start  inputFile  configFile  [ configFile ... ]
+       mcvCheckpoint.py  done  stage
+       mcvCheckpoint.py  complete  stage  [ artifact ... ]
+       mcvCheckpoint.py  clear'''
+
+TAB = '\t'
+NL = '\n'
+
+# read buffer size
+BUFSIZE = 1024 * 1024
+
+# the stages of the load, in the order they are run
+STAGES = ['qc', 'annotload', 'archive']
+
+checkpointDir = os.environ['CHECKPOINT_DIR']
+manifestFile = os.path.join(checkpointDir, 'manifest.txt')
+
+#
+# Purpose: Get the SHA-256 digest of the content of files
+# Returns: the hex digest
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: IOError if a file cannot be read
+#
+def getDigest (fileNames):
+    sha = hashlib.sha256()
+    for fileName in fileNames:
+        fp = open(fileName, 'rb')
+        while True:
+            block = fp.read(BUFSIZE)
+            if not block:
+                break
+            sha.update(block)
+        fp.close()
+    return sha.hexdigest()
+
+#
+# Purpose: Get the path of the copy of an artifact
+# Returns: the path
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def copyFile (stage, artifact):
+    return os.path.join(checkpointDir, stage, os.path.basename(artifact))
+
+#
+# Purpose: Read the manifest
+# Returns: list of the lines, each a list of fields
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def readManifest ():
+    manifest = []
+    if not os.path.exists(manifestFile):
+        return manifest
+    fpManifest = open(manifestFile, 'r')
+    for line in fpManifest.readlines():
+        manifest.append(str.split(line[:-1], TAB))
+    fpManifest.close()
+    return manifest
+
+#
+# Purpose: Replace the manifest
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes the manifest
+# Throws: Nothing
+#
+def writeManifest (manifest):
+    if not os.path.isdir(checkpointDir):
+        os.makedirs(checkpointDir)
+
+    tmpFile = '%s.%s' % (manifestFile, os.getpid())
+    fpManifest = open(tmpFile, 'w')
+    for fields in manifest:
+        fpManifest.write(TAB.join(fields) + NL)
+    fpManifest.close()
+    os.rename(tmpFile, manifestFile)
+
+#
+# Purpose: Get the completed stages of the manifest
+# Returns: list of the stage names
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getStages (manifest):
+    stages = []
+    for fields in manifest:
+        if fields[0] == 'stage':
+            stages.append(fields[1])
+    return stages
+
+#
+# Purpose: Remove the copies of the artifacts of a stage
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: removes files
+# Throws: Nothing
+#
+def removeCopies (stage):
+    stageDir = os.path.join(checkpointDir, stage)
+    if os.path.isdir(stageDir):
+        shutil.rmtree(stageDir)
+
+#
+# Purpose: Restore the artifacts of a stage, from their copies if they
+#	are missing or have changed
+# Returns: 1 if all the artifacts are restored, 0 if not
+# Assumes: Nothing
+# Effects: copies files
+# Throws: Nothing
+#
+def restore (manifest, stage):
+    for fields in manifest:
+        if fields[0] != 'artifact' or fields[1] != stage:
+            continue
+        artifact, digest = fields[2:4]
+        if os.path.exists(artifact) and getDigest([artifact]) == digest:
+            continue
+        copy = copyFile(stage, artifact)
+        if not os.path.exists(copy) or getDigest([copy]) != digest:
+            print('Cannot restore %s of stage %s' % (artifact, stage))
+            return 0
+        shutil.copyfile(copy, artifact)
+        print('Restored %s of stage %s' % (artifact, stage))
+    return 1
+
+#
+# Purpose: Check the manifest against the input file and configuration,
+#	and restore the artifacts of the completed stages
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: rewrites the manifest, restores the artifacts
+# Throws: Nothing
+#
+def start (inputFile, configFiles):
+    inputDigest = getDigest([inputFile])
+    configDigest = getDigest(configFiles)
+    manifest = readManifest()
+
+    if ['input', inputDigest] not in manifest or \
+            ['config', configDigest] not in manifest:
+        if manifest != []:
+            print('The input file or the configuration has changed, all stages are run')
+        for stage in STAGES:
+            removeCopies(stage)
+        writeManifest([['input', inputDigest], ['config', configDigest]])
+        return
+
+    # keep the stages completed in order whose artifacts are restored
+    completed = getStages(manifest)
+    keepStages = []
+    for stage in STAGES:
+        if stage not in completed or not restore(manifest, stage):
+            break
+        keepStages.append(stage)
+
+    newManifest = []
+    for fields in manifest:
+        if fields[0] in ('input', 'config') or fields[1] in keepStages:
+            newManifest.append(fields)
+    for stage in STAGES:
+        if stage not in keepStages:
+            removeCopies(stage)
+    writeManifest(newManifest)
+
+    if keepStages != []:
+        print('Resume after stage: %s (completed %s)' % (keepStages[-1],
+            ', '.join(keepStages)))
+
+#
+# Purpose: Record a completed stage and its artifacts
+# Returns: Nothing
+# Assumes: start has been run
+# Effects: copies the artifacts, rewrites the manifest
+# Throws: Nothing
+#
+def complete (stage, artifacts):
+    manifest = readManifest()
+    if stage in getStages(manifest):
+        return
+
+    removeCopies(stage)
+    os.makedirs(os.path.join(checkpointDir, stage))
+    for artifact in artifacts:
+        shutil.copyfile(artifact, copyFile(stage, artifact))
+        manifest.append(['artifact', stage, os.path.abspath(artifact),
+            getDigest([artifact])])
+    manifest.append(['stage', stage, time.strftime('%Y%m%d.%H%M')])
+    writeManifest(manifest)
+
+#
+# Purpose: Remove the manifest and the copies of the artifacts
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: removes files
+# Throws: Nothing
+#
+def clear ():
+    for stage in STAGES:
+        removeCopies(stage)
+    if os.path.exists(manifestFile):
+        os.remove(manifestFile)
+
+#
+# Main
+#
+if len(sys.argv) < 2:
+    print(USAGE)
+    sys.exit(1)
+
+command = sys.argv[1]
+if command == 'start' and len(sys.argv) >= 4:
+    start(sys.argv[2], sys.argv[3:])
+elif command == 'done' and len(sys.argv) == 3 and sys.argv[2] in STAGES:
+    if sys.argv[2] not in getStages(readManifest()):
+        sys.exit(1)
+elif command == 'complete' and len(sys.argv) >= 3 and sys.argv[2] in STAGES:
+    complete(sys.argv[2], sys.argv[3:])
+elif command == 'clear' and len(sys.argv) == 2:
+    clear()
+else:
+    print(USAGE)
+    sys.exit(1)
+sys.exit(0)
@@ -0,0 +1,287 @@
+#
+#  mcvIdArray.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This module checks IDs of the form prefix:number (MGI, J, MCV and
+#	SO IDs) in bulk with numpy: the IDs are encoded as 64 bit integers
+#	and looked up in a sorted array of the encoded reference IDs, which
+#	can be saved to disk and memory-mapped by a later run.
+#
+#	Run as a script, it benchmarks the numpy lookups against the set
+#	lookups of mcvQC.py on the ID columns of an input file.
+#
+#  Usage:
+#
+#      import mcvIdArray
+#      if mcvIdArray.numpy != None:
+#          reference = mcvIdArray.buildReference(idSet)
+#          missing = mcvIdArray.findMissing(reference, ids)
+#
+#      mcvIdArray.py  bench  filename  [ arrayDir ]
+#
+#      where:
+#          filename = path to the input file, plain or compressed
+#                     (see mcvInput.py)
+#          arrayDir = directory the reference arrays are saved to and
+#                     memory-mapped from
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      An ID is encoded, in lower case, as its prefix of 1 to 3 characters
+#      (7 bits each, bits 41 to 61), the number of digits of its number
+#      (1 to 11, bits 37 to 40) and its number (bits 0 to 36), so two
+#      different IDs never have the same code. All the IDs of a list are
+#      encoded together from a single buffer of their characters, the IDs
+#      which cannot be encoded are looked up in a set.
+#
+#      The encoding still has to copy each ID out of its Python string, so
+#      it takes longer than the set lookups it replaces (see the bench
+#      command), the sorted arrays take less memory than the sets.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+USAGE = 'Usage: mcvIdArray.py  bench  filename  [ arrayDir ]'
+
+TAB = '\t'
+NL = '\n'
+
+MAX_PREFIX = 3
+MAX_DIGITS = 11
+
+# the input columns benchmarked
+# Looks like [ [ID type, column index], ...]
+BENCH_COLUMNS = [['termID', 0], ['mgiID', 1], ['jNum', 2]]
+
+#
+# Purpose: Encode IDs as 64 bit integers
+# Returns: [codes, encoded], numpy arrays of the code of each ID and of
+#	whether it could be encoded
+# Assumes: numpy is installed
+# Effects: Nothing
+# Throws: Nothing
+#
+def encodeIds (ids):
+    count = len(ids)
+    if count == 0:
+        return [numpy.zeros(0, numpy.int64), numpy.zeros(0, bool)]
+
+    # non-ASCII characters become '?', which no reference ID has
+    chars = numpy.frombuffer(
+        (NL.join(ids) + NL).encode('ascii', 'replace'), numpy.uint8)
+    upper = (chars >= ord('A')) & (chars <= ord('Z'))
+    chars = (chars | (upper.astype(numpy.uint8) << 5)).astype(numpy.int64)
+
+    # the ID of each character, its position in the ID and the ID length
+    ends = numpy.flatnonzero(chars == ord(NL))
+    starts = numpy.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts
+    idIndex = numpy.repeat(numpy.arange(count), lengths + 1)
+    position = numpy.arange(len(chars)) - starts[idIndex]
+
+    # the position of the first colon of each ID
+    colons = numpy.flatnonzero(chars == ord(':'))
+    colonCounts = numpy.bincount(idIndex[colons], minlength=count)
+    colonAt = numpy.zeros(count, numpy.int64)
+    colonAt[idIndex[colons][::-1]] = position[colons][::-1]
+    digitCounts = lengths - colonAt - 1
+
+    charColon = colonAt[idIndex]
+    inPrefix = position < charColon
+    inNumber = (position > charColon) & (position < lengths[idIndex])
+    digits = chars - ord('0')
+    notDigit = inNumber & ((digits < 0) | (digits > 9))
+
+    encoded = (colonCounts == 1) & (colonAt >= 1) & \
+        (colonAt <= MAX_PREFIX) & (digitCounts >= 1) & \
+        (digitCounts <= MAX_DIGITS) & \
+        (numpy.bincount(idIndex[notDigit], minlength=count) == 0)
+
+    # the encoded IDs are shorter than 16 characters, the sums fit in
+    # the 53 bit integers of the float64 bincount
+    power = numpy.clip(lengths[idIndex] - 1 - position, 0, MAX_DIGITS)
+    numbers = numpy.bincount(idIndex,
+        weights=numpy.where(inNumber & ~notDigit, digits * 10 ** power, 0),
+        minlength=count).astype(numpy.int64)
+    shift = 7 * numpy.clip(charColon - 1 - position, 0, MAX_PREFIX - 1)
+    prefixes = numpy.bincount(idIndex,
+        weights=numpy.where(inPrefix, chars << shift, 0),
+        minlength=count).astype(numpy.int64)
+
+    codes = (prefixes << 41) | (digitCounts << 37) | numbers
+    return [numpy.where(encoded, codes, 0), encoded]
+
+#
+# Purpose: Build the reference of a set of IDs
+# Returns: [sorted array of the ID codes, set of the IDs which cannot
+#	be encoded]
+# Assumes: numpy is installed, the IDs are in lower case
+# Effects: Nothing
+# Throws: Nothing
+#
+def buildReference (idSet):
+    ids = list(idSet)
+    codes, encoded = encodeIds(ids)
+    others = set()
+    for i in numpy.flatnonzero(~encoded):
+        others.add(ids[i])
+    return [numpy.unique(codes[encoded]), others]
+
+#
+# Purpose: Find the IDs of a list which are not in a reference
+# Returns: list of the indexes of the missing IDs, in list order
+# Assumes: numpy is installed
+# Effects: Nothing
+# Throws: Nothing
+#
+def findMissing (reference, ids):
+    refCodes, others = reference
+    codes, encoded = encodeIds(ids)
+
+    if len(refCodes) == 0:
+        found = numpy.zeros(len(ids), bool)
+    else:
+        index = numpy.minimum(numpy.searchsorted(refCodes, codes),
+            len(refCodes) - 1)
+        found = encoded & (refCodes[index] == codes)
+
+    missing = []
+    for i in numpy.flatnonzero(~found):
+        if encoded[i] or ids[i].lower() not in others:
+            missing.append(int(i))
+    return missing
+
+#
+# Purpose: Save a reference to disk
+# Returns: Nothing
+# Assumes: numpy is installed
+# Effects: replaces the files arrayDir/name.npy and arrayDir/name.txt
+# Throws: IOError if the files cannot be written
+#
+def saveReference (arrayDir, name, reference):
+    refCodes, others = reference
+    base = os.path.join(arrayDir, name)
+
+    # the files are replaced at once, a run never maps a partial array
+    tmpFile = '%s.%s.npy' % (base, os.getpid())
+    numpy.save(tmpFile, refCodes)
+    os.rename(tmpFile, base + '.npy')
+
+    tmpFile = '%s.%s.txt' % (base, os.getpid())
+    fp = open(tmpFile, 'w')
+    for id in others:
+        fp.write(id + NL)
+    fp.close()
+    os.rename(tmpFile, base + '.txt')
+
+#
+# Purpose: Load a reference saved to disk, memory-mapping its array
+# Returns: the reference, None if it has not been saved
+# Assumes: numpy is installed
+# Effects: Nothing
+# Throws: Nothing
+#
+def loadReference (arrayDir, name):
+    base = os.path.join(arrayDir, name)
+    if not os.path.exists(base + '.npy') or not os.path.exists(base + '.txt'):
+        return None
+
+    others = set()
+    fp = open(base + '.txt', 'r')
+    for line in fp:
+        others.add(line[:-1])
+    fp.close()
+    return [numpy.load(base + '.npy', mmap_mode='r'), others]
+
+#
+# Purpose: Benchmark the numpy lookups against the set lookups on the
+#	ID columns of an input file. The reference of a column is the set
+#	of its IDs without every tenth ID, so both lookups find missing IDs.
+# Returns: Nothing
+# Assumes: numpy is installed
+# Effects: saves the reference arrays to arrayDir, if given
+# Throws: IOError if the input file cannot be read
+#
+def bench (inputFile, arrayDir):
+    import mcvInput
+
+    # Looks like {ID type:[ID, ...], ...}
+    columns = {}
+    for idType, index in BENCH_COLUMNS:
+        columns[idType] = []
+    for lineNum, line in mcvInput.readQCLines(inputFile):
+        tokens = str.split(line, TAB)
+        for idType, index in BENCH_COLUMNS:
+            if index < len(tokens):
+                columns[idType].append(tokens[index])
+            else:
+                columns[idType].append('')
+
+    for idType, index in BENCH_COLUMNS:
+        ids = columns[idType]
+        idSet = set()
+        for id in sorted(set(map(str.lower, ids)))[1::10]:
+            idSet.add(id)
+        idSet = set(map(str.lower, ids)) - idSet
+
+        start = time.time()
+        setMissing = []
+        for i in range(len(ids)):
+            if ids[i].lower() not in idSet:
+                setMissing.append(i)
+        setSeconds = time.time() - start
+
+        reference = buildReference(idSet)
+        if arrayDir != None:
+            saveReference(arrayDir, idType, reference)
+            reference = loadReference(arrayDir, idType)
+
+        start = time.time()
+        arrayMissing = findMissing(reference, ids)
+        arraySeconds = time.time() - start
+
+        if arrayMissing != setMissing:
+            print('%s: the lookups differ' % idType)
+            sys.exit(1)
+        print('%s: %s IDs, %s missing, set %.3f seconds, numpy %.3f seconds' % \
+            (idType, len(ids), len(setMissing), setSeconds, arraySeconds))
+
+#
+# Main
+#
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != 'bench':
+        print(USAGE)
+        sys.exit(1)
+
+    if numpy == None:
+        print('The numpy module is not installed')
+        sys.exit(1)
+
+    arrayDir = None
+    if len(sys.argv) == 4:
+        arrayDir = sys.argv[3]
+    try:
+        bench(sys.argv[2], arrayDir)
+    except IOError as e:
+        print('Cannot read input file: %s (%s)' % (sys.argv[2], e))
+        sys.exit(1)
@@ -0,0 +1,244 @@
+#
+#  mcvInput.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This module opens the load input files for reading, whether they
+#	are plain text or compressed with gzip or zstd. The compression is
+#	found from the first bytes of the file, not from its name, so a
+#	compressed file can be published under the name the load expects.
+#	Compressed files are read as a stream, they are never expanded
+#	on disk.
+#
+#	Run as a script, it writes the content of an input file to stdout
+#	for the wrapper scripts to read.
+#
+#  Usage:
+#
+#      import mcvInput
+#      fp = mcvInput.openInput(fileName)
+#      for lineNum, line in mcvInput.readQCLines(fileName): ...
+#
+#      mcvInput.py  cat  filename
+#
+#      where:
+#          filename = path to the input file
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      gzip files are read with the gzip module. zstd files are read with
+#      the zstandard module if it is installed, else through the zstd
+#      command. A corrupt or truncated compressed file raises IOError
+#      when it is read.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import re
+import io
+import gzip
+import zlib
+import shutil
+import subprocess
+
+USAGE = 'Usage: mcvInput.py  cat  filename'
+
+# read/write buffer size
+BUFSIZE = 1024 * 1024
+
+TAB = '\t'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# the file name suffixes of the compressed files
+SUFFIXES = ['.gz', '.zst']
+
+ALNUM_RE = re.compile('[0-9A-Za-z]')
+
+#
+# Purpose: Find the compression of a file from its first bytes
+# Returns: 'gzip', 'zstd' or None for a plain file
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: IOError if the file cannot be read
+#
+def getCompression (fileName):
+    fp = open(fileName, 'rb')
+    magic = fp.read(4)
+    fp.close()
+
+    if magic[:2] == GZIP_MAGIC:
+        return 'gzip'
+    elif magic == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+#
+# Reads a decompressed stream, raising IOError for the errors of the
+# decompressor, so a corrupt or truncated file is reported as a file
+# which cannot be read.
+#
+class CheckedReader (io.RawIOBase):
+
+    def __init__ (self, fp, errors):
+        self.fp = fp
+        self.errors = errors
+
+    def readable (self):
+        return True
+
+    def readinto (self, buffer):
+        try:
+            return self.fp.readinto(buffer)
+        except self.errors as e:
+            raise IOError('corrupt or truncated file: %s' % e)
+
+    def close (self):
+        if not self.closed:
+            self.fp.close()
+        io.RawIOBase.close(self)
+
+#
+# Reads the output of a decompression process. At the end of the output
+# the process is waited for, so a corrupt or truncated file raises
+# IOError instead of being read as a short input.
+#
+class ProcessReader (io.RawIOBase):
+
+    def __init__ (self, process):
+        self.process = process
+
+    def readable (self):
+        return True
+
+    def readinto (self, buffer):
+        count = self.process.stdout.readinto(buffer)
+        if count == 0 and self.process.wait() != 0:
+            message = self.process.stderr.read().decode('utf-8', 'replace')
+            raise IOError('zstd: %s' % message.strip())
+        return count
+
+    def close (self):
+        if not self.closed:
+            # a file closed before its end stops the process
+            if self.process.poll() == None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process.stderr.close()
+        io.RawIOBase.close(self)
+
+#
+# Purpose: Open a zstd file for reading
+# Returns: binary file object of the decompressed content
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: IOError if the file cannot be read
+#
+def openZstd (fileName):
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+
+    if zstandard != None:
+        return CheckedReader(zstandard.ZstdDecompressor().stream_reader(
+            open(fileName, 'rb'), read_size=BUFSIZE, closefd=True),
+            zstandard.ZstdError)
+
+    try:
+        process = subprocess.Popen(['zstd', '-dc', fileName],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=BUFSIZE)
+    except OSError:
+        raise IOError('Cannot read zstd file (no zstandard module or zstd command): ' + fileName)
+    return ProcessReader(process)
+
+#
+# Purpose: Open an input file for reading, plain or compressed
+# Returns: file object, text ('r') or binary ('rb')
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: IOError if the file cannot be read
+#
+def openInput (fileName, mode = 'r'):
+    compression = getCompression(fileName)
+    if compression == None:
+        return open(fileName, mode)
+
+    if compression == 'gzip':
+        fp = CheckedReader(gzip.open(fileName, 'rb'), (EOFError, zlib.error))
+    else:
+        fp = openZstd(fileName)
+
+    if mode == 'rb':
+        return fp
+    return io.TextIOWrapper(io.BufferedReader(fp, BUFSIZE))
+
+#
+# Purpose: Get the name of an input file without its compression suffix
+# Returns: the file name
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def stripSuffix (fileName):
+    for suffix in SUFFIXES:
+        if fileName.endswith(suffix):
+            return fileName[:-len(suffix)]
+    return fileName
+
+#
+# Purpose: Read the lines of an input file as mcvQC.sh prepares them for
+#	the QC: the header is skipped, columns 1 thru 10 are kept, spaces
+#	and the Ctrl-M line ends are removed and blank lines are dropped
+# Returns: generator of [line number in the input file, line]
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: IOError if the file cannot be read
+#
+def readQCLines (fileName):
+    fpInput = openInput(fileName)
+    lineNum = 0
+    for line in fpInput:
+        lineNum = lineNum + 1
+        if lineNum == 1:
+            continue
+        line = str.replace(str.rstrip(line, '\r\n'), ' ', '')
+        if str.count(line, TAB) >= 10:
+            line = TAB.join(str.split(line, TAB)[0:10])
+        if ALNUM_RE.search(line) == None:
+            continue
+        yield [lineNum, line]
+    fpInput.close()
+
+#
+# Main
+#
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'cat':
+        print(USAGE)
+        sys.exit(1)
+
+    # the content is written to stdout, the errors to stderr
+    try:
+        fpInput = openInput(sys.argv[2], 'rb')
+    except IOError as e:
+        sys.stderr.write('Cannot open input file: %s (%s)\n' % (sys.argv[2], e))
+        sys.exit(1)
+    try:
+        shutil.copyfileobj(fpInput, sys.stdout.buffer, BUFSIZE)
+    except IOError as e:
+        sys.stderr.write('Cannot read input file: %s (%s)\n' % (sys.argv[2], e))
+        sys.exit(1)
+    fpInput.close()
@@ -0,0 +1,278 @@
+#
+#  mcvLint.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script runs fast checks on an mcv input file before it is
+#	published, without the database, so a malformed file is found
+#	when it is published instead of by the load. It checks the lines
+#	as mcvQC.sh prepares them for the QC: the first line is skipped as
+#	the header, columns 1 to 10 are used, spaces are removed and blank
+#	lines are dropped.
+#
+#  Usage:
+#
+#      mcvLint.py  filename
+#
+#      where:
+#          filename = path to the input file, plain or compressed
+#                     (see mcvInput.py)
+#
+#  Env Vars:
+#
+#      MCVLOAD_FILE_COLUMNS
+#      LINT_REFERENCE_CACHE
+#
+#  Inputs:
+#
+#      - mcv input file (see mcvQC.sh)
+#
+#      - Reference ID cache (${LINT_REFERENCE_CACHE}), written by the
+#        "live" run of mcvQC.py, with the following tab-delimited fields:
+#
+#        1. Type (termID, jNum, evidCode, editor)
+#        2. ID, in lower case
+#
+#        The term IDs, J numbers, evidence codes and editors are only
+#        checked against the database values if the cache exists.
+#
+#  Outputs:
+#
+#      - The errors and warnings, to stdout
+#
+#  Exit Codes:
+#
+#      0:  Successful completion, no errors
+#      1:  An exception occurred
+#      2:  Errors detected in the input file
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      Errors:
+#          - the first line is an annotation, not the header
+#          - lines with fewer than ${MCVLOAD_FILE_COLUMNS} columns
+#          - badly formed IDs, evidence codes or dates
+#          - duplicate lines (mcvQC.sh stops on these)
+#          - IDs not in the reference ID cache
+#
+#      Warnings:
+#          - blank lines (mcvQC.sh drops these)
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import re
+import time
+import mcvInput
+
+USAGE = 'Usage: mcvLint.py  inputFile'
+TAB = '\t'
+NL = '\n'
+
+# number of lines reported for each check, the rest are counted
+MAX_REPORTED = 20
+
+TERMID_RE = re.compile('^(MCV|SO):[0-9]{7}$', re.I)
+MGIID_RE = re.compile('^MGI:[0-9]+$', re.I)
+JNUM_RE = re.compile('^J:[0-9]+$', re.I)
+DATE_RE = re.compile('^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$')
+
+# the fields checked against the reference ID cache
+# Looks like [ [cache type, field index, field name], ...]
+REFERENCE_FIELDS = [
+    ['termID', 0, 'term ID'],
+    ['jNum', 2, 'J number'],
+    ['evidCode', 3, 'evidence code'],
+    ['editor', 6, 'editor'],
+    ]
+
+inputFile = None
+numColumns = int(os.environ['MCVLOAD_FILE_COLUMNS'])
+cacheFile = os.environ.get('LINT_REFERENCE_CACHE', '')
+
+# Looks like {check:[message, ...], ...}
+# the errors found by each check
+errors = {}
+errorCount = 0
+
+# Looks like {check:[message, ...], ...}
+warnings = {}
+
+# Looks like {cache type:set of IDs, ...}
+reference = {}
+
+#
+# Purpose: Note an error or a warning of a check
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def report (found, check, lineNum, message):
+    if check not in found:
+        found[check] = []
+    found[check].append('line %s: %s' % (lineNum, message))
+
+#
+# Purpose: Note an error of a check
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def error (check, lineNum, message):
+    global errorCount
+
+    errorCount = errorCount + 1
+    report(errors, check, lineNum, message)
+
+#
+# Purpose: Load the reference ID cache, if there is one
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadReference ():
+    if cacheFile == '' or not os.path.isfile(cacheFile):
+        return
+
+    fpCache = open(cacheFile, 'r')
+    for line in fpCache:
+        idType, id = str.split(line[:-1], TAB)
+        if idType not in reference:
+            reference[idType] = set()
+        reference[idType].add(id)
+    fpCache.close()
+
+    print('Reference IDs as of: %s' % \
+        time.strftime('%Y-%m-%d %H:%M', time.localtime(os.path.getmtime(cacheFile))))
+
+#
+# Purpose: Check the fields of an annotation line
+# Returns: Nothing
+# Assumes: the line has at least the expected number of columns
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def checkFields (lineNum, fields):
+    termID, mgiID, jNum, evidCode = fields[0:4]
+    editor = fields[6]
+    date = fields[7]
+
+    if termID != '' and not TERMID_RE.match(termID):
+        error('ID format', lineNum, 'term ID: %s' % termID)
+    if not MGIID_RE.match(mgiID):
+        error('ID format', lineNum, 'MGI ID: %s' % mgiID)
+    if jNum != '' and not JNUM_RE.match(jNum):
+        error('ID format', lineNum, 'J number: %s' % jNum)
+    if len(evidCode) > 5:
+        error('ID format', lineNum, 'evidence code: %s' % evidCode)
+    if date != '' and not DATE_RE.match(date):
+        error('ID format', lineNum, 'date: %s' % date)
+    if termID != '' and (jNum == '' or evidCode == '' or editor == ''):
+        error('Missing value', lineNum,
+            'J number, evidence code and editor are required')
+
+    for idType, index, name in REFERENCE_FIELDS:
+        if idType in reference and fields[index] != '' and \
+                fields[index].lower() not in reference[idType]:
+            error('Unknown ID', lineNum, '%s: %s' % (name, fields[index]))
+
+#
+# Purpose: Check the input file
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def lint ():
+    try:
+        fpInput = mcvInput.openInput(inputFile)
+    except:
+        print('Cannot open input file: ' + inputFile)
+        sys.exit(1)
+
+    # Looks like {line:first line number, ...}
+    lineNums = {}
+
+    lineNum = 0
+    for line in fpInput:
+        lineNum = lineNum + 1
+        line = str.rstrip(line, '\r\n')
+
+        # the same clean up as mcvQC.sh
+        fields = str.split(str.replace(line, ' ', ''), TAB)[0:10]
+
+        if lineNum == 1:
+            if TERMID_RE.match(fields[0]) or \
+                    (len(fields) > 1 and MGIID_RE.match(fields[1])):
+                error('Header', lineNum,
+                    'the first line is an annotation, the header is missing')
+            continue
+
+        if re.search('[0-9A-Za-z]', line) == None:
+            report(warnings, 'Blank line', lineNum, 'dropped by the QC')
+            continue
+
+        if len(fields) < numColumns:
+            error('Columns', lineNum, '%s columns, %s expected' % \
+                (len(fields), numColumns))
+            continue
+
+        key = TAB.join(fields)
+        if key in lineNums:
+            error('Duplicate line', lineNum,
+                'same as line %s' % lineNums[key])
+            continue
+        lineNums[key] = lineNum
+
+        checkFields(lineNum, fields)
+    fpInput.close()
+
+    if lineNum == 0:
+        error('Header', 0, 'the file is empty')
+
+    print('Lines checked: %s' % lineNum)
+
+#
+# Purpose: Write the errors and warnings of each check to stdout
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def writeReport (title, found):
+    for check in sorted(found.keys()):
+        messages = found[check]
+        print(NL + '%s: %s (%s)' % (title, check, len(messages)))
+        for message in messages[:MAX_REPORTED]:
+            print('    ' + message)
+        if len(messages) > MAX_REPORTED:
+            print('    ... %s more' % (len(messages) - MAX_REPORTED))
+
+#
+# Main
+#
+if len(sys.argv) != 2:
+    print(USAGE)
+    sys.exit(1)
+inputFile = sys.argv[1]
+
+start = time.time()
+loadReference()
+lint()
+writeReport('Warning', warnings)
+writeReport('Error', errors)
+print(NL + 'Lint %s in %.2f seconds' % (('passed', 'failed')[errorCount > 0],
+    time.time() - start))
+
+if errorCount > 0:
+    sys.exit(2)
+sys.exit(0)
@@ -0,0 +1,365 @@
+#
+#  mcvPartition.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script runs the annotation load in partitions: the annotation
+#	file is split by marker into disjoint partitions, which are loaded
+#	one after another by annotload runs. The annotations added by a
+#	partition which fails are rolled back and the partition is loaded
+#	again, and the logs of the partitions are combined into the log of
+#	the annotation load.
+#
+#  Usage:
+#
+#      mcvPartition.py  annotFile
+#
+#      where:
+#          annotFile = path to the annotation file created by mcvQC.py
+#
+#  Env Vars:
+#
+#      ANNOTLOAD_CSH
+#      CONFIG_ANNOTLOAD
+#      ANNOTLOAD_PARTITIONS
+#      ANNOTLOAD_RETRIES
+#      ANNOTLOAD_PARTITION_DIR
+#
+#  Inputs:
+#
+#      - Annotation file (annotFile), the lines of each marker together
+#
+#  Outputs:
+#
+#      - A directory for each partition (${ANNOTLOAD_PARTITION_DIR}/N)
+#        with its annotation file, annotload configuration file and the
+#        output and logs of its annotload runs
+#
+#      - Combined log of the partitions (annotFile.log)
+#
+#      - Records written to the database tables, or deleted when a
+#        partition is rolled back
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred, or a partition failed every run (the
+#          annotations added by all the partitions are rolled back)
+#
+#  Assumes:
+#
+#      - No other process adds MCV/Marker annotations or evidence while
+#        the partitions are loaded.
+#
+#  Implementation:
+#
+#      The markers are assigned, in file order, to the partition with the
+#      fewest lines, so the partitions are about the same size and the
+#      lines of a marker are always in one partition.
+#
+#      annotload takes the keys of the annotations and evidence it adds
+#      from the highest keys in the database when it starts, so the
+#      partitions are loaded one at a time. The highest annotation and
+#      evidence keys are noted before each run: the rows a run adds are
+#      the MCV/Marker annotations and evidence above these keys, and the
+#      notes of this evidence. When a run fails, these rows are deleted
+#      and the partition is loaded again, up to ${ANNOTLOAD_RETRIES} more
+#      times. The load is in append mode, so it deletes no rows and the
+#      rollback restores the database as it was before the run. When a
+#      partition fails every run, the rows added by all the partitions
+#      are deleted, so a resumed load (see mcvCheckpoint.py) loads the
+#      whole annotation file again.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import shutil
+import subprocess
+import db
+
+USAGE = 'Usage: mcvPartition.py  annotFile'
+
+TAB = '\t'
+NL = '\n'
+
+# the MGI ID column of the annotation file
+MGIID_COLUMN = 1
+
+# annotation type argument of annotload
+ANNOT_TYPE = 'mcv'
+
+# the MCV/Marker annotation type
+ANNOT_TYPE_KEY = 1011
+
+# the MGI type of the evidence notes
+EVIDENCE_MGITYPE_KEY = 25
+
+# annotation file, configuration file and output of a partition
+PARTITION_ANNOT = 'mcvload_annot.txt'
+PARTITION_CONFIG = 'annotload.csh.config'
+PARTITION_OUTPUT = 'annotload.out'
+
+# the highest annotation and evidence keys
+KEY_MARK = '''select coalesce(max(_Annot_key), 0) as annotKey,
+        (select coalesce(max(_AnnotEvidence_key), 0) from VOC_Evidence)
+        as evidenceKey
+    from VOC_Annot'''
+
+# the evidence added after a key mark, to the MCV/Marker annotations
+ADDED_EVIDENCE = '''select e._AnnotEvidence_key
+    from VOC_Evidence e, VOC_Annot a
+    where e._AnnotEvidence_key > %s
+    and e._Annot_key = a._Annot_key
+    and a._AnnotType_key = %s'''
+
+# delete the rows added after a key mark, the notes and properties of
+# the evidence first
+ROLLBACK = [
+    '''delete from MGI_Note
+    where _MGIType_key = %s
+    and _Object_key in (%s)''' % (EVIDENCE_MGITYPE_KEY, ADDED_EVIDENCE),
+    '''delete from VOC_Evidence_Property
+    where _AnnotEvidence_key in (%s)''' % ADDED_EVIDENCE,
+    '''delete from VOC_Evidence
+    where _AnnotEvidence_key in (%s)''' % ADDED_EVIDENCE,
+    '''delete from VOC_Annot
+    where _Annot_key > %%s
+    and _AnnotType_key = %s''' % ANNOT_TYPE_KEY,
+    ]
+
+annotloadCsh = os.environ['ANNOTLOAD_CSH']
+annotloadConfig = os.environ['CONFIG_ANNOTLOAD']
+partitionCount = int(os.environ['ANNOTLOAD_PARTITIONS'])
+retryCount = int(os.environ['ANNOTLOAD_RETRIES'])
+partitionDir = os.environ['ANNOTLOAD_PARTITION_DIR']
+
+#
+# Purpose: Split the annotation file into partitions
+# Returns: list of the partitions written, each [directory, markers, lines]
+# Assumes: the lines of a marker are together in the annotation file
+# Effects: replaces the partition directory
+# Throws: IOError if a file cannot be read or written
+#
+def split (annotFile):
+    if os.path.isdir(partitionDir):
+        shutil.rmtree(partitionDir)
+    os.makedirs(partitionDir)
+
+    # Looks like [[directory, fp, markers, lines], ...]
+    partitions = []
+    for i in range(partitionCount):
+        partitions.append([os.path.join(partitionDir, str(i + 1)), None, 0, 0])
+
+    partition = None
+    lastMgiID = None
+    fpAnnot = open(annotFile, 'r')
+    for line in fpAnnot:
+        mgiID = str.split(line, TAB)[MGIID_COLUMN].lower()
+        if mgiID != lastMgiID:
+            lastMgiID = mgiID
+            partition = min(partitions, key=lambda p: p[3])
+            if partition[1] == None:
+                os.makedirs(partition[0])
+                partition[1] = open(
+                    os.path.join(partition[0], PARTITION_ANNOT), 'w')
+            partition[2] = partition[2] + 1
+        partition[1].write(line)
+        partition[3] = partition[3] + 1
+    fpAnnot.close()
+
+    written = []
+    for directory, fp, markers, lines in partitions:
+        if fp == None:
+            continue
+        fp.close()
+        writeConfig(directory)
+        written.append([directory, markers, lines])
+    return written
+
+#
+# Purpose: Write the annotload configuration file of a partition, the
+#	configuration of the load with the files of the partition
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes the configuration file
+# Throws: IOError if the file cannot be written
+#
+def writeConfig (directory):
+    fpConfig = open(os.path.join(directory, PARTITION_CONFIG), 'w')
+    fpConfig.write('#!/bin/csh -f' + NL + NL)
+    fpConfig.write('source %s' % os.path.abspath(annotloadConfig) + NL + NL)
+    fpConfig.write('setenv ANNOTDATADIR\t%s' % os.path.abspath(directory) + NL)
+    fpConfig.write('setenv ANNOTINPUTFILE\t${ANNOTDATADIR}/%s' % \
+        PARTITION_ANNOT + NL)
+    fpConfig.write('setenv ANNOTLOG\t\t${ANNOTINPUTFILE}.log' + NL)
+    fpConfig.close()
+
+#
+# Purpose: Get the highest annotation and evidence keys
+# Returns: list [annotation key, evidence key]
+# Assumes: db.useOneConnection(1) has been called
+# Effects: Nothing
+# Throws: Nothing
+#
+def getKeyMark ():
+    results = db.sql(KEY_MARK, 'auto')
+    return [results[0]['annotKey'], results[0]['evidenceKey']]
+
+#
+# Purpose: Delete the MCV/Marker annotations and evidence added after a
+#	key mark
+# Returns: Nothing
+# Assumes: db.useOneConnection(1) has been called
+# Effects: deletes records in the database
+# Throws: Nothing
+#
+def rollBack (mark):
+    annotKey, evidenceKey = mark
+    for cmd in ROLLBACK[:-1]:
+        db.sql(cmd % (evidenceKey, ANNOT_TYPE_KEY), None)
+    db.sql(ROLLBACK[-1] % annotKey, None)
+    db.commit()
+
+#
+# Purpose: Run annotload on a partition
+# Returns: the exit code of annotload
+# Assumes: Nothing
+# Effects: appends the output of the run to the partition output file
+# Throws: OSError if annotload cannot be run
+#
+def runLoad (directory, attempt):
+    fpOutput = open(os.path.join(directory, PARTITION_OUTPUT), 'a')
+    fpOutput.write('%s run %s of %s%s' % \
+        (time.strftime('%Y/%m/%d %H:%M:%S'), attempt, retryCount + 1, NL))
+    fpOutput.flush()
+    rc = subprocess.call([annotloadCsh, PARTITION_CONFIG, ANNOT_TYPE],
+        cwd=directory, stdout=fpOutput, stderr=subprocess.STDOUT)
+    fpOutput.close()
+    return rc
+
+#
+# Purpose: Load the partitions one after another, rolling back a
+#	partition which fails and loading it again up to retryCount
+#	times. If a partition fails every run, the partitions loaded
+#	before it are rolled back too and the later ones are not loaded.
+# Returns: dictionary of the results of the partitions run
+#	Looks like {directory:[exit code, runs, seconds], ...}
+# Assumes: db.useOneConnection(1) has been called
+# Effects: runs annotload, deletes records in the database
+# Throws: OSError if annotload cannot be run
+#
+def load (partitions):
+    results = {}
+    loadMark = getKeyMark()
+
+    for directory, markers, lines in partitions:
+        name = os.path.basename(directory)
+        result = [None, 0, 0.0]
+        results[directory] = result
+
+        while result[0] != 0 and result[1] <= retryCount:
+            mark = getKeyMark()
+            result[1] = result[1] + 1
+            start = time.time()
+            try:
+                result[0] = runLoad(directory, result[1])
+            except OSError:
+                rollBack(loadMark)
+                raise
+            result[2] = result[2] + time.time() - start
+            if result[0] == 0:
+                print('Partition %s loaded (run %s)' % (name, result[1]))
+            else:
+                rollBack(mark)
+                print('Partition %s failed with exit code %s (run %s), its annotations are rolled back' % \
+                    (name, result[0], result[1]))
+            sys.stdout.flush()
+
+        if result[0] != 0:
+            rollBack(loadMark)
+            print('The annotations of the partitions loaded before partition %s are rolled back' % name)
+            sys.stdout.flush()
+            break
+
+    return results
+
+#
+# Purpose: Combine the output and logs of the partitions
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes the combined log
+# Throws: IOError if the log cannot be written
+#
+def writeLog (logFile, partitions, results):
+    fpLog = open(logFile, 'w')
+    for directory, markers, lines in partitions:
+        if directory not in results:
+            fpLog.write('Partition %s: %s markers, %s lines, not loaded%s' % \
+                (os.path.basename(directory), markers, lines, 2*NL))
+            continue
+        rc, runs, seconds = results[directory]
+        fpLog.write('Partition %s: %s markers, %s lines, exit code %s, %s runs, %.1f seconds%s' % \
+            (os.path.basename(directory), markers, lines, rc, runs,
+            seconds, NL))
+        for fileName in [PARTITION_OUTPUT, PARTITION_ANNOT + '.log']:
+            path = os.path.join(directory, fileName)
+            if not os.path.exists(path):
+                continue
+            fpLog.write(NL + '%s:%s' % (path, NL))
+            fpFile = open(path, 'r')
+            shutil.copyfileobj(fpFile, fpLog)
+            fpFile.close()
+        fpLog.write(NL)
+    fpLog.close()
+
+#
+# Main
+#
+if len(sys.argv) != 2:
+    print(USAGE)
+    sys.exit(1)
+
+annotFile = sys.argv[1]
+
+if partitionCount < 1 or retryCount < 0:
+    print('Invalid ANNOTLOAD_PARTITIONS or ANNOTLOAD_RETRIES')
+    sys.exit(1)
+
+try:
+    partitions = split(annotFile)
+except IOError as e:
+    print('Cannot split annotation file: %s (%s)' % (annotFile, e))
+    sys.exit(1)
+
+print('Split %s into %s partitions' % (annotFile, len(partitions)))
+sys.stdout.flush()
+
+start = time.time()
+db.useOneConnection(1)
+try:
+    results = load(partitions)
+except OSError as e:
+    print('Cannot run %s (%s)' % (annotloadCsh, e))
+    sys.exit(1)
+db.useOneConnection(0)
+
+writeLog(annotFile + '.log', partitions, results)
+
+failed = []
+for directory, markers, lines in partitions:
+    if directory in results and results[directory][0] != 0:
+        failed.append(os.path.basename(directory))
+
+if failed != []:
+    print('Partition %s failed every run, no partition is loaded, see %s' % \
+        (failed[0], annotFile + '.log'))
+    sys.exit(1)
+
+print('Loaded %s partitions in %.1f seconds, see %s' % \
+    (len(partitions), time.time() - start, annotFile + '.log'))
+sys.exit(0)
@@ -0,0 +1,294 @@
+#
+#  mcvProfile.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This module profiles the phases of mcvQC.py and the helper and
+#	report scripts: the time spent in each function (cProfile) and
+#	the memory allocated by each line (tracemalloc) during each phase
+#	are written to a profile directory of the run.
+#
+#	Run as a script, it prints the top hotspots of a profiled run.
+#
+#  Usage:
+#
+#      import mcvProfile
+#      mcvProfile.init('script')
+#      mcvProfile.runPhase('phase', function)
+#
+#      Profiling is switched on by the --profile and --trace-memory
+#      options of the script, which init() removes from sys.argv, or by
+#      the environment variables below.
+#
+#      mcvProfile.py  summary  runDir  [ count ]
+#
+#      where:
+#          runDir = profile directory of a run
+#          count = number of hotspots printed, 20 by default
+#
+#  Env Vars:
+#
+#      MCV_PROFILE - 1 to profile the time spent in each function
+#      MCV_TRACE_MEMORY - 1 to trace the memory allocated by each line
+#      MCV_PROFILE_DIR - directory of the profile directories of the runs,
+#                        ${LOGDIR}/profile by default
+#
+#  Outputs:
+#
+#      - A profile directory for each profiled run of a script
+#        (${MCV_PROFILE_DIR}/script.YYYYMMDD.HHMMSS.pid) with:
+#
+#        phase.prof - pstats file of the time spent in the phase
+#        phase.mem.txt - top allocations of the phase, each time it is run
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      A phase run while another phase is running is part of that phase.
+#      The files are written when the script exits, so a run which ends
+#      with sys.exit() is profiled too.
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import atexit
+import cProfile
+import pstats
+import tracemalloc
+
+USAGE = 'Usage: mcvProfile.py  summary  runDir  [ count ]'
+
+NL = '\n'
+
+# the command line options
+PROFILE_OPTION = '--profile'
+TRACE_MEMORY_OPTION = '--trace-memory'
+
+# number of stack frames kept by tracemalloc for each allocation
+TRACE_FRAMES = 1
+
+# number of allocations written for each run of a phase
+TOP_ALLOCATIONS = 20
+
+# number of hotspots printed by the summary
+SUMMARY_COUNT = 20
+
+profiling = 0
+tracingMemory = 0
+runDir = None
+
+# the phase running, None if no phase is running
+activePhase = None
+
+# Looks like {phase:cProfile.Profile, ...}
+phaseProfiles = {}
+
+# Looks like {phase:[line, ...], ...}
+# the top allocations of each run of a phase
+phaseAllocations = {}
+
+#
+# Purpose: Switch profiling on, if asked for by the options or the
+#	environment
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: removes the profiling options from sys.argv, starts tracing
+#	memory allocations
+# Throws: Nothing
+#
+def init (script):
+    global profiling, tracingMemory, runDir
+
+    profiling = os.environ.get('MCV_PROFILE', '0') == '1'
+    tracingMemory = os.environ.get('MCV_TRACE_MEMORY', '0') == '1'
+    if PROFILE_OPTION in sys.argv:
+        profiling = 1
+        sys.argv.remove(PROFILE_OPTION)
+    if TRACE_MEMORY_OPTION in sys.argv:
+        tracingMemory = 1
+        sys.argv.remove(TRACE_MEMORY_OPTION)
+
+    if not profiling and not tracingMemory:
+        return
+
+    profileDir = os.environ.get('MCV_PROFILE_DIR', '')
+    if profileDir == '':
+        profileDir = os.path.join(os.environ.get('LOGDIR', '.'), 'profile')
+    runDir = os.path.join(profileDir, '%s.%s.%s' % \
+        (script, time.strftime('%Y%m%d.%H%M%S'), os.getpid()))
+    os.makedirs(runDir)
+
+    if tracingMemory:
+        tracemalloc.start(TRACE_FRAMES)
+    atexit.register(finish)
+
+#
+# Purpose: Run a phase, profiling it if profiling is on
+# Returns: the return value of the function
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: the exceptions of the function
+#
+def runPhase (phase, function):
+    global activePhase
+
+    if runDir == None or activePhase != None:
+        return function()
+
+    activePhase = phase
+    if tracingMemory:
+        tracemalloc.reset_peak()
+        before = takeSnapshot()
+    if profiling:
+        if phase not in phaseProfiles:
+            phaseProfiles[phase] = cProfile.Profile()
+        phaseProfiles[phase].enable()
+
+    try:
+        return function()
+    finally:
+        if profiling:
+            phaseProfiles[phase].disable()
+        if tracingMemory:
+            addAllocations(phase, before)
+        activePhase = None
+
+#
+# Purpose: Note the top allocations of a run of a phase
+# Returns: Nothing
+# Assumes: memory allocations are traced
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def addAllocations (phase, before):
+    current, peak = tracemalloc.get_traced_memory()
+    lines = ['run %s: %.1f MB allocated, %.1f MB peak' % \
+        (len(phaseAllocations.get(phase, [])) + 1, current / 1048576.0,
+        peak / 1048576.0)]
+
+    for stat in takeSnapshot().compare_to(before, 'lineno')[:TOP_ALLOCATIONS]:
+        lines.append('    %s' % stat)
+
+    if phase not in phaseAllocations:
+        phaseAllocations[phase] = []
+    phaseAllocations[phase].append(NL.join(lines))
+
+#
+# Purpose: Take a snapshot of the traced memory allocations
+# Returns: the snapshot, without the allocations of tracemalloc and of
+#	this module
+# Assumes: memory allocations are traced
+# Effects: Nothing
+# Throws: Nothing
+#
+def takeSnapshot ():
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)])
+
+#
+# Purpose: Get the name of the files of a phase
+# Returns: the file name, without extension
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getFileName (phase):
+    return phase.replace(':', '-').replace('/', '-')
+
+#
+# Purpose: Write the profiles of the phases
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes the files of the profile directory
+# Throws: Nothing
+#
+def finish ():
+    for phase in phaseProfiles:
+        phaseProfiles[phase].dump_stats(
+            os.path.join(runDir, getFileName(phase) + '.prof'))
+
+    for phase in phaseAllocations:
+        fp = open(os.path.join(runDir, getFileName(phase) + '.mem.txt'), 'w')
+        fp.write((NL + NL).join(phaseAllocations[phase]) + NL)
+        fp.close()
+
+    sys.stderr.write('Profile written to: %s%s' % (runDir, NL))
+
+#
+# Purpose: Print the top hotspots of a profiled run: the functions with
+#	the most time of their own over all phases, the phases and the
+#	top functions of each phase, and the largest allocations of each
+#	phase
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to stdout
+# Throws: IOError if a file cannot be read
+#
+def summary (directory, count):
+    profFiles = []
+    memFiles = []
+    for fileName in sorted(os.listdir(directory)):
+        if fileName.endswith('.prof'):
+            profFiles.append(fileName)
+        elif fileName.endswith('.mem.txt'):
+            memFiles.append(fileName)
+
+    if profFiles != []:
+        print('Top %s functions of all phases by own time' % count)
+        stats = pstats.Stats(*[os.path.join(directory, f) for f in profFiles],
+            stream=sys.stdout)
+        stats.sort_stats('tottime').print_stats(count)
+
+        phases = []
+        for fileName in profFiles:
+            stats = pstats.Stats(os.path.join(directory, fileName))
+            phases.append([stats.total_tt, fileName[:-len('.prof')], stats])
+        phases.sort(key=lambda p: -p[0])
+
+        print('Phases by time')
+        for seconds, phase, stats in phases:
+            print('    %10.3f  %s' % (seconds, phase))
+        print('')
+
+        for seconds, phase, stats in phases:
+            print('Phase %s, top %s functions by cumulative time' % \
+                (phase, count))
+            stats.stream = sys.stdout
+            stats.sort_stats('cumulative').print_stats(count)
+
+    for fileName in memFiles:
+        print('Phase %s, top allocations' % fileName[:-len('.mem.txt')])
+        fp = open(os.path.join(directory, fileName), 'r')
+        for line in fp.readlines()[:count + 1]:
+            sys.stdout.write(line)
+        fp.close()
+        print('')
+
+#
+# Main
+#
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != 'summary':
+        print(USAGE)
+        sys.exit(1)
+
+    count = SUMMARY_COUNT
+    if len(sys.argv) == 4:
+        count = int(sys.argv[3])
+    try:
+        summary(sys.argv[2], count)
+    except (IOError, OSError) as e:
+        print('Cannot read profile directory: %s (%s)' % (sys.argv[2], e))
+        sys.exit(1)
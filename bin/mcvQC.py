@@ -10,10 +10,52 @@
 #
 #  Usage:
 #
-#      mcvQC.py  filename
+#      mcvQC.py  [ -m mergedFile ]  [ --checks check,... ]  [ --full ]
+#                [ --profile ]  [ --trace-memory ]
+#                filename  [ filename ... ]
 #
 #      where:
 #          filename = path to the input file
+#          mergedFile = path to the merged input file to create
+#          check = name of a check to run (see CHECKS), all checks are
+#                  run by default
+#
+#      Selected checks: with --checks (or -c) only the named checks are
+#      run, and only the reference data lookups they need are loaded.
+#      The before/after report, which needs all checks to pass, is not
+#      created. Checks cannot be selected for a "live" run or with a
+#      merged file.
+#
+#      Tiered mode: for a non-live run with ${MCVQC_TIERED} set to 1, the
+#      fatal checks (term IDs, J numbers, evidence codes, editors and
+#      grouping terms) are run first. The marker checks and the
+#      before/after report are run only if these find no fatal errors,
+#      or if --full is given.
+#
+#      Batch mode: when more than one input file (or a merged file) is
+#      given, the reference data is loaded once and each input file is
+#      checked in turn. The reports for an input file are written to the
+#      directory of that input file, and markers annotated to different
+#      terms in different input files are reported in a cross-file
+#      conflict report. If there are no fatal errors and no cross-file
+#      conflicts, the annotations of all input files are written to the
+#      merged file, which can be published as the load input file.
+#      Batch mode is for non-live runs only.
+#
+#      Incremental QC: for a non-live run with ${MCVQC_CACHE_FILE} set, the
+#      input lines that passed the per-line checks (see LINE_CHECKS) of an
+#      earlier run against the same reference data are not checked again.
+#      The checks over the whole file (multiple MCV annotations, grouping
+#      terms and the before/after report) are run on all lines, so the
+#      reports are those of a full run. The cache is not used when checks
+#      are selected. The cache keeps at most ${MCVQC_CACHE_MAX_LINES}
+#      lines, the lines of the last input file first.
+#
+#      Profiling: with --profile and --trace-memory (or ${MCV_PROFILE}
+#      and ${MCV_TRACE_MEMORY} set to 1), the time spent in each function
+#      and the memory allocated during each phase (loading the input and the lookups, each
+#      check and report, creating the annotation file) are written to
+#      ${MCV_PROFILE_DIR}, see mcvProfile.py.
 #
 #  Env Vars:
 #
@@ -33,6 +75,25 @@
 #	   GRPNG_TERM_RPT
 #	   BEFORE_AFTER_RPT
 #	   RPT_NAMES_RPT
+#	   CROSS_FILE_CONFLICT_RPT
+#	   NO_MCV_ANNOT_RPT_NEW
+#	   NO_MCV_ANNOT_MKR_TYPES
+#	   MCVQC_STATS_FILE
+#	   MCVQC_TIERED
+#	   MCVQC_SQL_LOG
+#	   MCVQC_PLAN_LOG
+#	   MCVQC_SLOW_SQL_SECONDS
+#	   MCVQC_STREAM_ROWS
+#	   MCVQC_CACHE_FILE
+#	   MCVQC_CACHE_MAX_LINES
+#	   MCVQC_ID_ENGINE
+#	   MCVQC_SPILL_ROWS
+#	   MCVQC_QUARANTINE
+#	   QUARANTINE_FILE
+#	   LINT_REFERENCE_CACHE
+#	   MCV_PROFILE
+#	   MCV_TRACE_MEMORY
+#	   MCV_PROFILE_DIR
 #          ANNOT_FILE
 #	   GROUPING_TERMIDS
 #
@@ -68,11 +129,44 @@
 #
 #      - Annotation file (${ANNOT_FILE})
 #
+#      - Quarantine file (${QUARANTINE_FILE}) with the lines of the markers
+#        which failed a fatal check and the reasons, in the layout of the
+#        input file (for a "live" run in quarantine mode only)
+#
+#      - Sorted runs of the annotations (${INPUT_FILE_BCP}.runN), if
+#        ${MCVQC_SPILL_ROWS} is set, removed at the end of the run
+#
+#      - Cross-file conflict report (${CROSS_FILE_CONFLICT_RPT})
+#        and merged input file (for batch mode only)
+#
+#      - Reference ID cache for mcvLint.py (${LINT_REFERENCE_CACHE})
+#        (for a "live" run only)
+#
+#      - Verdict cache of the incremental QC (${MCVQC_CACHE_FILE})
+#        (for a non-live run only)
+#
+#      - Markers with no MCV annotation report (${NO_MCV_ANNOT_RPT_NEW})
+#        (for a "live" run only), published by mcvload.sh as
+#        ${NO_MCV_ANNOT_RPT} once the annotation load has completed
+#
+#      - Stats file (${MCVQC_STATS_FILE}) with the input size, the time
+#        spent in each phase and loading each lookup, the discrepancy
+#        rows found by each check
+#        and the peak memory of the run, for the run history
+#        (see mcvRunHistory.py)
+#
+#      - SQL log (${MCVQC_SQL_LOG}) with the duration and the number of
+#        rows of each SQL statement (a select read through a cursor is
+#        logged once, see streamSql()), and plan log (${MCVQC_PLAN_LOG})
+#        with the EXPLAIN (ANALYZE, BUFFERS) output of the select
+#        statements that took longer than ${MCVQC_SLOW_SQL_SECONDS}
+#
 #  Exit Codes:
 #
 #      0:  Successful completion
 #      1:  An exception occurred
-#      2:  Non-fatal discrepancy errors detected in the input files
+#      2:  Non-fatal discrepancy errors detected in the input files, or
+#          fatal discrepancy errors quarantined (quarantine mode)
 #      3:  Fatal discrepancy errors detected in the input files
 #
 #  Assumes:
@@ -91,9 +185,28 @@
 #      2) Perform initialization steps.
 #      3) Open the input/output files.
 #      4) Load the records from the input file into the temp table.
-#      5) Generate the QC reports.
+#         If ${MCVQC_SPILL_ROWS} is set, the annotations are written to
+#         sorted runs on disk as they are read, and the annotation file
+#         and the multiple MCV annotation report read them back merged
+#         by MGI ID, so the annotations held in memory are bounded.
+#      5) Generate the QC reports, loading each reference data lookup
+#         when the first check or report that needs it is run and
+#         releasing it once no check or report still to run needs it
+#         (a batch keeps them loaded for the next input file, a resident
+#         QC service, see mcvQCServer.py, keeps them loaded between runs).
+#         The MGI IDs of the input are resolved against the accession IDs
+#         once, in one query, for all the marker checks and the marker
+#         type update (see loadMarkerStatus()).
 #      7) Create the annotation file if no fatal discrepancies
-#         (for a "live" run only).
+#         (for a "live" run only). In quarantine mode
+#         (${MCVQC_QUARANTINE} = 1), the lines of the markers with a
+#         line which failed a fatal check are written to the quarantine
+#         file instead, the other lines to the annotation file, and the
+#         fatal discrepancies do not stop the load (exit code 2).
+#      8) Create the markers with no MCV annotation report from the
+#         post-load annotation state (for a "live" run only). The
+#         quarantined markers are not loaded, they keep their annotations
+#         in the database.
 #
 #  Notes:  None
 #
@@ -103,8 +216,17 @@ import sys
 import os
 import string
 import re
+import time
+import resource
+import getopt
+import hashlib
+import heapq
+import itertools
 import mgi_utils
 import db
+import mcvInput
+import mcvIdArray
+import mcvProfile
 
 #
 #  CONSTANTS
@@ -112,7 +234,13 @@ import db
 TAB = '\t'
 NL = '\n'
 
-USAGE = 'Usage: mcvQC.py  inputFile'
+# the most run files of annotations merged at once
+MAX_MERGE_RUNS = 64
+
+# version of the verdict cache, changed when the per-line checks change
+CACHE_VERSION = 'mcvQC.cache.1'
+
+USAGE = 'Usage: mcvQC.py  [ -m mergedFile ]  [ --checks check,... ]  [ --full ]  [ --profile ]  [ --trace-memory ]  inputFile  [ inputFile ... ]'
 
 # for updating marker type
 UPDATE = '''update MRK_Marker
@@ -122,14 +250,6 @@ UPDATE = '''update MRK_Marker
             where _Marker_key = %s
             '''
 
-MARKER_KEY = '''select _Object_key as _Marker_key
-                from ACC_Accession
-                where _MGIType_key = 2
-                and _LogicalDB_key = 1
-                and prefixPart = 'MGI:'
-                and preferred = 1
-                and accID = '%s' 
-                '''
 #
 #  GLOBALS
 #
@@ -138,35 +258,253 @@ MARKER_KEY = '''select _Object_key as _Marker_key
 updatedBy = None
 updatedByKey = None
 
-liveRun = os.environ['LIVE_RUN']
+# input file names, set by checkArgs()
+inputFile = None
+inputFiles = []
 
-tempTable = os.environ['MCVLOAD_TEMP_TABLE']
+# merged input file name, for batch mode only
+mergedFile = None
 
-# temp table bcp file name
-bcpFile = os.environ['INPUT_FILE_BCP']
+# names of the checks to run, all checks if None, set by checkArgs()
+selectedChecks = None
 
-# annotation file name used in 'live' mode only
-annotFile = os.environ['ANNOT_FILE']
+# run all tiers of checks even if the first tier has fatal errors,
+# set by checkArgs()
+fullRun = 0
 
-# grouping terms
-groupingTermIds = os.environ['GROUPING_TERMIDS']
+# header line of the merged input file
+MERGED_HEADER = TAB.join(['MCV/SO ID', 'MGI ID', 'J:', 'Evidence',
+    'Inferred From', 'Qualifier', 'Editor', 'Date', 'Notes', '']) + NL
 
-# Report file names
-invMrkRptFile = os.environ['INVALID_MARKER_RPT']
-secMrkRptFile = os.environ['SEC_MARKER_RPT']
-invTermIdRptFile = os.environ['INVALID_TERMID_RPT']
-invJNumRptFile = os.environ['INVALID_JNUM_RPT']
-invEvidRptFile = os.environ['INVALID_EVID_RPT']
-invEditorRptFile = os.environ['INVALID_EDITOR_RPT']
-multiMcvRptFile = os.environ['MULTIPLE_MCV_RPT']
-conflictRptFile = os.environ['MKR_TYPE_CONFLICT_RPT']
-groupingTermRptFile = os.environ['GRPNG_TERM_RPT']
-beforeAfterRptFile =  os.environ['BEFORE_AFTER_RPT']
-rptNamesFile = os.environ['RPT_NAMES_RPT']
+# header line of the quarantine file, the reasons are in a column
+# after the columns of the input file
+QUARANTINE_HEADER = MERGED_HEADER[:-1] + TAB + 'Quarantine Reason' + NL
 
-BCP_COMMAND = os.environ['PG_DBUTILS'] + '/bin/bcpin.csh'
+#
+# Purpose: Read the configuration from the environment.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def readConfig ():
+    global liveRun, tempTable, bcpFile, annotFile, groupingTermIds
+    global invMrkRptFile, secMrkRptFile, invTermIdRptFile, invJNumRptFile
+    global invEvidRptFile, invEditorRptFile, multiMcvRptFile
+    global conflictRptFile, groupingTermRptFile, beforeAfterRptFile
+    global rptNamesFile, crossFileRptFile, noMcvRptFile
+    global noMcvMkrTypes, statsFile, tiered, BCP_COMMAND, timestamp
+    global sqlLogFile, planLogFile, slowSqlSeconds, streamRows
+    global lintCacheFile, cacheFile, cacheMaxLines, idEngine, spillRows
+    global quarantine, quarantineFile
+
+    liveRun = os.environ['LIVE_RUN']
+
+    tempTable = os.environ['MCVLOAD_TEMP_TABLE']
+
+    # temp table bcp file name
+    bcpFile = os.environ['INPUT_FILE_BCP']
+
+    # annotation file name used in 'live' mode only
+    annotFile = os.environ['ANNOT_FILE']
+
+    # grouping terms
+    groupingTermIds = os.environ['GROUPING_TERMIDS']
+
+    # Report file names
+    invMrkRptFile = os.environ['INVALID_MARKER_RPT']
+    secMrkRptFile = os.environ['SEC_MARKER_RPT']
+    invTermIdRptFile = os.environ['INVALID_TERMID_RPT']
+    invJNumRptFile = os.environ['INVALID_JNUM_RPT']
+    invEvidRptFile = os.environ['INVALID_EVID_RPT']
+    invEditorRptFile = os.environ['INVALID_EDITOR_RPT']
+    multiMcvRptFile = os.environ['MULTIPLE_MCV_RPT']
+    conflictRptFile = os.environ['MKR_TYPE_CONFLICT_RPT']
+    groupingTermRptFile = os.environ['GRPNG_TERM_RPT']
+    beforeAfterRptFile =  os.environ['BEFORE_AFTER_RPT']
+    rptNamesFile = os.environ['RPT_NAMES_RPT']
+
+    # markers annotated to different terms in the files of a batch
+    crossFileRptFile = os.environ['CROSS_FILE_CONFLICT_RPT']
+
+    # markers with no MCV annotation report, generated in 'live' mode only,
+    # under a temp name until the annotation load has completed
+    noMcvRptFile = os.environ['NO_MCV_ANNOT_RPT_NEW']
+
+    # comma separated marker types to report, all marker types if empty
+    noMcvMkrTypes = os.environ['NO_MCV_ANNOT_MKR_TYPES']
+
+    # run stats for the run history
+    statsFile = os.environ['MCVQC_STATS_FILE']
+
+    # run the checks in tiers, for a non-live run only
+    tiered = os.environ['MCVQC_TIERED'] == '1' and liveRun != '1'
+
+    # SQL statement log and slow query plan log, no logging if empty
+    sqlLogFile = os.environ['MCVQC_SQL_LOG']
+    planLogFile = os.environ['MCVQC_PLAN_LOG']
+    slowSqlSeconds = float(os.environ['MCVQC_SLOW_SQL_SECONDS'])
+
+    # rows fetched at a time by the large lookup queries, 0 to fetch
+    # all rows at once
+    streamRows = int(os.environ['MCVQC_STREAM_ROWS'])
+
+    # reference ID cache for mcvLint.py, written by a "live" run
+    lintCacheFile = os.environ['LINT_REFERENCE_CACHE']
+
+    # verdict cache of the incremental QC, for a non-live run only,
+    # no cache if empty
+    cacheFile = os.environ['MCVQC_CACHE_FILE']
+    if liveRun == '1':
+        cacheFile = ''
+
+    # the most lines kept in the verdict cache
+    cacheMaxLines = int(os.environ['MCVQC_CACHE_MAX_LINES'])
+
+    # lookup of the term IDs and J numbers of the input: 'set' or 'numpy'
+    # (see mcvIdArray.py)
+    idEngine = os.environ['MCVQC_ID_ENGINE']
+    if idEngine == 'numpy' and mcvIdArray.numpy == None:
+        print('The numpy module is not installed, the set ID engine is used')
+        idEngine = 'set'
+
+    # annotations kept in memory before they are written to a sorted run
+    # on disk, 0 to keep all annotations in memory
+    spillRows = int(os.environ['MCVQC_SPILL_ROWS'])
+
+    # quarantine the markers which fail a fatal check, for a "live" run
+    # only
+    quarantine = os.environ['MCVQC_QUARANTINE'] == '1' and liveRun == '1'
+    quarantineFile = os.environ['QUARANTINE_FILE']
+
+    BCP_COMMAND = os.environ['PG_DBUTILS'] + '/bin/bcpin.csh'
+
+    timestamp = mgi_utils.date()
+
+readConfig()
+
+# db.sql without the SQL log
+dbSql = db.sql
+
+#
+# Purpose: Run SQL statements as db.sql does, logging the duration and
+#	the number of rows of each statement. The plan of a select
+#	statement which took longer than the threshold is written to the
+#	plan log.
+# Returns: the results, as db.sql
+# Assumes: db.useOneConnection(1) has been called, the statements of
+#	a list are run one at a time
+# Effects: writes to the SQL and plan logs
+# Throws: Nothing
+#
+def loggedSql (cmds, parser = 'auto'):
+    if sqlLogFile == '':
+        return dbSql(cmds, parser)
+
+    if type(cmds) != type([]):
+        return logStatement(cmds, parser)
 
-timestamp = mgi_utils.date()
+    results = []
+    for cmd in cmds:
+        results.append(logStatement(cmd, parser))
+    return results
+
+#
+# Purpose: Run one SQL statement and log it, see loggedSql()
+# Returns: the results of the statement
+# Assumes: Nothing
+# Effects: writes to the SQL and plan logs
+# Throws: Nothing
+#
+def logStatement (cmd, parser):
+    start = time.time()
+    results = dbSql(cmd, parser)
+    seconds = time.time() - start
+
+    rows = ''
+    if type(results) == type([]):
+        rows = str(len(results))
+    writeSqlLog(cmd, seconds, rows)
+    return results
+
+#
+# Purpose: Log the duration and the number of rows of an SQL statement,
+#	and write the plan of a select statement which took longer than
+#	the threshold to the plan log
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to the SQL and plan logs
+# Throws: Nothing
+#
+def writeSqlLog (cmd, seconds, rows):
+    statement = ' '.join(str.split(cmd))
+
+    fpSqlLog = open(sqlLogFile, 'a')
+    fpSqlLog.write('%s%s%.3f%s%s%s%s%s' % (mgi_utils.date(), TAB, seconds,
+        TAB, rows, TAB, statement, NL))
+    fpSqlLog.close()
+
+    # explain only a select which does not create a table, the statement
+    # is run again by EXPLAIN ANALYZE
+    if seconds >= slowSqlSeconds and planLogFile != '' and \
+            re.match('select\\s', statement, re.I) and \
+            re.search('\\sinto\\s', statement, re.I) == None:
+        plan = dbSql('explain (analyze, buffers) ' + cmd, 'auto')
+        fpPlanLog = open(planLogFile, 'a')
+        fpPlanLog.write('%s%s%.3f seconds, %s rows%s%s%s' % (mgi_utils.date(),
+            NL, seconds, rows, NL, statement, 2*NL))
+        for r in plan:
+            fpPlanLog.write(list(r.values())[0] + NL)
+        fpPlanLog.write(NL)
+        fpPlanLog.close()
+
+db.sql = loggedSql
+
+# number of cursors opened by streamSql(), for unique cursor names
+cursorCount = 0
+
+#
+# Purpose: Run a select statement through a server-side cursor, fetching
+#	streamRows rows at a time, so the whole result is never held
+#	in memory. The cursor statements are logged as one statement, the
+#	select with the time spent in the declare and fetch statements.
+# Returns: generator of the result rows
+# Assumes: db.useOneConnection(1) has been called
+# Effects: writes to the SQL and plan logs
+# Throws: Nothing
+#
+def streamSql (cmd):
+    global cursorCount
+
+    if streamRows == 0:
+        for r in db.sql(cmd, 'auto'):
+            yield r
+        return
+
+    # with hold, the cursor is not closed by a commit between fetches
+    cursorCount = cursorCount + 1
+    cursorName = 'mcvqc_cursor%s' % cursorCount
+    start = time.time()
+    dbSql('declare %s no scroll cursor with hold for %s' % \
+        (cursorName, cmd), None)
+    seconds = time.time() - start
+    rows = 0
+    try:
+        while True:
+            start = time.time()
+            results = dbSql('fetch forward %s from %s' % \
+                (streamRows, cursorName), 'auto')
+            seconds = seconds + time.time() - start
+            if results == []:
+                break
+            rows = rows + len(results)
+            for r in results:
+                yield r
+    finally:
+        dbSql('close %s' % cursorName, None)
+
+    if sqlLogFile != '':
+        writeSqlLog(cmd, seconds, str(rows))
 
 # current number of fatal errors
 fatalCount = 0
@@ -174,6 +512,17 @@ fatalCount = 0
 # list of reports which contain fatal errors
 fatalReportNames = []
 
+# Looks like {column:{value:reason, ...}, ...}
+# the values, in lower case, found by the fatal checks in each column of
+# the annotation lines (see annot)
+fatalValues = {}
+
+# the MGI IDs of the markers quarantined by createAnnotFile()
+quarantinedMarkers = set()
+
+# the number of lines quarantined by createAnnotFile()
+quarantineCount = 0
+
 # current number of non fatal multiple MCV/gene errors
 #multiCt = 0
 
@@ -191,6 +540,16 @@ nonfatalReportNames = []
 # of attributes needed to create an annotation load file
 annot = {}
 
+# the number of annotations in annot
+annotCount = 0
+
+# the files of the sorted runs of annotations written to disk once
+# annot holds ${MCVQC_SPILL_ROWS} annotations, in input order
+annotRuns = []
+
+# the number of run files written for the input file
+annotRunCount = 0
+
 # Looks like {mgiID:symbol, ...}
 # All official markers in the database mapped to their symbols
 mgiIDToSymbolDict = {}
@@ -199,6 +558,48 @@ mgiIDToSymbolDict = {}
 # All mcv and so ids mapped to their terms
 termIDToTermDict = {}
 
+# All mcv and so ids, in lower case
+termIDSet = set()
+
+# All J numbers, in lower case
+jNumSet = set()
+
+# Looks like {lookupName:[stamp, reference], ...}
+# the ID references of the numpy ID engine built from the lookups
+idReferences = {}
+
+# All evidence codes, in lower case
+evidCodeSet = set()
+
+# All user logins, in lower case
+editorSet = set()
+
+# Looks like [ [termID, mgiID, jNum, evidCode, editor], ...]
+# the records of the input file
+inputRows = []
+
+# Looks like [ [termID, mgiID, jNum, evidCode, editor], ...]
+# the records of the input file checked by the per-line checks, the
+# records not in the verdict cache, loaded into the temp table
+qcRows = []
+
+# the values (term IDs, MGI IDs, J numbers, evidence codes and editors),
+# in lower case, reported by the per-line checks
+dirtyValues = set()
+
+# Looks like set of line keys (see getLineKey())
+# the lines which passed the per-line checks of an earlier run,
+# None if the verdict cache is not used
+cachedLines = None
+
+# Looks like [key, ...]
+# the keys of cachedLines in the order of the cache file, the most
+# recently used first
+cachedOrder = []
+
+# the stamp of the reference data the per-line checks are run against
+cacheStamp = None
+
 # Looks like {mgiID:[termID1, ...], ...}
 # markers mapped to their SO/MCV IDs
 mgdMgiIdToTermIdDict = {}
@@ -223,16 +624,44 @@ mcvTermToParentMkrTypeTermDict = {}
 
 inputTermIdLookupByMgiId = {}
 
-mkrKeyToMkrTypeKeyDict = {}
-#
-# map marker mgiID to its marker type
-#
-mgiIdToMkrTypeDict = {}
-
 # markers whose type need updating based on the MCV marker type
 # {mgiID: mcv marker type term
 markersToUpdateDict = {}
 
+# Looks like {mkrKey:[mgiID, symbol, mkrType], ...}
+# index of all official markers by marker key
+mkrKeyIndex = {}
+
+# Looks like {mgiID:mkrKey, ...}
+# primary MGI IDs of all official markers mapped to their marker key
+mgiIdToMkrKeyDict = {}
+
+# Looks like {mgiID:[status, [ [objectType, markerStatus], ...],
+#	[ [symbol, primaryID], ...], [mkrKey, mkrType, symbol] or None], ...}
+# the MGI IDs of the temp table resolved against the accession IDs, with
+# the status of each ID (see MARKER_STATUSES), the rows of the invalid
+# marker report, the rows of the secondary marker report and, for the
+# primary ID of an official mouse marker, the marker
+markerStatusDict = {}
+
+# the statuses of markerStatusDict, the first that applies to an MGI ID
+MARKER_STATUSES = ['missing', 'nonMarker', 'invalidStatus', 'secondary',
+    'primary', 'other']
+
+# marker keys of all markers with MCV annotations in the database
+annotMkrKeySet = set()
+
+# Looks like {phase:seconds, ...}
+# time spent in each phase of the run, summed over the input files
+phaseTimes = {}
+
+# Looks like {check:rows, ...}
+# discrepancy rows found by each check, summed over the input files
+checkRows = {}
+
+# Looks like [ [inputFile, bytes], ...]
+inputSizes = []
+
 #
 # Purpose: Validate the arguments to the script.
 # Returns: Nothing
@@ -241,13 +670,32 @@ markersToUpdateDict = {}
 # Throws: Nothing
 #
 def checkArgs ():
-    global inputFile
+    global inputFile, inputFiles, mergedFile, selectedChecks, fullRun
 
-    if len(sys.argv) != 2:
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'm:c:', ['checks=', 'full'])
+    except getopt.GetoptError:
+        print(USAGE)
+        sys.exit(1)
+
+    for opt, value in opts:
+        if opt == '-m':
+            mergedFile = value
+        elif opt in ('-c', '--checks'):
+            selectedChecks = setSelectedChecks(value)
+        elif opt == '--full':
+            fullRun = 1
+
+    if len(args) < 1:
         print(USAGE)
         sys.exit(1)
 
-    inputFile = sys.argv[1]
+    if selectedChecks != None and (liveRun == "1" or mergedFile != None):
+        print('Checks cannot be selected for a "live" run or a merged file')
+        sys.exit(1)
+
+    inputFiles = args
+    inputFile = inputFiles[0]
 
 
 #
@@ -258,45 +706,89 @@ def checkArgs ():
 # Throws: Nothing
 #
 def init ():
-    global mgiIDToSymbolDict, termIDToTermDict
-    global mgdMgiIdToTermIdDict, inputTermIdLookupByMgiId
-
-    global mcvTermToParentMkrTypeTermDict
-    global mcvKeyToTermDict, mkrTypeToAssocMCVTermDict
-    global mcvTermToMkrTypeDict, mkrKeyToMkrTypeKeyDict, mkrTypeToKeyDict
-
-    global updatedBy, updatedByKey
-
     print('DB Server:' + db.get_sqlServer())
     print('DB Name:  ' + db.get_sqlDatabase())
     sys.stdout.flush()
 
     db.useOneConnection(1)
     #db.set_sqlLogFunction(db.sqlLogAll)
+    runPhase('loadInput', initInput)
+
+#
+# Purpose: Perform the initialization steps for the input file, these do
+#	not depend on the reference data lookups.
+# Returns: Nothing
+# Assumes: db.useOneConnection(1) has been called
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def initInput ():
+    global updatedByKey
+
+    inputSizes.append([inputFile, os.path.getsize(inputFile)])
+    dropInputLookups()
     openFiles()
+    loadCache()
     loadTempTable()
 
     # get user key for updates
     results = db.sql('''select _User_key from MGI_User where login = '%s' ''' % updatedBy)
     updatedByKey = results[0]['_User_key']
 
+    loadInputLookups()
+
+#
+# Purpose: Load the lookup of the SO/MCV annotations to markers in the
+#	input file
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadInputLookups ():
     #
-    # Load global lookup dictionaries
+    # get all SO/MCV annotations to markers from the input file, the temp
+    # table only has the records not in the verdict cache
     #
+    for termID, mgiID, jNum, evidCode, editor in inputRows:
+        if mgiID not in inputTermIdLookupByMgiId:
+           inputTermIdLookupByMgiId[mgiID] = [] # default
+        if termID != '': # this case when only mgiID in file for delete
+            inputTermIdLookupByMgiId[mgiID].append(termID)
 
-    # create lookup of all official markers in the database 
-    # mapped to their symbols
-    results = db.sql('''select a.accid, m.symbol
+#
+# Purpose: Load the lookup of all official markers in the database
+#	mapped to their symbols
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMgiIDToSymbol ():
+    mgiIDToSymbolDict.clear()
+
+    results = streamSql('''select a.accid, m.symbol
         from ACC_Accession a, MRK_Marker m
         where a._MGIType_key = 2
         and a._LogicalDB_key = 1
         and a.prefixPart = 'MGI:'
-        and a._Object_key = m._Marker_key''', 'auto')
+        and a._Object_key = m._Marker_key''')
 
     for r in results:
         mgiIDToSymbolDict[r['accid']] = r['symbol']
 
-    # create lookup of all mcv and so ids mapped to their terms
+#
+# Purpose: Load the lookup of all mcv and so ids mapped to their terms,
+#	and the set of mcv and so ids
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadTermIDToTerm ():
+    termIDToTermDict.clear()
+    termIDSet.clear()
+
     results = db.sql('''select a.accID, t.term
         from ACC_Accession a, VOC_Term t
         where a._LogicalDB_key in (145,146)
@@ -305,9 +797,75 @@ def init ():
 
     for r in results:
         termIDToTermDict[r['accID']] = r['term']
+        termIDSet.add(r['accID'].lower())
 
-    # create lookup of markers mapped to their SO/MCV IDs
-    results = db.sql('''select a1.accID as termID, a2.accID as mgiID
+#
+# Purpose: Load the set of all J numbers
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadJNums ():
+    jNumSet.clear()
+
+    results = db.sql('''select a.accID
+        from ACC_Accession a
+        where a._MGIType_key = 1
+        and a._LogicalDB_key = 1
+        and a.prefixPart = 'J:'
+        and a.preferred = 1''', 'auto')
+
+    for r in results:
+        jNumSet.add(r['accID'].lower())
+
+#
+# Purpose: Load the set of all evidence codes
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadEvidCodes ():
+    evidCodeSet.clear()
+
+    results = db.sql('''select t.term
+        from VOC_Term t
+        where t._Vocab_key = 80''', 'auto')
+
+    for r in results:
+        evidCodeSet.add(r['term'].lower())
+
+#
+# Purpose: Load the set of all user logins
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadEditors ():
+    editorSet.clear()
+
+    results = db.sql('''select u.login
+        from MGI_User u''', 'auto')
+
+    for r in results:
+        editorSet.add(r['login'].lower())
+
+#
+# Purpose: Load the lookup of markers mapped to their SO/MCV IDs
+#	and the index of annotated marker keys
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMgdAnnots ():
+    mgdMgiIdToTermIdDict.clear()
+    annotMkrKeySet.clear()
+
+    results = streamSql('''select a1.accID as termID, a2.accID as mgiID,
+                v._Object_key as _Marker_key
             from  VOC_Annot v, ACC_Accession a1, ACC_Accession a2
             where v._AnnotType_key =  1011
             and v._Term_key = a1._Object_key
@@ -318,34 +876,29 @@ def init ():
             and v._Object_key = a2._Object_key
             and a2._MGIType_key = 2
             and a2._LogicalDB_key = 1
-            and a2.prefixPart = 'MGI:' ''', 'auto')
+            and a2.prefixPart = 'MGI:' ''')
     for r in results:
         mgiID = r['mgiID']
         termID = r['termID']
         if mgiID not in mgdMgiIdToTermIdDict:
             mgdMgiIdToTermIdDict[mgiID] = []
         mgdMgiIdToTermIdDict[mgiID].append(termID)
+        annotMkrKeySet.add(r['_Marker_key'])
 
-    #
-    # get all SO/MCV annotations to markers from temp table
-    # loaded from the input file
-    #
-    results = db.sql('select tmp.termID, tmp.mgiID from %s tmp ' % (tempTable), 'auto')
-                #'where tmp.mgiID is not null ' + \
-                #'and tmp.termID is not null', 'auto')
+#
+# Purpose: Load the marker types of the official markers from the
+#	database and build the index of official markers
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMkrTypes ():
+    mkrKeyIndex.clear()
+    mgiIdToMkrKeyDict.clear()
 
-    # load lookup
-    for r in results:
-        mgiID = r['mgiID']
-        termID = r['termID']
-        if mgiID not in inputTermIdLookupByMgiId:
-           inputTermIdLookupByMgiId[mgiID] = [] # default
-        if termID != None: # this case when only mgiID in file for delete
-            inputTermIdLookupByMgiId[mgiID].append(termID)
-    #
-    # get marker types from the database
-    #
-    results = db.sql('''select a.accId as mgiID, t.name
+    results = streamSql('''select a.accId as mgiID, t.name,
+                m._Marker_key, m.symbol
                 from MRK_Marker m, ACC_Accession a, MRK_Types t
                 where m._Marker_Status_key = 1
                 and m._Organism_key = 1
@@ -354,9 +907,136 @@ def init ():
                 and a._LogicalDB_key = 1
                 and a.preferred = 1
                 and a.prefixPart = 'MGI:'
-                and m._Marker_Type_key = t._Marker_Type_key''', 'auto')
+                and m._Marker_Type_key = t._Marker_Type_key''')
     for r in results:
-        mgiIdToMkrTypeDict[r['mgiID']] = r['name']
+        mkrKeyIndex[r['_Marker_key']] = [r['mgiID'], r['symbol'], r['name']]
+        mgiIdToMkrKeyDict[r['mgiID']] = r['_Marker_key']
+
+#
+# Purpose: Resolve each distinct MGI ID of the temp table against the
+#	accession IDs, in one query, for the marker checks and the marker
+#	type update (see markerStatusDict)
+# Returns: Nothing
+# Assumes: the temp table is loaded
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMarkerStatus ():
+    markerStatusDict.clear()
+
+    cmds = []
+
+    # the MGI IDs of the input
+    cmds.append('''select distinct mgiID from %s where mgiID is not null''' % \
+        tempTable)
+
+    # the accession IDs of the MGI IDs, with their marker, and the primary
+    # ID of the marker of a secondary ID
+    cmds.append('''select distinct tmp.mgiID, a._Accession_key, a.accID,
+                a._LogicalDB_key, a._MGIType_key, a.preferred, a.prefixPart,
+                t.name, m._Marker_key, m._Marker_Status_key, m._Organism_key,
+                m.symbol, ms.status, mt.name as mkrType, p.accID as primaryID
+        from %s tmp
+        join ACC_Accession a on
+            (lower(a.accID) = lower(tmp.mgiID))
+        left outer join ACC_MGIType t on
+            (a._MGIType_key = t._MGIType_key)
+        left outer join MRK_Marker m on
+            (a._LogicalDB_key = 1
+            and a._MGIType_key = 2
+            and a._Object_key = m._Marker_key)
+        left outer join MRK_Status ms on
+            (m._Marker_Status_key = ms._Marker_Status_key)
+        left outer join MRK_Types mt on
+            (m._Marker_Type_key = mt._Marker_Type_key)
+        left outer join ACC_Accession p on
+            (m._Marker_key is not null
+            and a.preferred = 0
+            and p._Object_key = a._Object_key
+            and p._MGIType_key = 2
+            and p._LogicalDB_key = 1
+            and p.preferred = 1)''' % tempTable)
+
+    results = db.sql(cmds, 'auto')
+
+    # Looks like {mgiID:[1 if an accession ID, 1 if a marker ID,
+    #	[non-marker objectType, ...]], ...}
+    # the accessions of each MGI ID, for the invalid marker report
+    accessions = {}
+
+    for r in results[0]:
+        markerStatusDict[r['mgiID']] = ['other', [], [], None]
+        accessions[r['mgiID']] = [0, 0, []]
+
+    for r in results[1]:
+        mgiID = r['mgiID']
+        record = markerStatusDict[mgiID]
+
+        accessions[mgiID][0] = 1
+        if r['_LogicalDB_key'] != 1:
+            continue
+        if r['_MGIType_key'] != 2:
+            if r['name'] not in accessions[mgiID][2]:
+                accessions[mgiID][2].append(r['name'])
+            continue
+        accessions[mgiID][1] = 1
+        if r['_Marker_key'] == None:
+            continue
+
+        if r['_Marker_Status_key'] != 1 and \
+                [r['name'], r['status']] not in record[1]:
+            record[1].append([r['name'], r['status']])
+        if r['primaryID'] != None:
+            record[2].append([r['symbol'], r['primaryID']])
+
+        # the primary ID of an official mouse marker, as it is in the
+        # database
+        if r['accID'] == mgiID and r['preferred'] == 1 and \
+                r['prefixPart'] == 'MGI:' and \
+                r['_Marker_Status_key'] == 1 and r['_Organism_key'] == 1:
+            record[3] = [r['_Marker_key'], r['mkrType'], r['symbol']]
+
+    for mgiID in markerStatusDict:
+        record = markerStatusDict[mgiID]
+        isAccession, isMarker, objectTypes = accessions[mgiID]
+
+        if not isAccession:
+            record[0] = 'missing'
+            record[1].append([None, None])
+        elif not isMarker and objectTypes != []:
+            record[0] = 'nonMarker'
+            for objectType in objectTypes:
+                record[1].append([objectType, None])
+        elif record[1] != []:
+            record[0] = 'invalidStatus'
+        elif record[2] != []:
+            record[0] = 'secondary'
+        elif record[3] != None:
+            record[0] = 'primary'
+
+    # Looks like {status:count, ...}
+    counts = {}
+    for mgiID in markerStatusDict:
+        status = markerStatusDict[mgiID][0]
+        counts[status] = counts.get(status, 0) + 1
+    statusCounts = []
+    for status in MARKER_STATUSES:
+        if status in counts:
+            statusCounts.append('%s %s' % (counts[status], status))
+    print('Resolved MGI IDs: %s' % ', '.join(statusCounts))
+    sys.stdout.flush()
+
+#
+# Purpose: Load the lookups of marker type keys to marker types
+#	and the reverse
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMkrTypeNames ():
+    mkrTypeKeyToMkrTypeDict.clear()
+    mkrTypeToKeyDict.clear()
 
     results = db.sql('''select name, _Marker_Type_key
                 from MRK_Types''', 'auto')
@@ -364,6 +1044,18 @@ def init ():
         mkrTypeKeyToMkrTypeDict[ r['_Marker_Type_key'] ] =  r['name']
         mkrTypeToKeyDict[r['name']] = r['_Marker_Type_key']
 
+#
+# Purpose: Parse the MCV Note and load the lookups of marker types
+#	to their MCV terms and the reverse
+# Returns: Nothing
+# Assumes: the marker type lookups have been loaded
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMcvNotes ():
+    mkrTypeToAssocMCVTermDict.clear()
+    mcvTermToMkrTypeDict.clear()
+
     # parse the MCV Note and load lookups
     # we store the association of a marker type to a MCV
     # term in the term Note. Only MCV terms which correspond to
@@ -394,6 +1086,7 @@ def init ():
                         and t._Term_key = n._Object_key 
         order by t._Term_key
         ''')
+    cmds.append('drop table notes')
     results = db.sql(cmds, 'auto')
     notes = {} # map the terms to their note chunks
     for r in results[2]:
@@ -423,6 +1116,17 @@ def init ():
         mkrTypeToAssocMCVTermDict[mkrType]= term
         mcvTermToMkrTypeDict[term] = mkrType
 
+#
+# Purpose: Map all mcv terms to their parent term representing a
+#	marker type
+# Returns: Nothing
+# Assumes: the MCV note lookups have been loaded
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadMcvClosure ():
+    mcvTermToParentMkrTypeTermDict.clear()
+
     #
     # now map all mcv terms to their parent term representing a marker type
     # for all children in the closure table - find the parent
@@ -438,17 +1142,17 @@ def init ():
         ''')
     cmds.append('create index clos_idx1 on clos(_AncestorObject_key)')
     cmds.append('create index clos_idx2 on clos(_DescendentObject_key)')
-    cmds.append('''
+    db.sql(cmds, None)
+    results = streamSql('''
         select t1.term as ancestorTerm, t2.term as descendentTerm 
         from clos c, VOC_Term t1, VOC_Term t2 
         where c._AncestorObject_key = t1._Term_key 
         and c._DescendentObject_key = t2._Term_key 
         order by t2.term
         ''')
-    results = db.sql(cmds, 'auto')
     # the mcv terms that represent marker types
     mcvMarkerTypeValues  = list(mkrTypeToAssocMCVTermDict.values())
-    for r in results[3]:
+    for r in results:
         aTerm = r['ancestorTerm']
         dTerm = r['descendentTerm']
         if dTerm in mcvTermToParentMkrTypeTermDict:
@@ -461,19 +1165,325 @@ def init ():
         # marker type term load it into the dict
         elif aTerm in mcvMarkerTypeValues:
             mcvTermToParentMkrTypeTermDict[dTerm] = aTerm
-
-    # map marker keys to their marker type
-    cmd = '''
-        select _Marker_Type_key, _Marker_key
-        from MRK_Marker
-        where _Marker_Status_key = 1
-        '''
-    results = db.sql(cmd, 'auto')
+    db.sql('drop table clos', None)
+
+#
+# The reference data lookups, in load order
+# Looks like [ [name, loader, stamp query, [lookups it depends on],
+#	[globals it fills]], ...]
+#
+# A lookup is loaded when the first check or report that needs it is
+# run, and released once none of the checks and reports still to run
+# need it.
+#
+# The stamp query returns one row which changes when the data the lookup
+# is loaded from changes, so a long running process can tell which
+# lookups need to be reloaded.
+#
+STAMP_MARKERS = '''select
+        (select count(*) from MRK_Marker) as markerCount,
+        (select max(modification_date) from MRK_Marker) as markerDate,
+        (select max(modification_date) from ACC_Accession
+            where _MGIType_key = 2) as accDate'''
+STAMP_TERMS = '''select
+        (select count(*) from VOC_Term where _Vocab_key = 79) as termCount,
+        (select max(modification_date) from VOC_Term
+            where _Vocab_key = 79) as termDate,
+        (select max(modification_date) from ACC_Accession
+            where _MGIType_key = 13
+            and _LogicalDB_key in (145,146)) as accDate'''
+STAMP_ANNOTS = '''select count(*) as annotCount,
+        max(modification_date) as annotDate
+        from VOC_Annot
+        where _AnnotType_key = 1011'''
+STAMP_MKRTYPES = '''select count(*) as typeCount,
+        max(modification_date) as typeDate
+        from MRK_Types'''
+STAMP_NOTES = '''select count(*) as noteCount,
+        max(modification_date) as noteDate
+        from MGI_Note
+        where _MGIType_key = 13
+        and _NoteType_key = 1001'''
+STAMP_JNUMS = '''select count(*) as jNumCount,
+        max(modification_date) as jNumDate
+        from ACC_Accession
+        where _MGIType_key = 1
+        and prefixPart = 'J:' '''
+STAMP_EVIDCODES = '''select count(*) as evidCount,
+        max(modification_date) as evidDate
+        from VOC_Term
+        where _Vocab_key = 80'''
+STAMP_EDITORS = '''select count(*) as userCount,
+        max(modification_date) as userDate
+        from MGI_User'''
+STAMP_CLOSURE = '''select
+        (select count(*) from DAG_Closure where _DAG_key = 9) as closureCount,
+        (select max(modification_date) from VOC_Term
+            where _Vocab_key = 79) as termDate'''
+
+LOOKUPS = [
+    ['mgiIDToSymbol', loadMgiIDToSymbol, STAMP_MARKERS, [],
+        [mgiIDToSymbolDict]],
+    ['termIDToTerm', loadTermIDToTerm, STAMP_TERMS, [],
+        [termIDToTermDict, termIDSet]],
+    ['jNums', loadJNums, STAMP_JNUMS, [], [jNumSet]],
+    ['evidCodes', loadEvidCodes, STAMP_EVIDCODES, [], [evidCodeSet]],
+    ['editors', loadEditors, STAMP_EDITORS, [], [editorSet]],
+    ['mgdAnnots', loadMgdAnnots, STAMP_ANNOTS, [],
+        [mgdMgiIdToTermIdDict, annotMkrKeySet]],
+    ['mkrTypes', loadMkrTypes, STAMP_MARKERS, [],
+        [mkrKeyIndex, mgiIdToMkrKeyDict]],
+    ['mkrTypeNames', loadMkrTypeNames, STAMP_MKRTYPES, [],
+        [mkrTypeKeyToMkrTypeDict, mkrTypeToKeyDict]],
+    ['markerStatus', loadMarkerStatus, STAMP_MARKERS, [],
+        [markerStatusDict]],
+    ['mcvNotes', loadMcvNotes, STAMP_NOTES, ['mkrTypeNames'],
+        [mkrTypeToAssocMCVTermDict, mcvTermToMkrTypeDict]],
+    ['mcvClosure', loadMcvClosure, STAMP_CLOSURE, ['mcvNotes'],
+        [mcvTermToParentMkrTypeTermDict]],
+    ]
+
+# the lookups loaded from the temp table, dropped for each input file
+INPUT_LOOKUPS = ['markerStatus']
+
+# Looks like {lookupName:stamp, ...}
+# the stamps of the data the lookups were loaded from
+lookupStamps = {}
+
+# Looks like {lookupName:entries, ...}
+# the number of entries in each lookup when it was last loaded
+lookupSizes = {}
+
+# 1 if loaded lookups are kept for the next input file or job
+# (a batch or the QC server), 0 if they are released when no longer needed
+keepLookups = 0
+
+#
+# Purpose: Get the stamp of the data a lookup is loaded from
+# Returns: the stamp as a string
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getLookupStamp (stampQuery):
+    results = db.sql(stampQuery, 'auto')
+    stamp = []
     for r in results:
-        mkrTypeKey = r['_Marker_Type_key']
-        mkrKey = r['_Marker_key']
-        mkrKeyToMkrTypeKeyDict[mkrKey] = mkrTypeKey
+        stamp = stamp + list(map(str, list(r.values())))
+    return '|'.join(stamp)
 
+#
+# Purpose: Load the reference data lookups, noting the time spent
+#	loading each lookup and its number of entries
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadLookups (names = None):
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if names != None and name not in names:
+            continue
+        start = time.time()
+        lookupStamps[name] = getLookupStamp(stampQuery)
+        loader()
+        seconds = time.time() - start
+        phaseTimes['lookup:' + name] = \
+            phaseTimes.get('lookup:' + name, 0) + seconds
+
+        lookupSizes[name] = 0
+        for d in data:
+            lookupSizes[name] = lookupSizes[name] + len(d)
+        print('Loaded lookup %s: %s entries in %.2f seconds' % \
+            (name, lookupSizes[name], seconds))
+        sys.stdout.flush()
+
+#
+# Purpose: Release the loaded lookups that are not in the given list,
+#	unless lookups are kept
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def releaseLookups (keepNames):
+    if keepLookups:
+        return
+
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if name in lookupStamps and name not in keepNames:
+            for d in data:
+                d.clear()
+            del lookupStamps[name]
+            if name in idReferences:
+                del idReferences[name]
+
+#
+# Purpose: Drop the lookups loaded from the temp table, even if lookups
+#	are kept
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def dropInputLookups ():
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if name in INPUT_LOOKUPS and name in lookupStamps:
+            for d in data:
+                d.clear()
+            del lookupStamps[name]
+
+#
+# Purpose: Load the reference data lookups that have not been loaded yet
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def ensureLookups (names = None):
+    loadNames = []
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if (names == None or name in names) and name not in lookupStamps:
+            loadNames.append(name)
+    loadLookups(loadNames)
+
+#
+# Purpose: Reload the reference data lookups whose data has changed
+#	since they were loaded, and the lookups that depend on them
+# Returns: the names of the reloaded lookups
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def refreshLookups ():
+    reloadNames = []
+    stampCache = {}
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if name in INPUT_LOOKUPS:
+            continue
+        if stampQuery not in stampCache:
+            stampCache[stampQuery] = getLookupStamp(stampQuery)
+        if name not in lookupStamps or \
+                lookupStamps[name] != stampCache[stampQuery]:
+            reloadNames.append(name)
+            continue
+        for dependName in dependsOn:
+            if dependName in reloadNames:
+                reloadNames.append(name)
+                break
+    loadLookups(reloadNames)
+    return reloadNames
+
+#
+# Purpose: Get the stamp of the reference data the per-line checks are
+#	run against
+# Returns: the stamp as a string
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getCacheStamp ():
+    # the marker checks query the markers and their accession IDs
+    stampQueries = [STAMP_MARKERS]
+    for name, loader, stampQuery, dependsOn, data in LOOKUPS:
+        if name in getRequiredLookups(LINE_CHECKS) and \
+                stampQuery not in stampQueries:
+            stampQueries.append(stampQuery)
+
+    stamp = [CACHE_VERSION]
+    for stampQuery in stampQueries:
+        stamp.append(getLookupStamp(stampQuery))
+    return '|'.join(stamp)
+
+#
+# Purpose: Get the key of an input record in the verdict cache
+# Returns: the key, a hex digest of the fields checked by the per-line
+#	checks
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getLineKey (row):
+    return hashlib.sha1(TAB.join(row).encode()).hexdigest()
+
+#
+# Purpose: Load the verdict cache, if the cache is used and it was
+#	written against the current reference data
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def loadCache ():
+    global cachedLines, cachedOrder, cacheStamp
+
+    cachedLines = None
+    cachedOrder = []
+    if cacheFile == '' or selectedChecks != None:
+        return
+
+    cacheStamp = getCacheStamp()
+    cachedLines = set()
+    if not os.path.isfile(cacheFile):
+        return
+
+    fpCache = open(cacheFile, 'r')
+    line = fpCache.readline()
+    if line[:-1] != '#stamp' + TAB + cacheStamp:
+        print('The reference data has changed, all lines are checked')
+        fpCache.close()
+        return
+    for line in fpCache:
+        cachedOrder.append(line[:-1])
+    fpCache.close()
+    cachedLines = set(cachedOrder)
+
+#
+# Purpose: Write the verdict cache: the lines of this input file with
+#	no values reported by the per-line checks, then the lines of the
+#	earlier runs, up to ${MCVQC_CACHE_MAX_LINES} lines
+# Returns: Nothing
+# Assumes: all the per-line checks have been run
+# Effects: replaces the cache file
+# Throws: Nothing
+#
+def saveCache ():
+    if cachedLines == None:
+        return
+
+    keys = []
+    keySet = set()
+    for row in inputRows:
+        clean = 1
+        for value in row:
+            if value.lower() in dirtyValues:
+                clean = 0
+                break
+        if clean:
+            key = getLineKey(row)
+            if key not in keySet:
+                keys.append(key)
+                keySet.add(key)
+
+    for key in cachedOrder:
+        if len(keys) >= cacheMaxLines:
+            break
+        if key not in keySet:
+            keys.append(key)
+            keySet.add(key)
+    del keys[cacheMaxLines:]
+
+    tmpFile = '%s.%s' % (cacheFile, os.getpid())
+    try:
+        fpCache = open(tmpFile, 'w')
+    except:
+        print('Cannot open output file: ' + tmpFile)
+        sys.exit(1)
+    fpCache.write('#stamp' + TAB + cacheStamp + NL)
+    for key in keys:
+        fpCache.write(key + NL)
+    fpCache.close()
+    os.rename(tmpFile, cacheFile)
 
 #
 # Purpose: Open the files.
@@ -493,7 +1503,7 @@ def openFiles ():
     # Open the input file.
     #
     try:
-        fpInput = open(inputFile, 'r')
+        fpInput = mcvInput.openInput(inputFile)
     except:
         print('Cannot open input file: ' + inputFile)
         sys.exit(1)
@@ -651,16 +1661,12 @@ def loadTempTable ():
                 closeFiles()
                 sys.exit(1)
             # write out to the bcp file:
-            fpBCP.write(termID + TAB + mgiID + TAB + jNum +  TAB + evidCode + \
-            TAB + editor + NL)
+            addInputRow([termID, mgiID, jNum, evidCode, editor])
 
             # add to the annotation dictionary so it gets written to the 
             # annotation file
-            annotList = [termID, mgiID, jNum, evidCode, inferFrom, qual, \
-                editor, date, notes, ldb]
-            if mgiID not in annot:
-                annot[mgiID] = []
-            annot[mgiID].append(annotList)
+            addAnnot([termID, mgiID, jNum, evidCode, inferFrom, qual, \
+                editor, date, notes, ldb])
                 
             # get next input line and continue
             line = fpInput.readline()
@@ -730,8 +1736,7 @@ def loadTempTable ():
             closeFiles()
             sys.exit(1)
 
-        fpBCP.write(termID + TAB + mgiID + TAB + jNum +  TAB + evidCode + \
-            TAB + editor + NL)
+        addInputRow([termID, mgiID, jNum, evidCode, editor])
 
         #
         # Maintain a dictionary of the MGI IDs that are in the input file.
@@ -739,11 +1744,8 @@ def loadTempTable ():
         # the annotation attributes for that the MGI ID.
         #
         if mgiID != '':
-            annotList = [termID, mgiID, jNum, evidCode,	inferFrom, \
-                qual, editor, date, notes, ldb]
-            if mgiID not in annot:
-                annot[mgiID] = []
-            annot[mgiID].append(annotList)
+            addAnnot([termID, mgiID, jNum, evidCode, inferFrom, \
+                qual, editor, date, notes, ldb])
 
         line = fpInput.readline()
         count += 1
@@ -753,20 +1755,195 @@ def loadTempTable ():
     #
     fpBCP.close()
 
+    if annotRuns != []:
+        spillAnnot()
+        print('Annotations written to %s sorted runs' % len(annotRuns))
+        sys.stdout.flush()
+        mergeAnnotRuns()
+
+    if cachedLines != None:
+        print('Lines to check: %s, passed in an earlier run: %s' % \
+            (len(qcRows), len(inputRows) - len(qcRows)))
+        sys.stdout.flush()
+
     #
     # Load the input data into the temp table.
     #
     print('Load the input data into the temp table: ' + tempTable)
     sys.stdout.flush()
 
-    bcpCmd = '%s %s %s %s "/" %s "\\t" "\\n" mgd' % \
-        (BCP_COMMAND, db.get_sqlServer(), db.get_sqlDatabase(),tempTable,
-        bcpFile)
-    rc = os.system(bcpCmd)
-    if rc != 0:
-        closeFiles()
-        sys.exit(1)
+    bcpCmd = '%s %s %s %s "/" %s "\\t" "\\n" mgd' % \
+        (BCP_COMMAND, db.get_sqlServer(), db.get_sqlDatabase(),tempTable,
+        bcpFile)
+    rc = os.system(bcpCmd)
+    if rc != 0:
+        closeFiles()
+        sys.exit(1)
+
+
+#
+# Purpose: Add an annotation of the input file to annot, writing annot
+#	to a sorted run once it holds ${MCVQC_SPILL_ROWS} annotations
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def addAnnot (annotList):
+    global annotCount
+
+    mgiID = annotList[1]
+    if mgiID not in annot:
+        annot[mgiID] = []
+    annot[mgiID].append(annotList)
+    annotCount = annotCount + 1
+
+    if spillRows > 0 and annotCount >= spillRows:
+        spillAnnot()
+
+#
+# Purpose: Write the annotations of annot to a run file, sorted by MGI ID
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables, writes the run file
+# Throws: Nothing
+#
+def spillAnnot ():
+    global annotCount
+
+    fpRun = openAnnotRun()
+    for mgiID in sorted(annot.keys()):
+        for attrList in annot[mgiID]:
+            fpRun.write(TAB.join(attrList) + NL)
+    fpRun.close()
+
+    annot.clear()
+    annotCount = 0
+
+#
+# Purpose: Open a new run file of annotations
+# Returns: the file object
+# Assumes: Nothing
+# Effects: Sets global variables, creates the run file
+# Throws: Nothing
+#
+def openAnnotRun ():
+    global annotRunCount
+
+    runFile = '%s.run%s' % (bcpFile, annotRunCount)
+    try:
+        fpRun = open(runFile, 'w')
+    except:
+        print('Cannot open output file: ' + runFile)
+        sys.exit(1)
+    annotRunCount = annotRunCount + 1
+    annotRuns.append(runFile)
+    return fpRun
+
+#
+# Purpose: Merge the run files of annotations, MAX_MERGE_RUNS at a time,
+#	until no more than MAX_MERGE_RUNS are left to be read at once
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables, replaces the run files
+# Throws: Nothing
+#
+def mergeAnnotRuns ():
+    global annotRuns
+
+    while len(annotRuns) > MAX_MERGE_RUNS:
+        runFiles = annotRuns
+        annotRuns = []
+        for i in range(0, len(runFiles), MAX_MERGE_RUNS):
+            mergeFiles = runFiles[i:i + MAX_MERGE_RUNS]
+            if len(mergeFiles) == 1:
+                annotRuns.append(mergeFiles[0])
+                continue
+            fpRun = openAnnotRun()
+            for attrList in mergeAnnotLists(mergeFiles):
+                fpRun.write(TAB.join(attrList) + NL)
+            fpRun.close()
+            for runFile in mergeFiles:
+                os.remove(runFile)
+
+#
+# Purpose: Merge the annotations of run files by MGI ID
+# Returns: generator of the attribute lists, sorted by MGI ID
+# Assumes: the run files are in input order
+# Effects: Nothing
+# Throws: Nothing
+#
+def mergeAnnotLists (runFiles):
+    # the merge keeps the annotations of the first run first for the
+    # same MGI ID, so they stay in input order
+    runs = []
+    for runFile in runFiles:
+        runs.append(readAnnotRun(runFile))
+    return heapq.merge(*runs, key=lambda a: a[1])
+
+#
+# Purpose: Read the annotations of a run file
+# Returns: generator of the attribute lists
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def readAnnotRun (runFile):
+    fpRun = open(runFile, 'r')
+    for line in fpRun:
+        yield str.split(line[:-1], TAB)
+    fpRun.close()
+
+#
+# Purpose: Read the annotations of the input file by MGI ID, from annot
+#	or by merging the sorted runs. The annotations of an MGI ID are in
+#	the order of the input file.
+# Returns: generator of [mgiID, [attribute list, ...]], sorted by MGI ID
+# Assumes: loadTempTable() has been called
+# Effects: Nothing
+# Throws: Nothing
+#
+def readAnnot ():
+    if annotRuns == []:
+        for mgiID in sorted(annot.keys()):
+            yield [mgiID, annot[mgiID]]
+        return
+
+    for mgiID, attrs in itertools.groupby(mergeAnnotLists(annotRuns),
+            key=lambda a: a[1]):
+        yield [mgiID, list(attrs)]
+
+#
+# Purpose: Remove the run files of the annotations
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables, removes files
+# Throws: Nothing
+#
+def removeAnnotRuns ():
+    global annotRuns, annotRunCount
+
+    for runFile in annotRuns:
+        if os.path.exists(runFile):
+            os.remove(runFile)
+    annotRuns = []
+    annotRunCount = 0
 
+#
+# Purpose: Add a record of the input file, the record is written to the
+#	bcp file and checked by the per-line checks unless it is in the
+#	verdict cache
+# Returns: Nothing
+# Assumes: the bcp file is open
+# Effects: Sets global variables, writes to the bcp file
+# Throws: Nothing
+#
+def addInputRow (row):
+    inputRows.append(row)
+    if cachedLines != None and getLineKey(row) in cachedLines:
+        return
+    qcRows.append(row)
+    fpBCP.write(TAB.join(row) + NL)
 
 # Purpose: Create report for marker type/MCV feature type conflict
 # Returns: Nothing
@@ -786,28 +1963,17 @@ def createMarkerTypeConflictReport():
     fpConflictRpt.write(16*'-' + '  ' + 20*'-' + '  ' + \
                       30*'-' + '  ' + 30*'-' + '  ' + 30*'-' + NL)
 
-    cmds = []
-    #
-    # Get the MGI ID and Term IDs from the temp table
-    #
-    cmds.append('''
-        select tmp.termID, tmp.mgiID 
-        from %s tmp
-        where tmp.mgiID is not null
-        order by lower(tmp.mgiID)
-        ''' % (tempTable))
-
-    results = db.sql(cmds,'auto')
     conflictCt = 0
-    for r in results[0]:
+    for termID, mgiID, jNum, evidCode, editor in \
+            sorted(qcRows, key=lambda r: r[1].lower()):
         # get marker type
-        mgiID = r['mgiID']
-        if mgiID not in mgiIdToMkrTypeDict:
+        primary = markerStatusDict[mgiID][3]
+        if primary == None:
             print('MGI ID: %s not primary or not valid' % mgiID)
+            dirtyValues.add(mgiID.lower())
             continue
-        mkrType = mgiIdToMkrTypeDict[mgiID]
+        mkrType = primary[1]
         # get term
-        termID = r['termID']
         if termID not in termIDToTermDict:
             continue
         mcvTerm = termIDToTermDict[termID]
@@ -825,6 +1991,7 @@ def createMarkerTypeConflictReport():
             # save for later marker type update
             markersToUpdateDict[mgiID] = mcvMkrType
             conflictCt += 1
+            dirtyValues.add(mgiID.lower())
 
             loadAssignedTerm = mkrTypeToAssocMCVTermDict[mkrType]
 
@@ -856,79 +2023,25 @@ def createInvMarkerReport ():
     fpInvMrkRpt.write(20*'-' + '  ' + 16*'-' + '  ' + \
                       20*'-' + '  ' + 20*'-' + '  ' + 30*'-' + NL)
 
-    cmds = []
-
     #
     # Find any MGI IDs from the input data that:
     # 1) Do not exist in the database.
     # 2) Exist for a non-marker object.
     # 3) Exist for a marker, but the status is not "official" or "interim".
     #
-    cmds.append('''
-        select tmp.termID, 
-                tmp.mgiID, 
-                null as name, 
-                null as status 
-        from %s tmp
-        where tmp.mgiID is not null and
-            not exists (select 1
-                         from ACC_Accession a 
-                         where lower(a.accID) = lower(tmp.mgiID))
-         union
-         select tmp.termID, 
-                       tmp.mgiID, 
-                       t.name, 
-                       null as status 
-         from %s tmp, 
-                     ACC_Accession a1, 
-                     ACC_MGIType t 
-         where tmp.mgiID is not null and 
-                      lower(a1.accID) = lower(tmp.mgiID) and 
-                      a1._LogicalDB_key = 1 and 
-                      a1._MGIType_key != 2 and 
-                      not exists (select 1 
-                                  from ACC_Accession a2 
-                                  where lower(a2.accID) = lower(tmp.mgiID) and 
-                                        a2._LogicalDB_key = 1 and 
-                                        a2._MGIType_key = 2) and 
-                      a1._MGIType_key = t._MGIType_key 
-         union 
-         select tmp.termID, 
-                       tmp.mgiID, 
-                       t.name, 
-                       ms.status 
-         from %s tmp, 
-                     ACC_Accession a, 
-                     ACC_MGIType t, 
-                     MRK_Marker m, 
-                     MRK_Status ms 
-         where tmp.mgiID is not null and 
-                      lower(a.accID) = lower(tmp.mgiID) and 
-                      a._LogicalDB_key = 1 and 
-                      a._MGIType_key = 2 and 
-                      a._MGIType_key = t._MGIType_key and 
-                      a._Object_key = m._Marker_key and 
-                      m._Marker_Status_key != 1 and 
-                      m._Marker_Status_key = ms._Marker_Status_key 
-         order by mgiID, termID
-         ''' % (tempTable, tempTable, tempTable))
-
-    results = db.sql(cmds,'auto')
+    results = set()
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        for objectType, markerStatus in markerStatusDict[mgiID][1]:
+            if objectType == None:
+                objectType = ''
+            if markerStatus == None:
+                markerStatus = ''
+            results.add((mgiID, termID, objectType, markerStatus))
 
     #
     # Write the records to the report.
     #
-    for r in results[0]:
-        termID = r['termID']
-        mgiID = r['mgiID']
-        objectType = r['name']
-        markerStatus = r['status']
-
-        if objectType == None:
-            objectType = ''
-        if markerStatus == None:
-            markerStatus = ''
-
+    for mgiID, termID, objectType, markerStatus in sorted(results):
         if objectType == '':
             reason = 'MGI ID does not exist'
         elif markerStatus == '':
@@ -938,8 +2051,9 @@ def createInvMarkerReport ():
 
         fpInvMrkRpt.write('%-20s  %-16s  %-20s  %-20s  %-30s%s' %
             (termID, mgiID, objectType, markerStatus, reason, NL))
+        dirtyValues.add(mgiID.lower())
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpInvMrkRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     nonfatalCount += numErrors
     if numErrors > 0:
@@ -967,53 +2081,85 @@ def createSecMarkerReport ():
     fpSecMrkRpt.write(20*'-' + '  ' + 16*'-' + '  ' + \
                       50*'-' + '  ' + 16*'-' + NL)
 
-    cmds = []
-
     #
     # Find any MGI IDs from the input data that are secondary IDs
     # for a marker.
     #
-    cmds.append('''
-        select tmp.termID, 
-               tmp.mgiID, 
-               m.symbol, 
-               a2.accID 
-        from %s tmp, 
-                     ACC_Accession a1, 
-                     ACC_Accession a2, 
-                     MRK_Marker m 
-        where tmp.mgiID is not null and 
-                      lower(tmp.mgiID) = lower(a1.accID) and 
-                      a1._MGIType_key = 2 and 
-                      a1._LogicalDB_key = 1 and 
-                      a1.preferred = 0 and 
-                      a1._Object_key = a2._Object_key and 
-                      a2._MGIType_key = 2 and 
-                      a2._LogicalDB_key = 1 and 
-                      a2.preferred = 1 and 
-                      a2._Object_key = m._Marker_key 
-        order by lower(tmp.mgiID), lower(tmp.termID)
-        ''' % (tempTable))
-
-    results = db.sql(cmds,'auto')
+    results = []
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        for symbol, primaryID in markerStatusDict[mgiID][2]:
+            results.append([termID, mgiID, symbol, primaryID])
+    results.sort(key=lambda r: (r[1].lower(), r[0].lower()))
 
     #
     # Write the records to the report.
     #
-    for r in results[0]:
-        termID = r['termID']
-        mgiID = r['mgiID']
-
+    for termID, mgiID, symbol, primaryID in results:
         fpSecMrkRpt.write('%-20s  %-16s  %-50s  %-16s%s' %
-            (termID, mgiID, r['symbol'], r['accID'], NL))
+            (termID, mgiID, symbol, primaryID, NL))
+        dirtyValues.add(mgiID.lower())
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpSecMrkRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     if numErrors > 0:
         if not secMrkRptFile in nonfatalReportNames:
             nonfatalReportNames.append(secMrkRptFile + NL)
     nonfatalCount += numErrors
 
+#
+# Purpose: Note a value found by a fatal check, for the quarantine of
+#	the lines which have it
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def addFatalValue (column, value, reason):
+    if column not in fatalValues:
+        fatalValues[column] = {}
+    fatalValues[column][value.lower()] = reason
+
+#
+# Purpose: Get the reasons an annotation line fails the fatal checks
+# Returns: list of the reasons, empty if the line passes them
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getFatalReasons (attrList):
+    reasons = []
+    for column in sorted(fatalValues.keys()):
+        value = attrList[column].lower()
+        if value in fatalValues[column]:
+            reasons.append('%s: %s' % (fatalValues[column][value],
+                attrList[column]))
+    return reasons
+
+#
+# Purpose: Find the IDs which are not in the ID set of a lookup, with
+#	the configured ID engine. The numpy engine builds the reference
+#	of the set once for each load of the lookup.
+# Returns: list of the invalid IDs, in list order
+# Assumes: the lookup is loaded
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def findInvalidIds (ids, idSet, lookupName):
+    if idEngine != 'numpy':
+        invalid = []
+        for id in ids:
+            if id.lower() not in idSet:
+                invalid.append(id)
+        return invalid
+
+    stamp = lookupStamps[lookupName]
+    if lookupName not in idReferences or idReferences[lookupName][0] != stamp:
+        idReferences[lookupName] = [stamp, mcvIdArray.buildReference(idSet)]
+    invalid = []
+    for i in mcvIdArray.findMissing(idReferences[lookupName][1], ids):
+        invalid.append(ids[i])
+    return invalid
+
 #
 # Purpose: Create the invalid MCV/SO term ID report.
 # Returns: Nothing
@@ -1030,34 +2176,28 @@ def createInvTermIdReport ():
     fpInvTermIdRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
     fpInvTermIdRpt.write('%-20s%s' % ('Term ID',NL))
     fpInvTermIdRpt.write(20*'-' + NL)
-    cmds = []
 
     #
     # Find any term IDs from the input data that are not in the database.
     #
-    cmds.append('''
-        select tmp.termID
-        from %s tmp 
-        where tmp.termID is not null and 
-                      not exists (select 1 
-                                  from ACC_Accession a 
-                                  where lower(a.accID) = lower(tmp.termID) and 
-                                        a._MGIType_key = 13 and 
-                                        a._LogicalDB_key in (145,146)) 
-        order by lower(tmp.termID)
-        ''' % (tempTable))
-
-    results = db.sql(cmds,'auto')
+    termIDs = []
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        if termID != '':
+            termIDs.append(termID)
+    results = findInvalidIds(termIDs, termIDSet, 'termIDToTerm')
+    for termID in results:
+        dirtyValues.add(termID.lower())
+        addFatalValue(0, termID, 'invalid term ID')
+    results.sort(key=str.lower)
 
     #
     # Write a record to the report for each sequence ID that is not in the
     # database..
     #
-    for r in results[0]:
-        termID = r['termID']
+    for termID in results:
         fpInvTermIdRpt.write('%-20s%s' % (termID, NL))
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpInvTermIdRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     fatalCount += numErrors
     if numErrors > 0:
@@ -1081,32 +2221,27 @@ def createGroupingTermIdReport ():
     fpGroupingTermRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
     fpGroupingTermRpt.write('%-20s %-20s%s' % ('MGI ID', 'Term ID',NL))
     fpGroupingTermRpt.write(20*'-' + ' ' + 20*'-' + NL)
-    quotedTerms=''
+    groupingTermSet = set()
     for t in str.split(groupingTermIds, ','):
-        quotedTerms = "%s'%s'," % (quotedTerms, t)
-    quotedTerms = quotedTerms[:-1]
-    cmds = []
+        groupingTermSet.add(t.lower())
+
     #
     # Find any annotations to grouping IDs
     #
-    cmds.append('''
-        select tmp.mgiID, tmp.termID 
-        from %s tmp 
-        where tmp.termID is not null 
-        and lower(tmp.termID) in (%s)
-        order by lower(tmp.termID)
-        ''' % (tempTable, quotedTerms.lower()))
-    results = db.sql(cmds,'auto')
+    results = []
+    for termID, mgiID, jNum, evidCode, editor in inputRows:
+        if termID != '' and termID.lower() in groupingTermSet:
+            results.append([mgiID, termID])
+            addFatalValue(0, termID, 'grouping term')
+    results.sort(key=lambda r: r[1].lower())
 
     #
     # Write a record to the report for each grouping term annotation
     #
-    for r in results[0]:
-        mgiID = r['mgiID']
-        termID = r['termID']
+    for mgiID, termID in results:
         fpGroupingTermRpt.write('%-20s%s%-20s%s' % (mgiID, TAB, termID, NL))
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpGroupingTermRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     fatalCount += numErrors
     if numErrors > 0:
@@ -1129,33 +2264,27 @@ def createInvJNumReport ():
     fpInvJNumRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
     fpInvJNumRpt.write('%-20s%s' % ('J Number',NL))
     fpInvJNumRpt.write(20*'-' + NL)
-    cmds = []
 
     #
     # Find any J Numbers from the input data that are not in the database.
     #
-    cmds.append('''
-        select tmp.jNum 
-        from %s tmp 
-        where tmp.jNum is not null and
-            not exists (select 1 from ACC_Accession a 
-                  where lower(a.accID) = lower(tmp.jNum) and 
-                        a._MGIType_key = 1 and 
-                        a._LogicalDB_key = 1 and 
-                        a.prefixPart = 'J:' and 
-                        a.preferred = 1) 
-        order by lower(tmp.jNum)
-        ''' % (tempTable))
-    results = db.sql(cmds,'auto')
+    jNums = []
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        if jNum != '':
+            jNums.append(jNum)
+    results = findInvalidIds(jNums, jNumSet, 'jNums')
+    for jNum in results:
+        dirtyValues.add(jNum.lower())
+        addFatalValue(2, jNum, 'invalid J number')
+    results.sort(key=str.lower)
 
     #
     # Write the records to the report.
     #
-    for r in results[0]:
-        jNum = r['jNum']
+    for jNum in results:
         fpInvJNumRpt.write('%-20s%s' % (jNum, NL))
    
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpInvJNumRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     fatalCount += numErrors
     if numErrors > 0:
@@ -1178,29 +2307,24 @@ def createInvEvidReport ():
     fpInvEvidRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
     fpInvEvidRpt.write('%-20s%s' % ('Evidence Code',NL))
     fpInvEvidRpt.write(20*'-' + NL)
-    cmds = []
 
     #
     # Find any Evidence Codes from the input data that are not in the database.
     #
-    cmds.append('''
-        select tmp.evidCode 
-        from %s tmp 
-        where tmp.evidCode is not null and 
-            not exists (select 1 from VOC_Term t 
-                where t._Vocab_key = 80 and 
-                lower(tmp.evidCode) = lower(t.term))
-        ''' % (tempTable))
-    results = db.sql(cmds,'auto')
+    results = []
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        if evidCode != '' and evidCode.lower() not in evidCodeSet:
+            results.append(evidCode)
+            dirtyValues.add(evidCode.lower())
+            addFatalValue(3, evidCode, 'invalid evidence code')
 
     #
     # Write the records to the report.
     #
-    for r in results[0]:
-        evidCode = r['evidCode']
+    for evidCode in results:
         fpInvEvidRpt.write('%-20s%s' % (evidCode, NL))
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpInvEvidRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     fatalCount += numErrors
     if numErrors > 0:
@@ -1223,28 +2347,24 @@ def createInvEditorReport ():
     fpInvEditorRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
     fpInvEditorRpt.write('%-20s%s' % ('Editor Login',NL))
     fpInvEditorRpt.write(20*'-' + NL)
-    cmds = []
 
     #
     # Find any Editor logins from the input data that are not in the database.
     #
-    cmds.append('''
-        select tmp.editor 
-        from %s tmp
-        where tmp.editor is not null and 
-        not exists (select 1 from MGI_User u 
-                where lower(u.login) = lower(tmp.editor))
-        ''' % (tempTable))
-    results = db.sql(cmds,'auto')
+    results = []
+    for termID, mgiID, jNum, evidCode, editor in qcRows:
+        if editor != '' and editor.lower() not in editorSet:
+            results.append(editor)
+            dirtyValues.add(editor.lower())
+            addFatalValue(6, editor, 'invalid editor')
 
     #
     # Write the records to the report.
     #
-    for r in results[0]:
-        editor = r['editor']
+    for editor in results:
         fpInvEditorRpt.write('%-20s%s' % (editor, NL))
 
-    numErrors = len(results[0])
+    numErrors = len(results)
     fpInvEditorRpt.write(NL + 'Number of Rows: ' + str(numErrors) + NL)
     fatalCount += numErrors
     if numErrors > 0:
@@ -1281,11 +2401,8 @@ def createMultipleMCVReport():
                       'Term ID','Term',NL))
     fpMultiMCVRpt.write(20*'-' + ' ' + 16*'-' + ' ' + 20*'-' + ' ' + 30*'-' + ' ' + NL)
 
-    mgiIDList = list(annot.keys())
-    mgiIDList.sort()
     multiCt = 0
-    for mgiID in mgiIDList:
-        attrs = annot[mgiID]
+    for mgiID, attrs in readAnnot():
         if len(attrs) > 1:
             multiCt += 1
             for attrList in attrs:
@@ -1351,18 +2468,43 @@ def createAnnotFile ():
     print('Create the annotation file')
     sys.stdout.flush()
 
+    global quarantineCount
+
     try:
         fpAnnot = open(annotFile, 'w')
     except:
         print('Cannot open output file: ' + annotFile)
         sys.exit(1)
 
-    mgiIDList = list(annot.keys())
-    mgiIDList.sort()
+    fpQuarantine = None
+    if quarantine:
+        try:
+            fpQuarantine = open(quarantineFile, 'w')
+        except:
+            print('Cannot open output file: ' + quarantineFile)
+            sys.exit(1)
+        fpQuarantine.write(QUARANTINE_HEADER)
+
+    for mgiID, attrs in readAnnot():
+        #
+        # The annotations of a marker are replaced by the load, so all
+        # the lines of a marker with a line that failed a fatal check
+        # are quarantined.
+        #
+        if fpQuarantine != None and fatalValues != {}:
+            lineReasons = []
+            for attrList in attrs:
+                lineReasons.append(getFatalReasons(attrList))
+            if lineReasons != [[]] * len(attrs):
+                quarantinedMarkers.add(mgiID)
+                for attrList, reasons in zip(attrs, lineReasons):
+                    if reasons == []:
+                        reasons = ['another line of the marker is quarantined']
+                    fpQuarantine.write(TAB.join(attrList) + TAB + \
+                        '; '.join(reasons) + NL)
+                    quarantineCount = quarantineCount + 1
+                continue
 
-    for mgiID in mgiIDList:
-        # get the list of attribute lists for this mgiID
-        attrs = annot[mgiID]
         # for each attribute list write out attributes to the
         # annotation file
         for attrList in attrs:
@@ -1371,6 +2513,43 @@ def createAnnotFile ():
             fpAnnot.write(line)
     fpAnnot.close()
 
+    if fpQuarantine != None:
+        fpQuarantine.close()
+        print('Quarantined %s lines of %s markers' % \
+            (quarantineCount, len(quarantinedMarkers)))
+        sys.stdout.flush()
+
+#
+# Purpose: Write the reference ID cache used by mcvLint.py to check
+#	the IDs of an input file when it is published
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: replaces the cache file
+# Throws: Nothing
+#
+def createLintCache ():
+    if lintCacheFile == '':
+        return
+
+    print('Create the reference ID cache')
+    sys.stdout.flush()
+
+    tmpFile = '%s.%s' % (lintCacheFile, os.getpid())
+    try:
+        fpCache = open(tmpFile, 'w')
+    except:
+        print('Cannot open output file: ' + tmpFile)
+        sys.exit(1)
+    for idType, idSet in [['termID', termIDSet], ['jNum', jNumSet],
+            ['evidCode', evidCodeSet], ['editor', editorSet]]:
+        for id in idSet:
+            fpCache.write(idType + TAB + id + NL)
+    fpCache.close()
+
+    # the cache is replaced at once, a lint never reads a partial cache
+    os.chmod(tmpFile, 0o664)
+    os.rename(tmpFile, lintCacheFile)
+
 #
 # Purpose: Update markers the the MCV marker type
 # Returns: Nothing
@@ -1380,57 +2559,635 @@ def createAnnotFile ():
 #
 def updateMarkerType ():
     for mgiID in markersToUpdateDict:
+        # the annotations of a quarantined marker are not loaded
+        if mgiID in quarantinedMarkers:
+            continue
         typeTerm = markersToUpdateDict[mgiID]
         mrkTypeKey = mkrTypeToKeyDict[typeTerm]
-        results = db.sql(MARKER_KEY % mgiID, 'auto')
-        mrkKey = results[0]['_Marker_key']
+        mrkKey = markerStatusDict[mgiID][3][0]
         db.sql(UPDATE % (mrkTypeKey, updatedByKey, mrkKey), None)
     db.commit()
 
+#
+# Purpose: Determine whether a marker has MCV annotations once the
+#	annotation file has been loaded. Markers in the input file have
+#	their annotations replaced by the load, all other markers keep
+#	their annotations in the database, the quarantined markers too.
+# Returns: 1 if the marker is annotated, 0 if not
+# Assumes: inputAnnotDict maps the marker keys of the input file to
+#	1 if the input has term IDs for the marker, 0 if not
+# Effects: Nothing
+# Throws: Nothing
+#
+def isAnnotatedAfterLoad (mkrKey, inputAnnotDict):
+    if mkrKey in inputAnnotDict:
+        return inputAnnotDict[mkrKey]
+    return mkrKey in annotMkrKeySet
+
+#
+# Purpose: Create the report of official markers with no MCV annotation
+#	once this load has completed. The report is computed from the
+#	marker index and the annotated marker index built by init() and
+#	the annotations in the input file.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes the report
+# Throws: Nothing
+#
+def createNoMcvAnnotReport ():
+    print('Create the markers with no MCV annotation report')
+    sys.stdout.flush()
+
+    # marker types to report, all marker types if none configured
+    reportTypes = []
+    for t in str.split(noMcvMkrTypes, ','):
+        if str.strip(t) != '':
+            reportTypes.append(str.strip(t))
+
+    # the post-load annotation state of the markers in the input file,
+    # the quarantined markers are not loaded
+    inputAnnotDict = {}
+    for mgiID in inputTermIdLookupByMgiId:
+        if mgiID in quarantinedMarkers:
+            continue
+        if mgiID in mgiIdToMkrKeyDict:
+            mkrKey = mgiIdToMkrKeyDict[mgiID]
+            inputAnnotDict[mkrKey] = len(inputTermIdLookupByMgiId[mgiID]) > 0
+
+    noAnnotSet = set()
+    for mkrKey in mkrKeyIndex:
+        if not isAnnotatedAfterLoad(mkrKey, inputAnnotDict):
+            noAnnotSet.add(mkrKey)
+
+    #
+    # Write the report sorted by marker type and symbol, using the marker
+    # type as updated by this load.
+    #
+    rptList = []
+    for mkrKey in noAnnotSet:
+        mgiID, symbol, mkrType = mkrKeyIndex[mkrKey]
+        if mgiID in markersToUpdateDict and mgiID not in quarantinedMarkers:
+            mkrType = markersToUpdateDict[mgiID]
+        if reportTypes == [] or mkrType in reportTypes:
+            rptList.append((mkrType, symbol, mgiID))
+    rptList.sort()
+
+    try:
+        fpNoMcvRpt = open(noMcvRptFile, 'w')
+    except:
+        print('Cannot open report file: ' + noMcvRptFile)
+        sys.exit(1)
+    fpNoMcvRpt.write(str.center('Markers with no MCV Annotation',80) + NL)
+    fpNoMcvRpt.write(str.center('(' + timestamp + ')',80) + 2*NL)
+    fpNoMcvRpt.write('%-16s  %-30s  %-30s%s' %
+                     ('MGI ID','Symbol','Marker Type',NL))
+    fpNoMcvRpt.write(16*'-' + '  ' + 30*'-' + '  ' + 30*'-' + NL)
+    for mkrType, symbol, mgiID in rptList:
+        fpNoMcvRpt.write('%-16s  %-30s  %-30s%s' %
+            (mgiID, symbol, mkrType, NL))
+    fpNoMcvRpt.write(NL + 'Number of Markers with no MCV Annotation: ' +
+        str(len(rptList)) + NL)
+    fpNoMcvRpt.close()
+
+#
+# Purpose: Run a phase of the QC run and note the time spent in it,
+#	profiling it if profiling is on (see mcvProfile.py)
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def runPhase (phase, function):
+    start = time.time()
+    mcvProfile.runPhase(phase, function)
+    phaseTimes[phase] = phaseTimes.get(phase, 0) + time.time() - start
+
+#
+# Purpose: Run a check of the QC run and note the time spent in it and
+#	the number of discrepancy rows it found
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def runCheck (check, function):
+    errorCount = fatalCount + nonfatalCount
+    runPhase(check, function)
+    checkRows[check] = checkRows.get(check, 0) + \
+        fatalCount + nonfatalCount - errorCount
+
+#
+# Purpose: Write the run stats for the run history
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to the stats file
+# Throws: Nothing
+#
+def writeStats ():
+    try:
+        fpStats = open(statsFile, 'a')
+    except:
+        print('Cannot open output file: ' + statsFile)
+        sys.exit(1)
+    for fileName, size in inputSizes:
+        fpStats.write('input%s%s%s%s%s' % (TAB, fileName, TAB, size, NL))
+    for phase in phaseTimes:
+        fpStats.write('phase%s%s%s%.3f%s' % (TAB, phase, TAB, phaseTimes[phase], NL))
+    for check in checkRows:
+        fpStats.write('check%s%s%s%s%s' % (TAB, check, TAB, checkRows[check], NL))
+    # ru_maxrss is in kilobytes
+    fpStats.write('peakrss%smcvQC.py%s%s%s' % (TAB, TAB,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, NL))
+    fpStats.close()
+
+#
+# Purpose: Reset the state of the input file, before checking the next
+#	input file of a batch
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def resetInput ():
+    global annot, fatalCount, fatalReportNames, nonfatalCount
+    global nonfatalReportNames, inputTermIdLookupByMgiId, markersToUpdateDict
+    global inputRows, qcRows, dirtyValues, annotCount, quarantineCount
+
+    removeAnnotRuns()
+    annot = {}
+    annotCount = 0
+    fatalCount = 0
+    fatalReportNames = []
+    fatalValues.clear()
+    quarantinedMarkers.clear()
+    quarantineCount = 0
+    nonfatalCount = 0
+    nonfatalReportNames = []
+    inputTermIdLookupByMgiId = {}
+    markersToUpdateDict = {}
+    inputRows = []
+    qcRows = []
+    dirtyValues = set()
+
+#
+# Purpose: Write the reports of the next input file of a batch to
+#	the given directory
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets global variables.
+# Throws: Nothing
+#
+def setReportDir (rptDir):
+    global invMrkRptFile, secMrkRptFile, invTermIdRptFile, invJNumRptFile
+    global invEvidRptFile, invEditorRptFile, multiMcvRptFile
+    global conflictRptFile, groupingTermRptFile, beforeAfterRptFile
+    global rptNamesFile
+
+    readConfig()
+    invMrkRptFile = os.path.join(rptDir, os.path.basename(invMrkRptFile))
+    secMrkRptFile = os.path.join(rptDir, os.path.basename(secMrkRptFile))
+    invTermIdRptFile = os.path.join(rptDir, os.path.basename(invTermIdRptFile))
+    invJNumRptFile = os.path.join(rptDir, os.path.basename(invJNumRptFile))
+    invEvidRptFile = os.path.join(rptDir, os.path.basename(invEvidRptFile))
+    invEditorRptFile = os.path.join(rptDir, os.path.basename(invEditorRptFile))
+    multiMcvRptFile = os.path.join(rptDir, os.path.basename(multiMcvRptFile))
+    conflictRptFile = os.path.join(rptDir, os.path.basename(conflictRptFile))
+    groupingTermRptFile = os.path.join(rptDir, os.path.basename(groupingTermRptFile))
+    beforeAfterRptFile = os.path.join(rptDir, os.path.basename(beforeAfterRptFile))
+    rptNamesFile = os.path.join(rptDir, os.path.basename(rptNamesFile))
+
+#
+# Purpose: Create the report of markers annotated to different terms in
+#	different input files of a batch
+# Returns: the number of markers with conflicts
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def createCrossFileConflictReport (fileAnnot):
+    print('Create the cross-file conflict report')
+    sys.stdout.flush()
+
+    # Looks like {mgiID:{inputFile:[termID, ...], ...}, ...}
+    termIdsByFile = {}
+    for fileName in inputFiles:
+        for mgiID in fileAnnot[fileName]:
+            termIDs = []
+            for attrList in fileAnnot[fileName][mgiID]:
+                if attrList[0] != '' and attrList[0] not in termIDs:
+                    termIDs.append(attrList[0])
+            termIDs.sort()
+            if mgiID not in termIdsByFile:
+                termIdsByFile[mgiID] = {}
+            termIdsByFile[mgiID][fileName] = termIDs
+
+    try:
+        fpCrossFileRpt = open(crossFileRptFile, 'w')
+    except:
+        print('Cannot open report file: ' + crossFileRptFile)
+        sys.exit(1)
+    fpCrossFileRpt.write(str.center('Cross-File Conflict Report',110) + NL)
+    fpCrossFileRpt.write(str.center('(' + timestamp + ')',110) + 2*NL)
+    fpCrossFileRpt.write('%-16s  %-50s  %-40s%s' %
+                     ('MGI ID','Input File','Term ID(s)',NL))
+    fpCrossFileRpt.write(16*'-' + '  ' + 50*'-' + '  ' + 40*'-' + NL)
+
+    mgiIDList = list(termIdsByFile.keys())
+    mgiIDList.sort()
+    conflictCt = 0
+    for mgiID in mgiIDList:
+        files = termIdsByFile[mgiID]
+        termSets = []
+        for fileName in files:
+            if files[fileName] not in termSets:
+                termSets.append(files[fileName])
+        if len(termSets) < 2:
+            continue
+        conflictCt += 1
+        for fileName in inputFiles:
+            if fileName in files:
+                fpCrossFileRpt.write('%-16s  %-50s  %-40s%s' %
+                    (mgiID, fileName, ','.join(files[fileName]), NL))
+    fpCrossFileRpt.write(NL + 'Number of Markers with Cross-File Conflicts: ' +
+        str(conflictCt) + NL)
+    fpCrossFileRpt.close()
+
+    return conflictCt
+
+#
+# Purpose: Create the merged input file from the annotations of all
+#	input files of a batch, dropping lines repeated in several files
+# Returns: Nothing
+# Assumes: there are no cross-file conflicts
+# Effects: creates the merged file
+# Throws: Nothing
+#
+def createMergedFile (fileAnnot):
+    print('Create the merged input file: ' + mergedFile)
+    sys.stdout.flush()
+
+    # Looks like {mgiID:[ [annotAttributes1], ...], ...}
+    merged = {}
+    for fileName in inputFiles:
+        for mgiID in fileAnnot[fileName]:
+            if mgiID not in merged:
+                merged[mgiID] = []
+            for attrList in fileAnnot[fileName][mgiID]:
+                if attrList not in merged[mgiID]:
+                    merged[mgiID].append(attrList)
+
+    try:
+        fpMerged = open(mergedFile, 'w')
+    except:
+        print('Cannot open output file: ' + mergedFile)
+        sys.exit(1)
+
+    fpMerged.write(MERGED_HEADER)
+    mgiIDList = list(merged.keys())
+    mgiIDList.sort()
+    for mgiID in mgiIDList:
+        for attrList in merged[mgiID]:
+            fpMerged.write(TAB.join(attrList) + NL)
+    fpMerged.close()
+
+#
+# Purpose: Check each input file of a batch against reference data
+#	loaded once (by the first input file that needs them), then
+#	check for cross-file conflicts and create the
+#	merged input file.
+# Returns: the exit code, the highest exit code of the input files
+# Assumes: Nothing
+# Effects: creates the report files of each input file, the cross-file
+#	conflict report and the merged file
+# Throws: Nothing
+#
+def runBatch ():
+    global inputFile, keepLookups, spillRows
+
+    if liveRun == "1":
+        print('A "live" run takes one input file')
+        sys.exit(1)
+
+    print('DB Server:' + db.get_sqlServer())
+    print('DB Name:  ' + db.get_sqlDatabase())
+    sys.stdout.flush()
+
+    # the lookups are loaded once, for the first input file that needs them
+    keepLookups = 1
+
+    batchRc = 0
+    # Looks like {inputFile:annot, ...}
+    fileAnnot = {}
+    # Looks like [ [inputFile, reportsWithDiscrepancies], ...]
+    fileRptNames = []
+
+    for fileName in inputFiles:
+        print(NL + 'Input file: ' + fileName)
+        sys.stdout.flush()
+
+        inputFile = fileName
+        resetInput()
+        setReportDir(os.path.dirname(os.path.abspath(fileName)))
+
+        # the annotations of each input file are kept in memory for the
+        # cross-file checks
+        spillRows = 0
+
+        db.useOneConnection(1)
+        db.sql('delete from %s' % tempTable, None)
+        db.commit()
+        runPhase('loadInput', initInput)
+        rc = runQC()
+        batchRc = max(batchRc, rc)
+
+        fileAnnot[fileName] = annot
+        fpFileRptNames = open(rptNamesFile, 'r')
+        fileRptNames.append([fileName, fpFileRptNames.read()])
+        fpFileRptNames.close()
+
+    # the batch reports are written where the configuration says
+    readConfig()
+
+    conflictCt = createCrossFileConflictReport(fileAnnot)
+    if conflictCt > 0:
+        batchRc = max(batchRc, 2)
+
+    fpRptNamesRpt = open(rptNamesFile, 'a')
+    for fileName, names in fileRptNames:
+        fpRptNamesRpt.write(NL + 'Input file: ' + fileName + NL + names)
+    if conflictCt > 0:
+        fpRptNamesRpt.write('\nCross-file conflicts detected, see: %s\n' % crossFileRptFile)
+
+    if mergedFile != None:
+        if batchRc < 3 and conflictCt == 0:
+            createMergedFile(fileAnnot)
+            fpRptNamesRpt.write('\nMerged input file generated. See: %s\n' % mergedFile)
+        else:
+            fpRptNamesRpt.write('\nDid not generate merged input file because of errors\n')
+    fpRptNamesRpt.close()
+
+    return batchRc
+
+#
+# The checks, in the order they are run
+# Looks like [ [name, report function, tier, [lookups it needs]], ...]
+#
+# The marker checks read the MGI IDs of the temp table resolved once by
+# the markerStatus lookup. The lookups a lookup depends on (see LOOKUPS)
+# are loaded with it.
+#
+# Tier 1 are the fatal checks, against small sets of reference IDs.
+# In tiered mode tier 2 is only run if tier 1 finds no fatal errors.
+#
+CHECKS = [
+    ['invalidMarker', createInvMarkerReport, 2, ['markerStatus']],
+    ['secondaryMarker', createSecMarkerReport, 2, ['markerStatus']],
+    ['invalidTermId', createInvTermIdReport, 1, ['termIDToTerm']],
+    ['invalidJNum', createInvJNumReport, 1, ['jNums']],
+    ['invalidEvid', createInvEvidReport, 1, ['evidCodes']],
+    ['invalidEditor', createInvEditorReport, 1, ['editors']],
+    ['multipleMcv', createMultipleMCVReport, 2,
+        ['mgiIDToSymbol', 'termIDToTerm']],
+    ['mkrTypeConflict', createMarkerTypeConflictReport, 2,
+        ['markerStatus', 'termIDToTerm', 'mcvNotes', 'mcvClosure']],
+    ['groupingTerm', createGroupingTermIdReport, 1, []],
+    ]
+
+#
+# The per-line checks, whose result for an input line only depends on
+# that line and the reference data. A line which passed them is kept in
+# the verdict cache and not checked again (see loadCache()), these checks
+# only read qcRows or the temp table. The other checks are run on all
+# lines.
+#
+LINE_CHECKS = ['invalidMarker', 'secondaryMarker', 'invalidTermId',
+    'invalidJNum', 'invalidEvid', 'invalidEditor', 'mkrTypeConflict']
+
+#
+# The reports run after the checks, in the order they are run
+# Looks like [ [name, report function, [lookups it needs]], ...]
+#
+REPORTS = [
+    ['beforeAfter', createBeforeAfterReport,
+        ['mgiIDToSymbol', 'termIDToTerm', 'mgdAnnots']],
+    ['lintCache', createLintCache,
+        ['termIDToTerm', 'jNums', 'evidCodes', 'editors']],
+    ['annotFile', createAnnotFile, []],
+    ['updateMarkerType', updateMarkerType, ['mkrTypeNames', 'markerStatus']],
+    ['noMcvAnnot', createNoMcvAnnotReport, ['mkrTypes', 'mgdAnnots']],
+    ]
+
+#
+# Purpose: Parse the comma separated names of the checks to run
+# Returns: the list of check names
+# Assumes: Nothing
+# Effects: exits if a check name is not in CHECKS
+# Throws: Nothing
+#
+def setSelectedChecks (value):
+    checkNames = []
+    for name, function, tier, lookups in CHECKS:
+        checkNames.append(name)
+
+    names = []
+    for name in str.split(value, ','):
+        name = str.strip(name)
+        if name == '':
+            continue
+        if name not in checkNames:
+            print('Unknown check: %s' % name)
+            print('Checks: %s' % ','.join(checkNames))
+            sys.exit(1)
+        names.append(name)
+
+    if names == []:
+        print(USAGE)
+        sys.exit(1)
+    return names
+
+#
+# Purpose: Get the names of the lookups needed by the given checks and
+#	reports, including the lookups they depend on
+# Returns: the list of lookup names
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getRequiredLookups (checkNames, reportNames = []):
+    names = []
+    for name, function, tier, lookups in CHECKS:
+        if name in checkNames:
+            names = names + lookups
+    for name, function, lookups in REPORTS:
+        if name in reportNames:
+            names = names + lookups
+
+    # a lookup only depends on lookups before it in LOOKUPS
+    for name, loader, stampQuery, dependsOn, data in reversed(LOOKUPS):
+        if name in names:
+            names = names + dependsOn
+    return names
+
+#
+# Purpose: Get the names of the selected checks of a tier
+# Returns: the list of check names, in the order they are run
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getTierChecks (runTier):
+    checkNames = []
+    for name, function, tier, lookups in CHECKS:
+        if (runTier == None or tier == runTier) and \
+                (selectedChecks == None or name in selectedChecks):
+            checkNames.append(name)
+    return checkNames
+
+#
+# Purpose: Get the names of the reports that are run after the checks,
+#	given the errors found so far
+# Returns: the list of report names, in the order they are run
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getPlannedReports ():
+    reportNames = []
+    if selectedChecks == None and fatalCount == 0:
+        reportNames.append('beforeAfter')
+    if liveRun == "1":
+        reportNames.append('lintCache')
+        reportNames.append('annotFile')
+        reportNames.append('updateMarkerType')
+        if fatalCount == 0 or quarantine:
+            reportNames.append('noMcvAnnot')
+    return reportNames
+
+#
+# Purpose: Run the selected checks of a tier, loading the lookups each
+#	check needs before it is run and releasing the lookups no longer
+#	needed after it
+# Returns: Nothing
+# Assumes: laterChecks are the names of the checks that may be run
+#	after this tier
+# Effects: creates the reports of the checks
+# Throws: Nothing
+#
+def runChecks (runTier, laterChecks = []):
+    checkNames = getTierChecks(runTier)
+
+    for name, function, tier, lookups in CHECKS:
+        if name not in checkNames:
+            continue
+        # a per-line check with no lines to check needs no lookups
+        if name not in LINE_CHECKS or qcRows != []:
+            runPhase('loadLookups',
+                lambda: ensureLookups(getRequiredLookups([name])))
+        runCheck(name, function)
+        checkNames.remove(name)
+        releaseLookups(getRequiredLookups(checkNames + laterChecks,
+            getPlannedReports()))
+
+#
+# Purpose: Run a report after loading the lookups it needs, and release
+#	the lookups no longer needed after it
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: creates the report
+# Throws: Nothing
+#
+def runReport (reportName):
+    for name, function, lookups in REPORTS:
+        if name != reportName:
+            continue
+        runPhase('loadLookups',
+            lambda: ensureLookups(getRequiredLookups([], [name])))
+        runPhase(name, function)
+
+    reportNames = getPlannedReports()
+    if reportName in reportNames:
+        reportNames = reportNames[reportNames.index(reportName) + 1:]
+    releaseLookups(getRequiredLookups([], reportNames))
+
+#
+# Purpose: Generate the QC reports, and the annotation file for a
+#	"live" run.
+# Returns: the exit code
+# Assumes: init() has been called
+# Effects: creates the report and annotation files, updates marker types
+#	for a "live" run
+# Throws: Nothing
+#
+def runQC ():
+    if tiered:
+        runChecks(1, getTierChecks(2))
+        if fatalCount > 0 and not fullRun:
+            fpRptNamesRpt.write('\nFatal QC errors in the first tier of checks, the marker checks were not run (use --full to run them)\n')
+            releaseLookups(getRequiredLookups([], getPlannedReports()))
+        else:
+            runChecks(2)
+            runPhase('saveCache', saveCache)
+    else:
+        runChecks(None)
+        runPhase('saveCache', saveCache)
+
+    if selectedChecks != None:
+        fpRptNamesRpt.write('\nChecks run: %s\n' % ','.join(selectedChecks))
+        fpRptNamesRpt.write('\nDid not generate before/after file, not all checks were run\n')
+    elif fatalCount == 0:
+        runReport('beforeAfter')
+        nonfatalReportNames.append('\nBefore/After file generated. See: %s\n' % beforeAfterRptFile)
+    else:
+        fatalReportNames.append('\nDid not generate before/after file because of errors\n')
+    closeFiles()
+
+    if liveRun == "1":
+        runReport('lintCache')
+        runReport('annotFile')
+        runReport('updateMarkerType')
+        # in quarantine mode, the markers with no fatal errors are loaded
+        if fatalCount == 0 or quarantinedMarkers != set():
+            runReport('noMcvAnnot')
+
+    # write  non fatal report names to stdout
+    names = ''.join(nonfatalReportNames)
+    fpRptNamesRpt.write('\nNon-Fatal QC errors detected in the following files:\n')
+    fpRptNamesRpt.write(names)
+
+    # write fatal report names to stdout
+    fpRptNamesRpt.write('\nFatalQC errors detected in the following files:\n')
+    names = ''.join(fatalReportNames)
+    fpRptNamesRpt.write(names)
+
+    # the fatal errors are quarantined, the other markers are loaded
+    quarantined = fatalCount > 0 and quarantinedMarkers != set()
+    if quarantined:
+        fpRptNamesRpt.write('\nQuarantined %s lines of %s markers with fatal QC errors, the other annotations are loaded. See: %s\n' % \
+            (quarantineCount, len(quarantinedMarkers), quarantineFile))
+
+    fpRptNamesRpt.close()
+    db.useOneConnection(0)
+    removeAnnotRuns()
+    dropInputLookups()
+
+    if fatalCount > 0 and not quarantined: # fatal errors
+        return 3
+    #elif multiCt > 0 or conflictCt > 0:
+    elif nonfatalCount > 0 or quarantined:
+        return 2
+    else:
+        return 0
+
 #	
 # Main
 #
-checkArgs()
-init()
-
-createInvMarkerReport()
-createSecMarkerReport()
-createInvTermIdReport()
-createInvJNumReport()
-createInvEvidReport()
-createInvEditorReport()
-createMultipleMCVReport()
-createMarkerTypeConflictReport()
-createGroupingTermIdReport()
-
-if fatalCount == 0:
-    createBeforeAfterReport()
-    nonfatalReportNames.append('\nBefore/After file generated. See: %s\n' % beforeAfterRptFile)
-else:
-    fatalReportNames.append('\nDid not generate before/after file because of errors\n')
-closeFiles()
-
-if liveRun == "1":
-    createAnnotFile()
-    updateMarkerType()
-
-# write  non fatal report names to stdout
-names = ''.join(nonfatalReportNames)
-fpRptNamesRpt.write('\nNon-Fatal QC errors detected in the following files:\n')
-fpRptNamesRpt.write(names)
-
-# write fatal report names to stdout
-fpRptNamesRpt.write('\nFatalQC errors detected in the following files:\n')
-names = ''.join(fatalReportNames)
-fpRptNamesRpt.write(names)
-
-fpRptNamesRpt.close()
-db.useOneConnection(0)
-
-if fatalCount > 0: # fatal errors
-    sys.exit(3)
-#elif multiCt > 0 or conflictCt > 0:
-elif nonfatalCount > 0:
-    sys.exit(2)
-else:
-    sys.exit(0)
+if __name__ == '__main__':
+    mcvProfile.init('mcvQC')
+    checkArgs()
+    if len(inputFiles) > 1 or mergedFile != None:
+        rc = runBatch()
+    else:
+        init()
+        rc = runQC()
+    writeStats()
+    sys.exit(rc)
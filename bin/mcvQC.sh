@@ -10,14 +10,37 @@
 #
 #  Usage:
 #
-#      mcvQC.sh  filename  [ "live" ]
+#      mcvQC.sh  [ -m mergedFile ]  [ --checks check,... ]  [ --full ]
+#                filename  [ filename ... ]  [ "live" ]
 #
 #      where
-#          filename = path to the input file
+#          filename = path to the input file, plain or compressed with
+#                 gzip or zstd (see mcvInput.py)
+#          mergedFile = path to the merged input file to create from
+#                 all input files (batch mode)
+#          check = name of a check to run, only the named checks are run
+#                 (see mcvQC.py), not for a "live" run or a merged file
+#          full = run the marker checks even if the fatal checks fail,
+#                 see MCVQC_TIERED
 #          live = option to let the script know that this is a "live" run
 #                 so the output files are created under the /data/loads
 #                 directory instead of the current directory
 #
+#      Batch mode: when more than one input file (or -m) is given, the
+#      QC-ready file and the sanity/QC reports of each input file are
+#      created in a directory named after the input file, with a ".qc"
+#      suffix, in the report directory, so the input files of a batch
+#      must have different file names. The reference data is loaded
+#      once for all input files. A "live" run takes one input file.
+#
+#      Concurrent runs: each run has a run ID (user, process ID and start
+#      time) which names its temp table and its QC-ready, bcp and stats
+#      files. The reports and the log are written to the current
+#      directory (the report and log directories for a "live" run),
+#      unless another run is writing its reports there. The reports and
+#      the log of this run are then written to a directory of its own,
+#      mcvQC.<run ID>, in the report directory.
+#
 #  Env Vars:
 #
 #      See the configuration file
@@ -45,6 +68,12 @@
 #
 #      - Log file (${MCVLOADQC_LOGFILE})
 #
+#      - Lock file of the report directory (.mcvQC.lock), locked (flock)
+#        while the run writes its reports there
+#
+#      - The run, added to the run history database (${RUN_HISTORY_DB}),
+#        see mcvRunHistory.py
+#
 #  Exit Codes:
 #
 #      0:  Successful completion
@@ -63,11 +92,13 @@
 #         and report files, so they reside in the current directory.
 #      5) Initialize the log and report files.
 #      6) Clean up the input files by removing blank lines, Ctrl-M, etc.
-#      7) Generate the sanity report.
+#      7) Generate the sanity report for each input file.
 #      8) Create a temp table for the input data.
 #      9) Call mcvQC.py to generate the QC reports and the
-#          annotation file.
+#          annotation file. For a non-live run, the job is sent to the
+#          resident QC service instead if one is running (mcvQCServer.sh).
 #      10) Drop the temp table.
+#      11) Add the run to the run history database.
 #
 #  Notes:  None
 #
@@ -78,7 +109,7 @@ BINDIR=`dirname $0`
 
 CONFIG=`cd ${BINDIR}/..; pwd`/mcvload.config
 
-USAGE='Usage: mcvQC.sh  filename  [ "live" ]'
+USAGE='Usage: mcvQC.sh  [ -m mergedFile ]  [ --checks check,... ]  [ --full ]  filename  [ filename ... ]  [ "live" ]'
 
 LIVE_RUN=0; export LIVE_RUN
 
@@ -87,24 +118,96 @@ LIVE_RUN=0; export LIVE_RUN
 # argument is given, that means that the output files are located in the
 # /data/loads/... directory, not in the current directory.
 #
-if [ $# -eq 1 ]
-then
-    INPUT_FILE=$1
-elif [ $# -eq 2 -a "$2" = "live" ]
+MERGED_FILE=""
+CHECKS=""
+FULL_ARGS=""
+while [ "$1" = "-m" -o "$1" = "-c" -o "$1" = "--checks" -o "$1" = "--full" ]
+do
+    if [ "$1" = "--full" ]
+    then
+        FULL_ARGS="--full"
+        shift
+        continue
+    fi
+    if [ $# -lt 2 ]
+    then
+        echo ${USAGE}; exit 1
+    fi
+    if [ "$1" = "-m" ]
+    then
+        MERGED_FILE=$2
+    else
+        CHECKS=$2
+    fi
+    shift 2
+done
+
+INPUT_FILES=""
+NUM_FILES=0
+for arg in "$@"
+do
+    if [ "${arg}" = "live" ]
+    then
+        LIVE_RUN=1
+    else
+        INPUT_FILES="${INPUT_FILES} ${arg}"
+        NUM_FILES=`expr ${NUM_FILES} + 1`
+    fi
+done
+
+if [ ${NUM_FILES} -eq 0 ]
 then
-    INPUT_FILE=$1
-    LIVE_RUN=1
-else
     echo ${USAGE}; exit 1
 fi
 
+#
+# More than one input file or a merged file means batch mode, which is
+# for non-live runs only.
+#
+BATCH=0
+if [ ${NUM_FILES} -gt 1 -o "${MERGED_FILE}" != "" ]
+then
+    BATCH=1
+    if [ ${LIVE_RUN} -eq 1 ]
+    then
+        echo ${USAGE}; exit 1
+    fi
+fi
+
+#
+# Selected checks are for non-live runs without a merged file only.
+#
+if [ "${CHECKS}" != "" ]
+then
+    if [ ${LIVE_RUN} -eq 1 -o "${MERGED_FILE}" != "" ]
+    then
+        echo ${USAGE}; exit 1
+    fi
+    CHECKS_ARGS="--checks ${CHECKS}"
+fi
+
 #
 # Create a temporary file and make sure that it is removed when this script
 # terminates.
 #
 TMP_FILE=/tmp/`basename $0`.$$
 touch ${TMP_FILE}
-trap "rm -f ${TMP_FILE}" 0 1 2 15
+
+#
+# FUNCTION: Remove the temporary file and drop the temp table if the run
+#           did not get to drop it.
+#
+TEMP_TABLE_CREATED=0
+cleanup ()
+{
+    rm -f ${TMP_FILE}
+    if [ ${TEMP_TABLE_CREATED} -eq 1 ]
+    then
+        echo "drop table if exists ${MCVLOAD_TEMP_TABLE};" | psql -h${PG_DBSERVER} -d${PG_DBNAME} -U${PG_DBUSER} -e >> ${LOG} 2>&1
+    fi
+}
+trap "cleanup" 0
+trap "cleanup; exit 1" 1 2 15
 
 #
 # Make sure the configuration file exists and source it.
@@ -128,12 +231,38 @@ then
 fi
 
 #
-# Make sure the input file exists (regular file or symbolic link).
+# Make sure the input files exist (regular file or symbolic link).
+#
+for INPUT_FILE in ${INPUT_FILES}
+do
+    if [ "`ls -L ${INPUT_FILE} 2>/dev/null`" = "" ]
+    then
+        echo "Missing input file: ${INPUT_FILE}"
+        exit 1
+    fi
+done
+
 #
-if [ "`ls -L ${INPUT_FILE} 2>/dev/null`" = "" ]
+# In batch mode the reports of each input file are written to a directory
+# named after the input file, so input files with the same name in
+# different directories would overwrite each other's reports.
+#
+if [ ${BATCH} -eq 1 ]
 then
-    echo "Missing input file: ${INPUT_FILE}"
-    exit 1
+    FILE_NAMES=""
+    for INPUT_FILE in ${INPUT_FILES}
+    do
+        FILE_NAME=`basename ${INPUT_FILE}`
+        for i in ${FILE_NAMES}
+        do
+            if [ "$i" = "${FILE_NAME}" ]
+            then
+                echo "Input files of a batch must have different names: ${FILE_NAME}"
+                exit 1
+            fi
+        done
+        FILE_NAMES="${FILE_NAMES} ${FILE_NAME}"
+    done
 fi
 
 #
@@ -146,6 +275,8 @@ then
     INPUT_FILE_BCP=${CURRENTDIR}/`basename ${INPUT_FILE_BCP}`
     ANNOT_FILE=${CURRENTDIR}/`basename ${ANNOT_FILE}`
     MCVLOADQC_LOGFILE=${CURRENTDIR}/`basename ${MCVLOADQC_LOGFILE}`
+    MCVQC_SQL_LOG=${CURRENTDIR}/`basename ${MCVQC_SQL_LOG}`
+    MCVQC_PLAN_LOG=${CURRENTDIR}/`basename ${MCVQC_PLAN_LOG}`
     SANITY_RPT=${CURRENTDIR}/`basename ${SANITY_RPT}`
     INVALID_MARKER_RPT=${CURRENTDIR}/`basename ${INVALID_MARKER_RPT}`
     SEC_MARKER_RPT=${CURRENTDIR}/`basename ${SEC_MARKER_RPT}`
@@ -158,6 +289,70 @@ then
     GRPNG_TERM_RPT=${CURRENTDIR}/`basename ${GRPNG_TERM_RPT}`
     BEFORE_AFTER_RPT=${CURRENTDIR}/`basename ${BEFORE_AFTER_RPT}`
     RPT_NAMES_RPT=${CURRENTDIR}/`basename ${RPT_NAMES_RPT}`
+    CROSS_FILE_CONFLICT_RPT=${CURRENTDIR}/`basename ${CROSS_FILE_CONFLICT_RPT}`
+    MCVQC_STATS_FILE=${CURRENTDIR}/`basename ${MCVQC_STATS_FILE}`
+    RUN_HISTORY_DB=${RUN_HISTORY_DB_USER}
+    MCVQC_CACHE_FILE=${MCVQC_CACHE_FILE_USER}
+fi
+
+#
+# The run ID names the temp table and the working files of the run, so
+# several runs by the same user, or a curator run and the "live" run, can
+# run at the same time. The temp table name is an SQL identifier, so only
+# letters, digits and underscores are kept.
+#
+MCVQC_RUN_ID=`echo ${USER}_$$_\`date +%s\` | tr -c 'A-Za-z0-9_\n' '_'`
+INPUT_FILE_QC=${INPUT_FILE_QC}.${MCVQC_RUN_ID}
+INPUT_FILE_BCP=${INPUT_FILE_BCP}.${MCVQC_RUN_ID}
+MCVQC_STATS_FILE=${MCVQC_STATS_FILE}.${MCVQC_RUN_ID}
+
+#
+# Only one run at a time writes its reports to a report directory, a run
+# takes the lock of the report directory or, if another run holds it,
+# writes its reports and its log to a directory of its own. The lock is
+# a kernel lock (flock) of the lock file, held by file descriptor 9 of this
+# script and the commands it runs. It is released when the run ends, however
+# it ends, so a run which died leaves no lock to clear, on this host or on
+# another host sharing the report directory, and there is no stale lock for
+# two runs to take over at the same time.
+#
+REPORT_DIR=`dirname ${RPT_NAMES_RPT}`
+LOCK_FILE=${REPORT_DIR}/.mcvQC.lock
+RPT_LOCKED=0
+touch ${LOCK_FILE} 2>/dev/null
+if [ -r ${LOCK_FILE} ]
+then
+    exec 9<${LOCK_FILE}
+    if flock -n 9
+    then
+        RPT_LOCKED=1
+    else
+        exec 9<&-
+    fi
+fi
+if [ ${RPT_LOCKED} -eq 0 ]
+then
+    REPORT_DIR=${REPORT_DIR}/mcvQC.${MCVQC_RUN_ID}
+    mkdir -p ${REPORT_DIR}
+    echo "Another QC run is writing its reports in `dirname ${REPORT_DIR}`"
+    echo "The reports of this run are in: ${REPORT_DIR}"
+    MCVLOADQC_LOGFILE=${REPORT_DIR}/`basename ${MCVLOADQC_LOGFILE}`
+    MCVQC_SQL_LOG=${REPORT_DIR}/`basename ${MCVQC_SQL_LOG}`
+    MCVQC_PLAN_LOG=${REPORT_DIR}/`basename ${MCVQC_PLAN_LOG}`
+    SANITY_RPT=${REPORT_DIR}/`basename ${SANITY_RPT}`
+    INVALID_MARKER_RPT=${REPORT_DIR}/`basename ${INVALID_MARKER_RPT}`
+    SEC_MARKER_RPT=${REPORT_DIR}/`basename ${SEC_MARKER_RPT}`
+    INVALID_TERMID_RPT=${REPORT_DIR}/`basename ${INVALID_TERMID_RPT}`
+    INVALID_JNUM_RPT=${REPORT_DIR}/`basename ${INVALID_JNUM_RPT}`
+    INVALID_EVID_RPT=${REPORT_DIR}/`basename ${INVALID_EVID_RPT}`
+    INVALID_EDITOR_RPT=${REPORT_DIR}/`basename ${INVALID_EDITOR_RPT}`
+    MULTIPLE_MCV_RPT=${REPORT_DIR}/`basename ${MULTIPLE_MCV_RPT}`
+    MKR_TYPE_CONFLICT_RPT=${REPORT_DIR}/`basename ${MKR_TYPE_CONFLICT_RPT}`
+    GRPNG_TERM_RPT=${REPORT_DIR}/`basename ${GRPNG_TERM_RPT}`
+    BEFORE_AFTER_RPT=${REPORT_DIR}/`basename ${BEFORE_AFTER_RPT}`
+    RPT_NAMES_RPT=${REPORT_DIR}/`basename ${RPT_NAMES_RPT}`
+    CROSS_FILE_CONFLICT_RPT=${REPORT_DIR}/`basename ${CROSS_FILE_CONFLICT_RPT}`
+    QUARANTINE_FILE=${REPORT_DIR}/`basename ${QUARANTINE_FILE}`
 fi
 
 #echo "CURRENTDIR:         ${CURRENTDIR}"
@@ -184,46 +379,48 @@ fi
 LOG=${MCVLOADQC_LOGFILE}
 rm -rf ${LOG}
 touch ${LOG}
+rm -f ${MCVQC_SQL_LOG} ${MCVQC_PLAN_LOG}
+
+#
+# Initialize the stats file of the run.
+#
+START_TIME=`date +%s`
+rm -f ${MCVQC_STATS_FILE}
+
+#
+# FUNCTION: Add the run to the run history database.
+#
+recordRun ()
+{
+    RUN_RC=$1  # The exit code of the run
+
+    ${PYTHON} ${MCVLOAD}/bin/mcvRunHistory.py record mcvQC ${RUN_RC} ${MCVQC_STATS_FILE} ${START_TIME} >> ${LOG} 2>&1
+    rm -f ${MCVQC_STATS_FILE}
+}
 
 #
 # Initialize the report files to make sure the current user can write to them.
+# FILE_RPT_LIST are the reports created for each input file.
 #
-RPT_LIST="${SANITY_RPT} ${INVALID_MARKER_RPT} ${SEC_MARKER_RPT} ${INVALID_TERMID_RPT} ${INVALID_JNUM_RPT} ${INVALID_EVID_RPT} ${INVALID_EDITOR_RPT}  ${MULTIPLE_MCV_RPT} ${MKR_TYPE_CONFLICT_RPT} ${GRPNG_TERM_RPT} ${BEFORE_AFTER_RPT} ${RPT_NAMES_RPT}"
+FILE_RPT_LIST="${SANITY_RPT} ${INVALID_MARKER_RPT} ${SEC_MARKER_RPT} ${INVALID_TERMID_RPT} ${INVALID_JNUM_RPT} ${INVALID_EVID_RPT} ${INVALID_EDITOR_RPT}  ${MULTIPLE_MCV_RPT} ${MKR_TYPE_CONFLICT_RPT} ${GRPNG_TERM_RPT} ${BEFORE_AFTER_RPT} ${RPT_NAMES_RPT}"
+RPT_LIST="${FILE_RPT_LIST} ${CROSS_FILE_CONFLICT_RPT}"
 
 for i in ${RPT_LIST}
 do
     rm -f $i; >$i
 done
-
-#
-# Convert the input file into a QC-ready version that can be used to run
-# the sanity/QC reports against. This involves doing the following:
-# 1) Extract columns 1 thru 10
-# 2) Remove any spaces
-# 3) Extract only lines that have alphanumerics (excludes blank lines)
-# 4) Remove any Ctrl-M characters (dos2unix)
-#
-cat ${INPUT_FILE} | tail -n +2 | cut -d'	' -f1-10 | sed 's/ //g' | grep '[0-9A-Za-z]' > ${INPUT_FILE_QC}
-dos2unix ${INPUT_FILE_QC} ${INPUT_FILE_QC} 2>/dev/null
 #
-# FUNCTION: Check for duplicate lines in an input file and write the lines
-#           to the sanity report.
+# FUNCTION: Check for duplicate lines and duplicate annotations in an input
+#           file and write them, with their line numbers in the input file,
+#           to the sanity report. Markers annotated to more than one term
+#           are written too, but are not an error.
 #
 checkDupLines ()
 {
     FILE=$1    # The input file to check
     REPORT=$2  # The sanity report to write to
 
-    echo "Duplicate Lines" >> ${REPORT}
-    echo "---------------" >> ${REPORT}
-    sort ${FILE} | uniq -d > ${TMP_FILE}
-    cat ${TMP_FILE} >> ${REPORT}
-    if [ `cat ${TMP_FILE} | wc -l` -eq 0 ]
-    then
-        return 0
-    else
-        return 1
-    fi
+    ${PYTHON} ${MCVLOAD}/bin/checkDuplicates.py ${FILE} >> ${REPORT}
 }
 
 #
@@ -240,42 +437,104 @@ checkColumns ()
 
 
 #
-# Run sanity checks on the input file.
+# Create the QC-ready version of each input file and run sanity checks on it.
+# In batch mode the QC-ready file and the reports of each input file are in
+# a directory of its own.
 #
 echo "" >> ${LOG}
 date >> ${LOG}
 echo "Run sanity checks on the input file" >> ${LOG}
+SANITY_START=`date +%s`
 FILE_ERROR=0
+QC_FILES=""
 
-checkDupLines ${INPUT_FILE_QC} ${SANITY_RPT}
-if [ $? -ne 0 ]
-then
-    FILE_ERROR=1
-fi
+for INPUT_FILE in ${INPUT_FILES}
+do
+    if [ ${BATCH} -eq 1 ]
+    then
+        FILE_DIR=${REPORT_DIR}/`basename ${INPUT_FILE}`.qc
+        mkdir -p ${FILE_DIR}
+        for i in ${FILE_RPT_LIST}
+        do
+            rm -f ${FILE_DIR}/`basename $i`; >${FILE_DIR}/`basename $i`
+        done
+        FILE_QC=${FILE_DIR}/`basename ${INPUT_FILE_QC}`
+        FILE_SANITY_RPT=${FILE_DIR}/`basename ${SANITY_RPT}`
+    else
+        FILE_QC=${INPUT_FILE_QC}
+        FILE_SANITY_RPT=${SANITY_RPT}
+    fi
+    QC_FILES="${QC_FILES} ${FILE_QC}"
+
+    #
+    # Convert the input file into a QC-ready version that can be used to run
+    # the sanity/QC reports against. This involves doing the following:
+    # 0) Decompress a compressed input file
+    # 1) Extract columns 1 thru 10
+    # 2) Remove any spaces
+    # 3) Extract only lines that have alphanumerics (excludes blank lines)
+    # 4) Remove any Ctrl-M characters (dos2unix)
+    #
+    # The input file is decompressed first, so a file which cannot be read
+    # is reported in the sanity report.
+    #
+    ${PYTHON} ${MCVLOAD}/bin/mcvInput.py cat ${INPUT_FILE} > ${FILE_QC} 2>> ${FILE_SANITY_RPT}
+    if [ $? -ne 0 ]
+    then
+        echo "Cannot read input file: ${INPUT_FILE}" | tee -a ${LOG}
+        FILE_ERROR=1
+        continue
+    fi
+    tail -n +2 ${FILE_QC} | cut -d'	' -f1-10 | sed 's/ //g' | grep '[0-9A-Za-z]' > ${FILE_QC}.tmp
+    mv ${FILE_QC}.tmp ${FILE_QC}
+    dos2unix ${FILE_QC} ${FILE_QC} 2>/dev/null
 
-checkColumns ${INPUT_FILE_QC} ${SANITY_RPT} ${MCVLOAD_FILE_COLUMNS}
-if [ $? -ne 0 ]
-then
-    FILE_ERROR=1
-fi
+    SANITY_ERROR=0
+
+    checkDupLines ${INPUT_FILE} ${FILE_SANITY_RPT}
+    if [ $? -ne 0 ]
+    then
+        SANITY_ERROR=1
+    fi
+
+    checkColumns ${FILE_QC} ${FILE_SANITY_RPT} ${MCVLOAD_FILE_COLUMNS}
+    if [ $? -ne 0 ]
+    then
+        SANITY_ERROR=1
+    fi
+
+    if [ ${SANITY_ERROR} -ne 0 ]
+    then
+        FILE_ERROR=1
+        if [ ${BATCH} -eq 1 ]
+        then
+            echo "See: ${FILE_SANITY_RPT}" | tee -a ${LOG}
+        fi
+    fi
+done
+
+printf "phase\tsanity\t%s\n" `expr \`date +%s\` - ${SANITY_START}` >> ${MCVQC_STATS_FILE}
 
 #
-# If the input file had sanity error, remove the QC-ready input file and
+# If an input file had sanity error, remove the QC-ready input files and
 # skip the QC reports.
 #
 if [ ${FILE_ERROR} -ne 0 ]
 then
     echo "Sanity errors detected in input file" | tee -a ${LOG}
-    rm -f ${INPUT_FILE_QC}
+    rm -f ${QC_FILES}
+    recordRun 1
     exit 1
 fi
 
 #
-# Append the current user ID to the name of the temp table that needs to be
-# created. This allows multiple people to run the QC checks at the same time
-# without sharing the same table.
+# Append the run ID to the name of the temp table that needs to be
+# created. This allows multiple runs of the QC checks at the same time
+# without sharing the same table. The index names are unique in the
+# schema too, so they are named after the table.
 #
-MCVLOAD_TEMP_TABLE=${MCVLOAD_TEMP_TABLE}_${USER}
+MCVLOAD_TEMP_TABLE=${MCVLOAD_TEMP_TABLE}_${MCVQC_RUN_ID}
+TEMP_TABLE_CREATED=1
 
 #
 # Create a temp table for the input data.
@@ -294,15 +553,15 @@ create table ${MCVLOAD_TEMP_TABLE} (
 )
 ;
 
-create  index idx_termID on ${MCVLOAD_TEMP_TABLE} (lower(termID)) ;
+create  index ${MCVLOAD_TEMP_TABLE}_termID on ${MCVLOAD_TEMP_TABLE} (lower(termID)) ;
 
-create  index idx_mgiID on ${MCVLOAD_TEMP_TABLE} (lower(mgiID)) ;
+create  index ${MCVLOAD_TEMP_TABLE}_mgiID on ${MCVLOAD_TEMP_TABLE} (lower(mgiID)) ;
 
-create  index idx_jNum on ${MCVLOAD_TEMP_TABLE} (lower(jNum)) ;
+create  index ${MCVLOAD_TEMP_TABLE}_jNum on ${MCVLOAD_TEMP_TABLE} (lower(jNum)) ;
 
-create  index idx_evidCode on ${MCVLOAD_TEMP_TABLE} (lower(evidCode)) ;
+create  index ${MCVLOAD_TEMP_TABLE}_evidCode on ${MCVLOAD_TEMP_TABLE} (lower(evidCode)) ;
 
-create  index idx_editor on ${MCVLOAD_TEMP_TABLE} (lower(editor)) ;
+create  index ${MCVLOAD_TEMP_TABLE}_editor on ${MCVLOAD_TEMP_TABLE} (lower(editor)) ;
 
 grant all on ${MCVLOAD_TEMP_TABLE} to public ;
 
@@ -316,7 +575,21 @@ date >> ${LOG}
 echo "" | tee -a ${LOG}
 echo "Generate the QC reports" | tee -a ${LOG}
 echo "" | tee -a ${LOG}
-{ ${PYTHON} ${MCVLOAD_QC} ${INPUT_FILE_QC} 2>&1; echo $? > ${TMP_FILE}; } >> ${LOG}
+if [ ${BATCH} -eq 1 ]
+then
+    if [ "${MERGED_FILE}" != "" ]
+    then
+        QC_CMD="${PYTHON} ${MCVLOAD_QC} -m ${MERGED_FILE}"
+    else
+        QC_CMD="${PYTHON} ${MCVLOAD_QC}"
+    fi
+elif [ ${LIVE_RUN} -eq 0 -a -S "${MCVQC_SERVER_SOCKET}" ]
+then
+    QC_CMD="${PYTHON} ${MCVLOAD}/bin/mcvQCClient.py ${MCVQC_SERVER_SOCKET}"
+else
+    QC_CMD="${PYTHON} ${MCVLOAD_QC}"
+fi
+{ ${QC_CMD} ${CHECKS_ARGS} ${FULL_ARGS} ${QC_FILES} 2>&1; echo $? > ${TMP_FILE}; } >> ${LOG}
 if [ `cat ${TMP_FILE}` -eq 1 ]
 then
     echo "A fatal error occurred while generating the QC reports"
@@ -346,13 +619,16 @@ cat - <<EOSQL | psql -h${PG_DBSERVER} -d${PG_DBNAME} -U${PG_DBUSER} -e  >> ${LOG
 drop table ${MCVLOAD_TEMP_TABLE};
 
 EOSQL
+TEMP_TABLE_CREATED=0
 
 date >> ${LOG}
 
 #
-# Remove the QC-ready input file and the bcp file.
+# Remove the QC-ready input files and the bcp file.
 #
-rm -f ${INPUT_FILE_QC}
+rm -f ${QC_FILES}
 rm -f ${INPUT_FILE_BCP}
 
+recordRun ${RC}
+
 exit ${RC}
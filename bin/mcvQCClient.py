@@ -0,0 +1,122 @@
+#
+#  mcvQCClient.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script sends a QC job to the resident QC service
+#	(mcvQCServer.py) and reports its output and exit code as if
+#	mcvQC.py had been run. If no service is listening on the socket,
+#	mcvQC.py is run instead.
+#
+#  Usage:
+#
+#      mcvQCClient.py  socketFile  [ --checks check,... ]  [ --full ]  filename
+#
+#      where:
+#          socketFile = path to the Unix socket of the QC service
+#          check = name of a check to run, see mcvQC.py
+#          filename = path to the input file
+#
+#  Env Vars:
+#
+#      The environment variables used by mcvQC.py, they are sent to
+#      the QC service with the job.
+#
+#  Inputs:
+#
+#      - The QC-ready input file, see mcvQC.py
+#
+#  Outputs:
+#
+#      - See mcvQC.py
+#
+#  Exit Codes:
+#
+#      See mcvQC.py
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import json
+import socket
+import getopt
+
+NL = '\n'
+
+USAGE = 'Usage: mcvQCClient.py  socketFile  [ --checks check,... ]  [ --full ]  inputFile'
+
+if len(sys.argv) < 3:
+    print(USAGE)
+    sys.exit(1)
+
+# the options follow the socket file, getopt stops at the first argument
+# which is not an option
+socketFile = sys.argv[1]
+try:
+    opts, args = getopt.getopt(sys.argv[2:], 'c:', ['checks=', 'full'])
+except getopt.GetoptError:
+    print(USAGE)
+    sys.exit(1)
+
+if len(args) != 1:
+    print(USAGE)
+    sys.exit(1)
+
+inputFile = args[0]
+
+checksValue = None
+fullRun = 0
+for opt, value in opts:
+    if opt in ('-c', '--checks'):
+        checksValue = value
+    elif opt == '--full':
+        fullRun = 1
+
+try:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socketFile)
+except OSError:
+    # no QC service is listening, run the QC reports in this process
+    qcScript = os.path.join(os.path.dirname(sys.argv[0]), 'mcvQC.py')
+    qcArgs = [sys.executable, qcScript]
+    if checksValue != None:
+        qcArgs = qcArgs + ['--checks', checksValue]
+    if fullRun:
+        qcArgs = qcArgs + ['--full']
+    os.execv(sys.executable, qcArgs + [inputFile])
+
+# the check names are validated by the QC service
+checks = None
+if checksValue != None:
+    checks = []
+    for name in str.split(checksValue, ','):
+        if str.strip(name) != '':
+            checks.append(str.strip(name))
+
+job = {'inputFile' : os.path.abspath(inputFile),
+       'checks' : checks,
+       'full' : fullRun,
+       'cwd' : os.getcwd(),
+       'env' : dict(os.environ)}
+sock.sendall((json.dumps(job) + NL).encode())
+
+fpSock = sock.makefile('r')
+line = fpSock.readline()
+fpSock.close()
+sock.close()
+
+if line == '':
+    print('The QC service closed the connection: ' + socketFile)
+    sys.exit(1)
+
+response = json.loads(line)
+sys.stdout.write(response['output'])
+sys.exit(response['rc'])
@@ -0,0 +1,212 @@
+#
+#  mcvQCServer.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script runs a resident QC service which keeps the reference
+#	data lookups of mcvQC.py loaded, so a QC job does not pay for
+#	loading them. Jobs are sent by mcvQCClient.py over a local Unix
+#	socket and produce the same report set as running mcvQC.py.
+#
+#  Usage:
+#
+#      mcvQCServer.py  socketFile
+#
+#      where:
+#          socketFile = path to the Unix socket to listen on
+#
+#  Env Vars:
+#
+#      The environment variables used by mcvQC.py, see mcvQCServer.sh.
+#      Each job is run with the environment sent by the client, so only
+#      jobs from the user running the server are accepted.
+#
+#  Inputs:
+#
+#      - A job per connection, one line of JSON:
+#        {"inputFile": ..., "checks": [...] or null, "full": 0 or 1,
+#         "cwd": ..., "env": {...}}
+#
+#  Outputs:
+#
+#      - For each job, one line of JSON: {"rc": exit code, "output": ...}
+#        where exit code and output are those mcvQC.py would have.
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      1) Load all reference data lookups.
+#      2) For each job, reload the lookups whose data has changed since
+#         they were loaded, then fork a process which runs the job
+#         against the loaded lookups.
+#
+#  Notes:
+#
+#      Only non-live jobs are accepted, "live" runs (which create the
+#      annotation file and update marker types) always run mcvQC.py.
+#      Jobs must be for the database the server was started with.
+#      The socket is only readable and writable by the user running the
+#      server, and the user of each connection is checked (SO_PEERCRED).
+#
+###########################################################################
+
+import sys
+import os
+import json
+import struct
+import socket
+import tempfile
+import traceback
+import socketserver
+import mgi_utils
+import db
+import mcvQC
+
+NL = '\n'
+
+USAGE = 'Usage: mcvQCServer.py  socketFile'
+
+#
+# Purpose: Reload the lookups whose data has changed.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets the mcvQC lookups
+# Throws: Nothing
+#
+def refresh ():
+    # use a session of its own, so the forked job does not share
+    # a database connection with the server
+    db.useOneConnection(1)
+    names = mcvQC.refreshLookups()
+    db.useOneConnection(0)
+    if names != []:
+        print('%s Loaded lookups: %s' % (mgi_utils.date(), ', '.join(names)))
+        sys.stdout.flush()
+
+#
+# Purpose: Run a QC job against the loaded lookups.
+# Returns: the exit code and the output of the job
+# Assumes: this is the forked job process
+# Effects: creates the report files of the job
+# Throws: Nothing
+#
+def runJob (job):
+    if job['env'].get('LIVE_RUN', '0') != '0':
+        return 1, 'The QC server does not run "live" QC jobs' + NL
+
+    # the lookups were loaded from the database of the server
+    if job['env'].get('PG_DBSERVER') != db.get_sqlServer() or \
+            job['env'].get('PG_DBNAME') != db.get_sqlDatabase():
+        return 1, 'The QC server runs against %s.%s only' % \
+            (db.get_sqlServer(), db.get_sqlDatabase()) + NL
+
+    os.chdir(job['cwd'])
+    os.environ.clear()
+    os.environ.update(job['env'])
+
+    # capture the output of the job, including the bcp command
+    fpOutput = tempfile.TemporaryFile(mode='w+')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(fpOutput.fileno(), 1)
+    os.dup2(fpOutput.fileno(), 2)
+
+    try:
+        mcvQC.readConfig()
+        mcvQC.inputFile = job['inputFile']
+        if job.get('checks') != None:
+            mcvQC.selectedChecks = mcvQC.setSelectedChecks(','.join(job['checks']))
+        mcvQC.fullRun = job.get('full', 0)
+        db.useOneConnection(1)
+        mcvQC.runPhase('loadInput', mcvQC.initInput)
+        rc = mcvQC.runQC()
+        mcvQC.writeStats()
+    except SystemExit as e:
+        rc = e.code
+        if rc == None:
+            rc = 0
+    except:
+        traceback.print_exc()
+        rc = 1
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    fpOutput.seek(0)
+    output = fpOutput.read()
+    fpOutput.close()
+    return rc, output
+
+#
+# Forks a process for each job, after reloading the changed lookups
+# in the server process.
+#
+class QCServer (socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+
+    # a job runs with the environment of the client, which sets the
+    # commands mcvQC.py runs (PG_DBUTILS), so it must be from this user
+    def verify_request (self, request, clientAddress):
+        credentials = request.getsockopt(socket.SOL_SOCKET,
+            socket.SO_PEERCRED, struct.calcsize('3i'))
+        pid, uid, gid = struct.unpack('3i', credentials)
+        if uid == os.getuid():
+            return True
+        print('%s Rejected job of user ID %s' % (mgi_utils.date(), uid))
+        sys.stdout.flush()
+        response = json.dumps({'rc' : 1,
+            'output' : 'The QC server only runs jobs of its own user' + NL})
+        request.sendall((response + NL).encode())
+        return False
+
+    def process_request (self, request, clientAddress):
+        refresh()
+        socketserver.ForkingMixIn.process_request(self, request, clientAddress)
+
+#
+# Runs one job in the forked process.
+#
+class QCJobHandler (socketserver.StreamRequestHandler):
+
+    def handle (self):
+        job = json.loads(self.rfile.readline().decode())
+        print('%s Job: %s' % (mgi_utils.date(), job['inputFile']))
+        sys.stdout.flush()
+        rc, output = runJob(job)
+        response = json.dumps({'rc' : rc, 'output' : output}) + NL
+        self.wfile.write(response.encode())
+
+#
+# Main
+#
+if len(sys.argv) != 2:
+    print(USAGE)
+    sys.exit(1)
+
+socketFile = sys.argv[1]
+if os.path.exists(socketFile):
+    os.remove(socketFile)
+
+print('DB Server:' + db.get_sqlServer())
+print('DB Name:  ' + db.get_sqlDatabase())
+refresh()
+
+# the socket is created with no access for other users
+oldUmask = os.umask(0o177)
+try:
+    server = QCServer(socketFile, QCJobHandler)
+finally:
+    os.umask(oldUmask)
+os.chmod(socketFile, 0o600)
+print('%s Listening on: %s' % (mgi_utils.date(), socketFile))
+sys.stdout.flush()
+try:
+    server.serve_forever()
+finally:
+    server.server_close()
+    os.remove(socketFile)
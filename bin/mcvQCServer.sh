@@ -0,0 +1,88 @@
+#!/bin/sh
+#
+#  mcvQCServer.sh
+###########################################################################
+#
+#  Purpose:
+#
+#      This script is a wrapper around the resident QC service which keeps
+#      the reference data lookups of the QC reports loaded. While it runs,
+#      mcvQC.sh sends its non-live QC jobs to it.
+#
+#  Usage:
+#
+#      mcvQCServer.sh
+#
+#      The service runs until it is killed, e.g.:
+#
+#          nohup mcvQCServer.sh &
+#
+#  Env Vars:
+#
+#      See the configuration file
+#
+#  Inputs:  None
+#
+#  Outputs:
+#
+#      - Log file (${MCVQC_SERVER_LOGFILE})
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  Fatal error occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      1) Source the common configuration file to establish the environment.
+#      2) Run mcvQCServer.py listening on ${MCVQC_SERVER_SOCKET}.
+#
+#  Notes:  None
+#
+###########################################################################
+
+BINDIR=`dirname $0`
+
+CONFIG=`cd ${BINDIR}/..; pwd`/mcvload.config
+
+#
+# Make sure the configuration file exists and source it.
+#
+if [ -f ${CONFIG} ]
+then
+    . ${CONFIG}
+else
+    echo "Missing configuration file: ${CONFIG}"
+    exit 1
+fi
+
+#
+# If the QC service is being run by a curator, the mgd_dbo password needs to
+# be in a password file in their HOME directory.
+#
+if [ "${USER}" != "mgiadmin" ]
+then
+    PGPASSFILE=$HOME/.pgpass
+fi
+
+#
+# The service only runs non-live QC jobs, each job overrides these settings
+# with those of the client.
+#
+LIVE_RUN=0; export LIVE_RUN
+MCVLOAD_TEMP_TABLE=${MCVLOAD_TEMP_TABLE}_${USER}
+
+#
+# The SQL of the service itself (reloading the lookups) is logged with
+# the service log.
+#
+MCVQC_SQL_LOG=`dirname ${MCVQC_SERVER_LOGFILE}`/mcvQCServer.sql.log
+MCVQC_PLAN_LOG=`dirname ${MCVQC_SERVER_LOGFILE}`/mcvQCServer.plan.log
+
+echo "QC service socket: ${MCVQC_SERVER_SOCKET}"
+echo "QC service log:    ${MCVQC_SERVER_LOGFILE}"
+
+${PYTHON} ${MCVLOAD}/bin/mcvQCServer.py ${MCVQC_SERVER_SOCKET} >> ${MCVQC_SERVER_LOGFILE} 2>&1
+exit $?
@@ -0,0 +1,250 @@
+
+'''
+#
+#
+# Report:
+#       Runs a set of MCV reports in one process and one database session
+#
+# Usage:
+#       mcvReports.py [--profile] [--trace-memory] [reportName ...]
+#
+#	where reportName is a key of REPORTS. If no report names are given
+#	the reports named in ${MCV_REPORTS} are run, or all reports if
+#	${MCV_REPORTS} is not set.
+#
+#	With --profile and --trace-memory (or ${MCV_PROFILE} and
+#	${MCV_TRACE_MEMORY} set to 1) each report is profiled as a phase,
+#	see mcvProfile.py.
+#
+#	Each report is written by reportlib to its own file named after
+#	the report.
+#
+#	Intermediate results shared by several reports (the MCV annotations,
+#	the official markers, the annotation count per MCV term) are created
+#	once as temp tables by the first report that needs them and reused
+#	by the others.
+#
+#	The genes with no MCV annotation are the official markers minus the
+#	annotated markers, the definition of the markers with no MCV
+#	annotation report of mcvQC.py (${NO_MCV_ANNOT_RPT}) restricted to
+#	genes.
+#
+#	To add a report, add an entry to REPORTS. A report is either:
+#		(title, function) - the function is called with the open
+#			report file and writes the report itself
+#		(title, query) - the rows of the query are written tab
+#			delimited in the order of the selected columns,
+#			after the title and the number of rows
+#
+# History:
+#
+# sc	06/07/10
+#	- geneNoMcvAnnot.py created
+#
+# sc	06/14/10
+#	- mcvAnnotByFeature.py created
+#
+'''
+
+import sys
+import os
+import db
+import reportlib
+import mcvProfile
+
+CRT = reportlib.CRT
+SPACE = reportlib.SPACE
+TAB = reportlib.TAB
+PAGE = reportlib.PAGE
+
+# names of the shared temp tables created so far in this session
+sharedTables = []
+
+#
+# Purpose: Create the temp table of all MCV/Marker annotations,
+#	if it does not exist yet in this session
+# Returns: Nothing
+# Assumes: db.useOneConnection(1) has been called
+# Effects: creates temp table mcvAnnot
+# Throws: Nothing
+#
+def createMcvAnnot ():
+    if 'mcvAnnot' in sharedTables:
+        return
+
+    cmds = []
+    cmds.append('''select va._Object_key, va._Term_key
+        into temp mcvAnnot
+        from VOC_Annot va
+        where va._AnnotType_key = 1011''')
+    cmds.append('create index mcvAnnot_idx1 on mcvAnnot(_Object_key)')
+    cmds.append('create index mcvAnnot_idx2 on mcvAnnot(_Term_key)')
+    db.sql(cmds, None)
+    sharedTables.append('mcvAnnot')
+
+#
+# Purpose: Create the temp table of the number of annotations to each
+#	MCV term, including the terms with no annotations,
+#	if it does not exist yet in this session
+# Returns: Nothing
+# Assumes: db.useOneConnection(1) has been called
+# Effects: creates temp table mcvTermCount
+# Throws: Nothing
+#
+def createMcvTermCount ():
+    if 'mcvTermCount' in sharedTables:
+        return
+
+    createMcvAnnot()
+    db.sql('''select t._Term_key, t.term, count(va._Term_key) as termCount
+        into temp mcvTermCount
+        from VOC_Term t left outer join
+        mcvAnnot va on va._Term_key = t._Term_key
+        where t._Vocab_key = 79
+        group by t._Term_key, t.term''', None)
+    sharedTables.append('mcvTermCount')
+
+#
+# Purpose: counts for each Feature Type with an MCV annotation
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to fp
+# Throws: Nothing
+#
+def mcvAnnotByFeature (fp):
+    createMcvTermCount()
+    results = db.sql('''select term as feature, termCount as featureCount
+        from mcvTermCount
+        order by term''', 'auto')
+
+    fp.write('MCV Annotations by Feature%s%s' %(CRT, CRT))
+    for r in results:
+        fp.write('%s%s%s%s' % (r['feature'], TAB, r['featureCount'], CRT))
+
+#
+# Purpose: Create the temp table of the official mouse markers with their
+#	primary MGI ID and marker type, if it does not exist yet in this
+#	session
+# Returns: Nothing
+# Assumes: db.useOneConnection(1) has been called
+# Effects: creates temp table officialMarker
+# Throws: Nothing
+#
+def createOfficialMarker ():
+    if 'officialMarker' in sharedTables:
+        return
+
+    db.sql('''select m._Marker_key, a.accID as mgiID, m.symbol,
+            t.name as markerType
+        into temp officialMarker
+        from MRK_Marker m, ACC_Accession a, MRK_Types t
+        where m._Marker_Status_key = 1
+        and m._Organism_key = 1
+        and m._Marker_key = a._Object_key
+        and a._MGIType_key = 2
+        and a._LogicalDB_key = 1
+        and a.preferred = 1
+        and a.prefixPart = 'MGI:'
+        and m._Marker_Type_key = t._Marker_Type_key''', None)
+    sharedTables.append('officialMarker')
+
+#
+# Purpose: Get the official markers with no MCV annotation: the official
+#	markers minus the annotated markers, as in the markers with no
+#	MCV annotation report of mcvQC.py
+# Returns: list of [mgiID, symbol, markerType], sorted by symbol
+# Assumes: db.useOneConnection(1) has been called
+# Effects: Nothing
+# Throws: Nothing
+#
+def getNoMcvMarkers (markerTypes):
+    createMcvAnnot()
+    createOfficialMarker()
+
+    results = db.sql('''select o.mgiID, o.symbol, o.markerType
+        from officialMarker o
+        where o.markerType in ('%s')
+        and not exists (select 1 from mcvAnnot a
+            where a._Object_key = o._Marker_key)
+        order by o.symbol''' % "','".join(markerTypes), 'auto')
+
+    markers = []
+    for r in results:
+        markers.append([r['mgiID'], r['symbol'], r['markerType']])
+    return markers
+
+#
+# Purpose: Markers of type gene with no MCV annotations
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to fp
+# Throws: Nothing
+#
+def geneNoMcvAnnot (fp):
+    markers = getNoMcvMarkers(['Gene'])
+
+    fp.write('%s Genes with no MCV Annotation%s%s' %(len(markers),CRT, CRT))
+    for mgiID, symbol, markerType in markers:
+        fp.write(mgiID + TAB + symbol + CRT)
+
+#
+# the reports, in the order they are run
+#
+REPORTS = {
+    'mcvAnnotByFeature' : ('MCV Annotations by Feature', mcvAnnotByFeature),
+    'geneNoMcvAnnot' : ('Genes with no MCV Annotation', geneNoMcvAnnot),
+    }
+
+#
+# Purpose: Write the rows of a report query, tab delimited
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to fp
+# Throws: Nothing
+#
+def writeQueryReport (fp, title, query):
+    results = db.sql(query, 'auto')
+    fp.write('%s %s%s%s' % (len(results), title, CRT, CRT))
+    for r in results:
+        fp.write(TAB.join(map(str, list(r.values()))) + CRT)
+
+#
+# Purpose: Run the named reports in one database session
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: creates the report files
+# Throws: Nothing
+#
+def run (reportNames):
+    for name in reportNames:
+        if name not in REPORTS:
+            print('Unknown report: %s' % name)
+            print('Reports: %s' % ' '.join(list(REPORTS.keys())))
+            sys.exit(1)
+
+    db.useOneConnection(1)
+
+    for name in reportNames:
+        title, report = REPORTS[name]
+        fp = reportlib.init(name, '')
+        if callable(report):
+            mcvProfile.runPhase(name, lambda: report(fp))
+        else:
+            mcvProfile.runPhase(name,
+                lambda: writeQueryReport(fp, title, report))
+        reportlib.finish_nonps(fp)
+
+    db.useOneConnection(0)
+
+#
+# Main
+#
+if __name__ == '__main__':
+    mcvProfile.init('mcvReports')
+    if len(sys.argv) > 1:
+        reportNames = sys.argv[1:]
+    elif os.environ.get('MCV_REPORTS', '') != '':
+        reportNames = str.split(os.environ['MCV_REPORTS'])
+    else:
+        reportNames = list(REPORTS.keys())
+    run(reportNames)
@@ -0,0 +1,328 @@
+#
+#  mcvRunHistory.py
+###########################################################################
+#
+#  Purpose:
+#
+#	This script maintains the run history database of the load and
+#	QC runs, and compares the latest run of a job against the runs
+#	before it to flag the phases that have slowed down.
+#
+#  Usage:
+#
+#      mcvRunHistory.py  time  statsFile  phase  command  [ arg ... ]
+#      mcvRunHistory.py  record  job  exitCode  statsFile  startTime
+#      mcvRunHistory.py  compare  job
+#      mcvRunHistory.py  list  job  [ numberOfRuns ]
+#
+#      where:
+#          statsFile = path to the stats file of the run
+#          phase = name of the phase of the run
+#          command = the command run as the phase
+#          job = name of the job (mcvload, mcvQC)
+#          exitCode = exit code of the run
+#          startTime = start of the run in seconds since the epoch
+#
+#      time - run the command, add its duration and peak memory to the
+#             stats file and exit with the exit code of the command
+#      record - add the run and the stats in the stats file to the
+#             run history database
+#      compare - compare each phase of the latest run of the job with
+#             the median of the successful runs before it
+#      list - print the latest runs of the job
+#
+#  Env Vars:
+#
+#      RUN_HISTORY_DB
+#      RUN_HISTORY_BASELINE
+#      RUN_HISTORY_THRESHOLD
+#      RUN_HISTORY_MIN_SECONDS
+#
+#  Inputs:
+#
+#      - Stats file, written by mcvQC.py and the wrapper scripts, with
+#        the following tab-delimited fields:
+#
+#        1. Type (input, phase, check, peakrss)
+#        2. Name (input file, phase name, check name or process)
+#        3. Value (bytes, seconds, discrepancy rows or kilobytes)
+#
+#  Outputs:
+#
+#      - Run history database (${RUN_HISTORY_DB})
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#      2:  Phases of the latest run have slowed down (compare only)
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import resource
+import subprocess
+import sqlite3
+
+USAGE = '''Usage: mcvRunHistory.py  time  statsFile  phase  command  [ arg ... ]
+       mcvRunHistory.py  record  job  exitCode  statsFile  startTime
+       mcvRunHistory.py  compare  job
+       mcvRunHistory.py  list  job  [ numberOfRuns ]'''
+
+TAB = '\t'
+NL = '\n'
+
+# the total duration of a run is compared as a phase of this name
+TOTAL = 'total'
+
+SCHEMA = [
+    '''create table if not exists run (
+        _Run_key integer primary key,
+        job text not null,
+        startTime text not null,
+        seconds real not null,
+        exitCode integer not null,
+        inputBytes integer null,
+        peakRssKb integer null)''',
+    '''create table if not exists run_phase (
+        _Run_key integer not null,
+        phase text not null,
+        seconds real not null)''',
+    '''create table if not exists run_check (
+        _Run_key integer not null,
+        checkName text not null,
+        rowCount integer not null)''',
+    'create index if not exists run_idx1 on run(job)',
+    'create index if not exists run_phase_idx1 on run_phase(_Run_key)',
+    'create index if not exists run_check_idx1 on run_check(_Run_key)',
+    ]
+
+#
+# Purpose: Open the run history database, creating it if needed
+# Returns: the database connection
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def openHistory ():
+    conn = sqlite3.connect(os.environ['RUN_HISTORY_DB'])
+    for cmd in SCHEMA:
+        conn.execute(cmd)
+    return conn
+
+#
+# Purpose: Run a command as a phase of a run
+# Returns: the exit code of the command
+# Assumes: Nothing
+# Effects: adds the duration and the peak memory of the command to the
+#	stats file
+# Throws: Nothing
+#
+def timePhase (statsFile, phase, command):
+    start = time.time()
+    rc = subprocess.call(command)
+    seconds = time.time() - start
+
+    # ru_maxrss of the children is the peak of the largest process
+    # the command ran, in kilobytes
+    peakRss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    fpStats = open(statsFile, 'a')
+    fpStats.write('phase%s%s%s%.3f%s' % (TAB, phase, TAB, seconds, NL))
+    fpStats.write('peakrss%s%s%s%s%s' % (TAB, phase, TAB, peakRss, NL))
+    fpStats.close()
+
+    return rc
+
+#
+# Purpose: Add a run to the run history database
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: writes to the run history database
+# Throws: Nothing
+#
+def record (job, exitCode, statsFile, startTime):
+    phases = {}
+    checks = {}
+    inputBytes = None
+    peakRss = None
+
+    if os.path.exists(statsFile):
+        fpStats = open(statsFile, 'r')
+        for line in fpStats.readlines():
+            statType, name, value = str.split(line[:-1], TAB)
+            if statType == 'input':
+                inputBytes = (inputBytes or 0) + int(value)
+            elif statType == 'phase':
+                phases[name] = phases.get(name, 0) + float(value)
+            elif statType == 'check':
+                checks[name] = checks.get(name, 0) + int(value)
+            elif statType == 'peakrss':
+                peakRss = max(peakRss or 0, int(value))
+        fpStats.close()
+
+    seconds = time.time() - float(startTime)
+
+    conn = openHistory()
+    cursor = conn.execute('''insert into run (job, startTime, seconds,
+        exitCode, inputBytes, peakRssKb) values (?, ?, ?, ?, ?, ?)''',
+        (job, time.strftime('%Y-%m-%d %H:%M:%S',
+        time.localtime(float(startTime))), seconds, int(exitCode),
+        inputBytes, peakRss))
+    runKey = cursor.lastrowid
+    for phase in phases:
+        conn.execute('insert into run_phase values (?, ?, ?)',
+            (runKey, phase, phases[phase]))
+    for name in checks:
+        conn.execute('insert into run_check values (?, ?, ?)',
+            (runKey, name, checks[name]))
+    conn.commit()
+    conn.close()
+
+#
+# Purpose: Get the duration of each phase of a run, including the
+#	total duration of the run
+# Returns: dictionary of phase to seconds
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getPhases (conn, runKey):
+    phases = {}
+    for phase, seconds in conn.execute('''select phase, seconds
+            from run_phase where _Run_key = ?''', (runKey,)):
+        phases[phase] = seconds
+    for seconds, in conn.execute('select seconds from run where _Run_key = ?',
+            (runKey,)):
+        phases[TOTAL] = seconds
+    return phases
+
+#
+# Purpose: Get the median of a list of numbers
+# Returns: the median
+# Assumes: the list is not empty
+# Effects: Nothing
+# Throws: Nothing
+#
+def median (values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+#
+# Purpose: Compare the latest run of a job with the median of the
+#	successful runs before it
+# Returns: 2 if phases have slowed down by more than the threshold,
+#	else 0
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def compare (job):
+    baselineRuns = int(os.environ['RUN_HISTORY_BASELINE'])
+    threshold = float(os.environ['RUN_HISTORY_THRESHOLD'])
+    minSeconds = float(os.environ['RUN_HISTORY_MIN_SECONDS'])
+
+    conn = openHistory()
+    latest = conn.execute('''select _Run_key, startTime from run
+        where job = ? order by _Run_key desc limit 1''', (job,)).fetchone()
+    if latest == None:
+        print('No runs of %s in the run history' % job)
+        return 0
+    runKey, startTime = latest
+
+    baselineKeys = []
+    for key, in conn.execute('''select _Run_key from run
+            where job = ? and exitCode = 0 and _Run_key < ?
+            order by _Run_key desc limit ?''',
+            (job, runKey, baselineRuns)):
+        baselineKeys.append(key)
+
+    print('Run of %s started %s compared to the median of %s previous runs' % \
+        (job, startTime, len(baselineKeys)))
+    if baselineKeys == []:
+        return 0
+
+    # Looks like {phase:[seconds, ...], ...}
+    baseline = {}
+    for key in baselineKeys:
+        for phase, seconds in list(getPhases(conn, key).items()):
+            if phase not in baseline:
+                baseline[phase] = []
+            baseline[phase].append(seconds)
+    phases = getPhases(conn, runKey)
+    conn.close()
+
+    print('%-30s  %10s  %10s  %8s' % ('Phase', 'Seconds', 'Baseline', 'Change'))
+    print(30*'-' + '  ' + 10*'-' + '  ' + 10*'-' + '  ' + 8*'-')
+    rc = 0
+    for phase in sorted(phases.keys()):
+        if phase not in baseline:
+            continue
+        seconds = phases[phase]
+        baseSeconds = median(baseline[phase])
+        change = ''
+        if baseSeconds > 0:
+            change = '%+.0f%%' % ((seconds - baseSeconds) * 100 / baseSeconds)
+        flag = ''
+        if seconds > baseSeconds * (1 + threshold / 100) and \
+                seconds - baseSeconds >= minSeconds:
+            flag = '  SLOWER'
+            rc = 2
+        print('%-30s  %10.1f  %10.1f  %8s%s' % \
+            (phase, seconds, baseSeconds, change, flag))
+
+    return rc
+
+#
+# Purpose: Print the latest runs of a job
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def listRuns (job, numberOfRuns):
+    conn = openHistory()
+    print('%-19s  %10s  %4s  %12s  %12s' % \
+        ('Start', 'Seconds', 'Exit', 'Input Bytes', 'Peak RSS KB'))
+    print(19*'-' + '  ' + 10*'-' + '  ' + 4*'-' + '  ' + 12*'-' + '  ' + 12*'-')
+    for startTime, seconds, exitCode, inputBytes, peakRss in conn.execute('''
+            select startTime, seconds, exitCode, inputBytes, peakRssKb
+            from run where job = ?
+            order by _Run_key desc limit ?''', (job, numberOfRuns)):
+        print('%-19s  %10.1f  %4s  %12s  %12s' % \
+            (startTime, seconds, exitCode, inputBytes, peakRss))
+    conn.close()
+
+#
+# Main
+#
+if len(sys.argv) < 2:
+    print(USAGE)
+    sys.exit(1)
+
+command = sys.argv[1]
+if command == 'time' and len(sys.argv) >= 5:
+    sys.exit(timePhase(sys.argv[2], sys.argv[3], sys.argv[4:]))
+elif command == 'record' and len(sys.argv) == 6:
+    record(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5])
+elif command == 'compare' and len(sys.argv) == 3:
+    sys.exit(compare(sys.argv[2]))
+elif command == 'list' and len(sys.argv) in (3, 4):
+    numberOfRuns = 20
+    if len(sys.argv) == 4:
+        numberOfRuns = int(sys.argv[3])
+    listRuns(sys.argv[2], numberOfRuns)
+else:
+    print(USAGE)
+    sys.exit(1)
@@ -21,12 +21,21 @@
 #
 #  Outputs:
 #
-#      - An archive file
+#      - The input file, added to the input archive (see mcvArchive.py)
 #      - Log files defined by the environment variables ${LOG_PROC},
 #        ${LOG_DIAG}, ${LOG_CUR} and ${LOG_VAL}
 #      - annotload logs and bcp file to ${OUTPUTDIR}
+#      - Partitioned annotation load: the partitions and their annotload
+#        logs to ${ANNOTLOAD_PARTITION_DIR}, combined into the annotload log
 #      - vocload logs and bcp files  - see vocload/MCV.config
 #      - Records written to the database tables
+#      - The run, added to the run history database (${RUN_HISTORY_DB}),
+#        see mcvRunHistory.py
+#      - Checkpoint manifest of the completed stages (${CHECKPOINT_DIR}),
+#        see mcvCheckpoint.py
+#      - Quarantine file of the markers which failed a fatal QC check
+#        (${QUARANTINE_FILE}), in quarantine mode (${MCVQC_QUARANTINE}),
+#        see mcvQC.py
 #      - Exceptions written to standard error
 #      - Configuration and initialization errors are written to a log file
 #        for the shell script
@@ -46,11 +55,20 @@
 #      4) Initialize the log file.
 #      5) Determine if the input file has changed since the last time that
 #         the load was run. Do not continue if the input file is not new.
-#      6) Call mcvQC.sh to generate the sanity/QC reports and 
+#      6) Check the checkpoint manifest, the stages completed by an
+#         earlier run on the same input file and configuration are
+#         skipped (steps 7 to 9).
+#      7) Call mcvQC.sh to generate the sanity/QC reports and 
 #         annotation file.
-#      7) Load annotations
-#      8) Archive the input file.
-#      9) Touch the "lastrun" file to timestamp the last run of the load.
+#      8) Load annotations, in partitions by marker loaded one after
+#         another if ${ANNOTLOAD_PARTITIONS} is more than 1 (see
+#         mcvPartition.py), and publish the report of the markers with
+#         no MCV annotation created by mcvQC.sh.
+#      9) Archive the input file.
+#      10) Touch the "lastrun" file to timestamp the last run of the load,
+#          and clear the checkpoint manifest.
+#      11) Add the run to the run history database and compare it with
+#          the previous runs.
 
 # History:
 #
@@ -132,6 +150,24 @@ fi
 # sets "JOBKEY"
 preload ${OUTPUTDIR}
 
+#
+# Time each step of the load for the run history.
+#
+START_TIME=`date +%s`
+rm -f ${LOAD_STATS_FILE}
+RUN_HISTORY="${PYTHON} ${MCVLOAD}/bin/mcvRunHistory.py"
+CHECKPOINT="${PYTHON} ${MCVLOAD}/bin/mcvCheckpoint.py"
+
+#
+# FUNCTION: Add the run to the run history database.
+#
+recordRun ()
+{
+    RUN_RC=$1  # The exit code of the run
+
+    ${RUN_HISTORY} record mcvload ${RUN_RC} ${LOAD_STATS_FILE} ${START_TIME} >> ${LOG_DIAG} 2>&1
+}
+
 #
 # There should be a "lastrun" file in the input directory that was created
 # the last time the load was run for this input file. If this file exists
@@ -151,19 +187,51 @@ then
     fi
 fi
 
+#
+# A load which failed is resumed after the stages it completed, unless the
+# input file or the configuration has changed since. The artifacts of the
+# completed stages are restored to the output directory.
+#
+${CHECKPOINT} start ${INPUT_FILE_DEFAULT} ${CONFIG_LOAD} ${CONFIG_ANNOTLOAD} >> ${LOG_DIAG} 2>&1
+STAT=$?
+checkStatus ${STAT} "mcvCheckpoint.py start"
+
+#
+# FUNCTION: Record a completed stage and its artifacts in the checkpoint
+#           manifest.
+#
+completeStage ()
+{
+    ${CHECKPOINT} complete "$@" >> ${LOG_DIAG} 2>&1
+    checkStatus $? "mcvCheckpoint.py complete $1"
+}
+
 #
 # Generate the sanity/QC reports
 #
 echo "" >> ${LOG_DIAG}
 date >> ${LOG_DIAG}
-echo "Generate the sanity/QC reports" | tee -a ${LOG_DIAG}
-${MCVLOAD_QC_SH} ${INPUT_FILE_DEFAULT} ${RUNTYPE} 2>&1 >> ${LOG_DIAG} 
-STAT=$?
-checkStatus ${STAT} "QC reports"
-if [ ${STAT} -eq 1 ]
+printf "input\t%s\t%s\n" ${INPUT_FILE_DEFAULT} `wc -c < ${INPUT_FILE_DEFAULT}` >> ${LOAD_STATS_FILE}
+if ${CHECKPOINT} done qc
 then
-    shutDown
-    exit 1
+    echo "Skip the sanity/QC reports, completed by an earlier run" | tee -a ${LOG_DIAG}
+else
+    echo "Generate the sanity/QC reports" | tee -a ${LOG_DIAG}
+    rm -f ${NO_MCV_ANNOT_RPT_NEW}
+    ${RUN_HISTORY} time ${LOAD_STATS_FILE} qc ${MCVLOAD_QC_SH} ${INPUT_FILE_DEFAULT} ${RUNTYPE} 2>&1 >> ${LOG_DIAG} 
+    STAT=$?
+    # checkStatus exits on an error, the run is recorded first
+    if [ ${STAT} -ne 0 ]
+    then
+        recordRun ${STAT}
+    fi
+    checkStatus ${STAT} "QC reports"
+    if [ ${STAT} -eq 1 ]
+    then
+        shutDown
+        exit 1
+    fi
+    completeStage qc ${ANNOT_FILE} ${NO_MCV_ANNOT_RPT_NEW}
 fi
 
 #
@@ -171,26 +239,71 @@ fi
 #
 echo "" >> ${LOG_DIAG}
 date >> ${LOG_DIAG}
-echo "Running MCV/Marker annotation load" >> ${LOG_DIAG}
-cd ${OUTPUTDIR}
-${ANNOTLOAD_CSH} ${CONFIG_ANNOTLOAD} mcv >> ${LOG_DIAG} 
-STAT=$?
-checkStatus ${STAT} "${ANNOTLOAD_CSH} ${CONFIG_ANNOT}"
+if ${CHECKPOINT} done annotload
+then
+    echo "Skip the MCV/Marker annotation load, completed by an earlier run" >> ${LOG_DIAG}
+else
+    cd ${OUTPUTDIR}
+    if [ ${ANNOTLOAD_PARTITIONS} -gt 1 ]
+    then
+        echo "Running MCV/Marker annotation load in ${ANNOTLOAD_PARTITIONS} partitions" >> ${LOG_DIAG}
+        ${RUN_HISTORY} time ${LOAD_STATS_FILE} annotload ${PYTHON} ${MCVLOAD}/bin/mcvPartition.py ${ANNOT_FILE} >> ${LOG_DIAG}
+        STAT=$?
+        STEP="mcvPartition.py ${ANNOT_FILE}"
+    else
+        echo "Running MCV/Marker annotation load" >> ${LOG_DIAG}
+        ${RUN_HISTORY} time ${LOAD_STATS_FILE} annotload ${ANNOTLOAD_CSH} ${CONFIG_ANNOTLOAD} mcv >> ${LOG_DIAG} 
+        STAT=$?
+        STEP="${ANNOTLOAD_CSH} ${CONFIG_ANNOT}"
+    fi
+    if [ ${STAT} -ne 0 ]
+    then
+        recordRun ${STAT}
+    fi
+    checkStatus ${STAT} "${STEP}"
+
+    # the report of the markers with no MCV annotation describes the
+    # state after the load, it is published once the load has completed
+    mv ${NO_MCV_ANNOT_RPT_NEW} ${NO_MCV_ANNOT_RPT}
+    completeStage annotload
+fi
 
 #
-# Archive a copy of the input file, adding a timestamp suffix.
+# Archive the input file. The content is stored compressed, once per
+# distinct content, and the index records the timestamp of this load.
 #
 echo "" >> ${LOG_DIAG}
 date >> ${LOG_DIAG}
-echo "Archive input file" | tee -a ${LOG_DIAG}
-TIMESTAMP=`date '+%Y%m%d.%H%M'`
-ARC_FILE=`basename ${INPUT_FILE_DEFAULT}`.${TIMESTAMP}
-cp -p ${INPUT_FILE_DEFAULT} ${ARCHIVEDIR}/${ARC_FILE}
+if ${CHECKPOINT} done archive
+then
+    echo "Skip the input file archive, completed by an earlier run" | tee -a ${LOG_DIAG}
+else
+    echo "Archive input file" | tee -a ${LOG_DIAG}
+    ${RUN_HISTORY} time ${LOAD_STATS_FILE} archive ${PYTHON} ${MCVLOAD}/bin/mcvArchive.py store ${INPUT_FILE_DEFAULT} >> ${LOG_DIAG}
+    STAT=$?
+    if [ ${STAT} -ne 0 ]
+    then
+        recordRun ${STAT}
+    fi
+    checkStatus ${STAT} "mcvArchive.py store ${INPUT_FILE_DEFAULT}"
+    completeStage archive
+fi
 
 #
-# Touch the "lastrun" file to note when the load was run.
+# Touch the "lastrun" file to note when the load was run, the next run
+# starts with no checkpoint.
 #
 touch ${LASTRUN_FILE}
+${CHECKPOINT} clear >> ${LOG_DIAG} 2>&1
+
+#
+# Add the run to the run history and report the steps that have slowed
+# down compared to the previous runs.
+#
+recordRun 0
+echo "" >> ${LOG_PROC}
+${RUN_HISTORY} compare mcvload >> ${LOG_PROC} 2>&1
+${RUN_HISTORY} compare mcvQC >> ${LOG_PROC} 2>&1
 
 #
 # run postload cleanup and email logs
@@ -27,6 +27,7 @@
 #      - Log file for the script defined by ${LOG}, note update output goes 
 #	 to this log
 #      - Log file for this wrapper ${LOG_RUNVOCLOAD}
+#      - Copy of the last loaded OBO file ${MCV_OBO_LASTLOAD}
 #      - vocload logs and bcp files  - see vocload/MCV.config
 #      - Records written to the database tables
 #      - Exceptions written to standard error
@@ -41,6 +42,16 @@
 #
 #  Assumes:  Nothing
 #
+#  Implementation:
+#
+#      1) Skip the load if the OBO file is byte-identical to the last
+#         loaded version.
+#      2) Move the SO IDs of the MCV terms to the MCV ldb so the vocload
+#         does not delete them.
+#      3) Run the vocabulary load.
+#      4) Move the SO IDs of the MCV terms back to the SO ldb.
+#      5) Save a copy of the loaded OBO file.
+#
 # History:
 #
 # sc	04/30/2010 - TR6839
@@ -105,32 +116,58 @@ rm -rf ${LOG_RUNVOCLOAD}
 #
 #####################################
 
+#
+# The SO/MCV logical DB swap and the vocabulary load only need to run
+# when the MCV OBO file has changed since the last successful load.
+#
+if [ -f ${MCV_OBO_LASTLOAD} ]
+then
+    if cmp -s ${OBO_FILE} ${MCV_OBO_LASTLOAD}
+    then
+        echo "MCV OBO file has not changed since the last load - skipping load" | tee -a ${LOG_RUNVOCLOAD}
+        exit 0
+    fi
+fi
+
 #
 # run vocabulary load
 #
+# Each logical DB swap runs in a single transaction, is restricted to the
+# terms of the MCV vocabulary (_Vocab_key = 79) and only updates rows that
+# are not already in their target state, so rerunning it is a no-op.
+#
 echo "Running MCV Vocabulary load"  | tee -a ${LOG_RUNVOCLOAD}
 CONFIG_VOCLOAD=${VOCLOAD}/MCV.config
 
-cat - <<EOSQL | psql -h${MGD_DBSERVER} -d${MGD_DBNAME} -U mgd_dbo -e  >> ${LOG_RUNVOCLOAD}
-
-create temp table somcvTemp as
-select a1.accid as mcvID, t._term_key as mcvTermKey, t.term as mcvTerm, t.note as mcvNote, a2._accession_key, a2.accid as soID
-    from voc_term t, acc_accession a1, acc_accession a2
-    where a1._logicaldb_key = 146
-    and a1._mgitype_key = 13
-    and a1._object_key = t._term_key
-    and a2._logicaldb_key = 145
-    and a2._mgitype_key = 13
-    and a2._object_key = t._term_key
-;
+echo "Moving SO ID association to MCV term to MCV ldb" | tee -a ${LOG_RUNVOCLOAD}
+
+cat - <<EOSQL | psql -h${MGD_DBSERVER} -d${MGD_DBNAME} -U mgd_dbo -e -v ON_ERROR_STOP=1 >> ${LOG_RUNVOCLOAD}
+
+begin;
 
 update ACC_Accession a
 set _LogicalDB_key = 146, preferred = 0, private = 0
-from somcvTemp s
-where a._Accession_key = s._accession_key
+from VOC_Term t
+where t._Vocab_key = 79
+and a._Object_key = t._Term_key
+and a._MGIType_key = 13
+and a._LogicalDB_key = 145
+and exists (select 1
+    from ACC_Accession a1
+    where a1._Object_key = t._Term_key
+    and a1._MGIType_key = 13
+    and a1._LogicalDB_key = 146)
 ;
 
+commit;
+
 EOSQL
+STAT=$?
+checkStatus ${STAT} "Moving SO ID association to MCV term to MCV ldb"
+if [ ${STAT} -ne 0 ]
+then
+    exit 1
+fi
 
 ${VOCLOAD}/runOBOIncLoad.sh ${CONFIG_VOCLOAD} >> ${LOG_RUNVOCLOAD}
 STAT=$?
@@ -138,25 +175,40 @@ checkStatus ${STAT} "${VOCLOAD}/runOBOIncLoad.sh ${CONFIG_VOCLOAD}"
 
 echo "Moving SO ID association to MCV term to SO ldb" | tee -a ${LOG_RUNVOCLOAD}
 
-cat - <<EOSQL | psql -h${MGD_DBSERVER} -d${MGD_DBNAME} -U mgd_dbo -e  >> ${LOG_RUNVOCLOAD}
+cat - <<EOSQL | psql -h${MGD_DBSERVER} -d${MGD_DBNAME} -U mgd_dbo -e -v ON_ERROR_STOP=1 >> ${LOG_RUNVOCLOAD}
 
-create temp table soTemp as 
-select _Accession_key
-from ACC_Accession
-where _MGIType_key = 13
-and preferred = 0
-and _LogicalDB_key = 146
-and prefixPart = 'SO:'
-;
+begin;
 
 update ACC_Accession a
 set _LogicalDB_key = 145, preferred = 1, private = 1
-from soTemp s
-where a._Accession_key = s._Accession_key
+from VOC_Term t
+where t._Vocab_key = 79
+and a._Object_key = t._Term_key
+and a._MGIType_key = 13
+and a._LogicalDB_key = 146
+and a.preferred = 0
+and a.prefixPart = 'SO:'
 ;
 
+commit;
+
 EOSQL
+STAT2=$?
+checkStatus ${STAT2} "Moving SO ID association to MCV term to SO ldb"
+if [ ${STAT2} -ne 0 ]
+then
+    exit 1
+fi
 
 echo 'Done moving SO ID to SO ldb' | tee -a ${LOG_RUNVOCLOAD}
 
+#
+# Save a copy of the OBO file that was loaded, only if the vocabulary load
+# was successful, so an unchanged file is skipped next time.
+#
+if [ ${STAT} -eq 0 ]
+then
+    cp -p ${OBO_FILE} ${MCV_OBO_LASTLOAD}
+fi
+
 exit 0